@@ -0,0 +1,449 @@
+"""
+headless benchmarks, no window is opened
+
+    python benchmark.py outlines     decoding + flattening every glyph of the font, python vs numpy
+    python benchmark.py font         reading the font (metrics, cmap, every glyph), fontTools vs truetype.py
+    python benchmark.py layout       laying out large documents, per layout backend and number of worker processes
+    python benchmark.py raster       a screen of text filled on the CPU (rasterizer.py), checked against the shader's loop
+    python benchmark.py open         opening a large generated log file and showing its first screen
+    python benchmark.py suite        the layout and glyph pipelines over documents and font sizes, as a JSON baseline:
+
+        python benchmark.py suite --output before.json
+        python benchmark.py suite --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from array import array
+from typing import Any
+import time
+import numpy as np
+import main
+import reference
+from bezier import produce_bezier_lines
+from truetype import CompoundGlyph
+from layout import GlyphTable, ProcessLayout, layout_glyphs
+from rasterizer import Rasterizer, write_png, SAMPLE_ALPHA
+from text_buffer import TextBuffer, new_line
+
+
+def setup_state(font_size_in_pts: float = 16):
+    # glyphs from the disk cache would not be decoded at all
+    main.FONT_CACHE = None
+    main.STATE = main.ProgramState()
+    main.set_font_size(font_size_in_pts)
+
+
+def best_of(repeat: int, fn) -> tuple[float, Any]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def python_can_decode(key: int) -> bool:
+    glyph = reference.font_glyf_table()[main.GLYPH_ORDER[key]].__dict__
+    if "components" not in glyph:
+        return True
+    return all("coordinates" in reference.font_glyf_table()[c.getComponentInfo()[0]].__dict__ for c in glyph["components"])
+
+
+def python_outlines(keys: list[int]) -> dict:
+    result = dict()
+    for key in keys:
+        glyph = reference.font_glyf_table()[main.GLYPH_ORDER[key]].__dict__
+        if "components" in glyph:
+            glyph_contours = reference.handle_compound_glyphs(glyph)
+        else:
+            glyph_contours = reference.all_contour_segments(glyph)
+        for contour in glyph_contours:
+            reference.add_generated_polylines(contour)
+        result[key] = (glyph_contours, reference.find_char_width_height(glyph_contours))
+    return result
+
+
+def numpy_outlines(keys: list[int]) -> dict:
+    main.clear_glyph_contour_cache()
+    main.prepare_glyphs(keys)
+    dimensions = [main.GLYPH_CONTOUR_CACHE[key][1] for key in keys]
+    return dict(zip(keys, zip(main.flatten_glyphs(keys, main.STATE.scaling_factor), dimensions)))
+
+
+def bench_outlines(args):
+    setup_state(args.size)
+    # fontTools decompiles glyphs lazily, that should not be measured by whichever path runs first
+    for key in reference.font_glyf_table().keys():
+        reference.font_glyf_table()[key]
+    # the python path does not handle compound glyphs that are made of compound glyphs
+    keys = list(range(main.GLYPH_COUNT))
+    keys = [key for key, glyph in zip(keys, main.FONT.glyphs(keys)) if glyph and python_can_decode(key)]
+
+    python_time, python_result = best_of(args.repeat, lambda: python_outlines(keys))
+    numpy_time, numpy_result = best_of(args.repeat, lambda: numpy_outlines(keys))
+
+    mismatches = 0
+    for key in keys:
+        glyph_contours, python_dimensions = python_result[key]
+        polylines, numpy_dimensions = numpy_result[key]
+        same = list(python_dimensions[2]) == numpy_dimensions[2] and len(glyph_contours) == len(polylines)
+        for contour, vertices in zip(glyph_contours, polylines):
+            expected = np.array([(p.x, p.y) for p in contour.raw_polylines], dtype=np.float32).reshape(-1, 2)
+            if len(expected) > 1 and (expected[0] == expected[-1]).all():
+                # the python path closes the contour by repeating the first vertex
+                expected = expected[:-1]
+            same = same and expected.shape == vertices.shape and bool((expected == vertices).all())
+        mismatches += not same
+
+    print(f"glyphs: {len(keys)}, font size: {args.size}pt")
+    print(f"python: {python_time * 1000:.1f} ms")
+    print(f"numpy:  {numpy_time * 1000:.1f} ms ({python_time / numpy_time:.1f}x)")
+    print(f"glyphs with different output: {mismatches}")
+
+
+def bench_font(args):
+    # the first import of fontTools is part of what a cold start pays for
+    start = time.perf_counter()
+    import fontTools.ttLib
+    import_time = time.perf_counter() - start
+
+    fonttools_time, expected = best_of(args.repeat, lambda: reference.fonttools_font(args.font))
+    truetype_time, (glyph_order, *_) = best_of(args.repeat, lambda: reference.truetype_font(args.font))
+
+    print(f"font: {args.font}, glyphs: {len(glyph_order)}")
+    print(f"import fontTools: {import_time * 1000:.1f} ms")
+    print(f"fontTools:    {fonttools_time * 1000:.1f} ms")
+    print(f"truetype.py:  {truetype_time * 1000:.1f} ms ({fonttools_time / truetype_time:.1f}x)")
+
+
+def document_lines(glyph_count: int) -> list[array]:
+    """
+    the source of main.py repeated until it has glyph_count glyphs, as lines of glyph ids
+    """
+    lines = []
+    with open("main.py") as file:
+        source_lines = [main.line_keys(line.rstrip("\n").replace("\t", "    ")) for line in file]
+    remaining = glyph_count
+    while remaining > 0:
+        for line in source_lines:
+            line = line[:remaining]
+            lines.append(line)
+            remaining -= len(line)
+            if remaining == 0:
+                break
+    return lines
+
+
+def bench_layout(args):
+    setup_state(args.size)
+    print(f"font size: {args.size}pt, cores: {os.cpu_count()}")
+    # serial goes one glyph at a time in python, the others compute the positions of all the glyphs at once
+    print("speedup is relative to the first row of every document size")
+    print(f"{'glyphs':>9} {'backend':>12} {'workers':>8} {'time':>10} {'speedup':>8}")
+    pools = {workers: ProcessLayout(workers) for workers in args.workers}
+    try:
+        for glyph_count in args.glyphs:
+            lines = document_lines(glyph_count)
+            glyphs = np.concatenate([main.glyph_ids(line) for line in lines]).astype(np.int32)
+            main.ensure_glyphs(glyphs)
+            line_lengths = np.array([len(line) for line in lines], dtype=np.intp)
+            table: GlyphTable = main.GLYPH_TABLE
+            scaling_factor, line_spacing = main.STATE.scaling_factor, main.STATE.line_spacing
+
+            timings = []
+            if glyph_count <= args.max_serial_glyphs:
+                serial_time, _ = best_of(args.repeat, lambda: [main.update_for_one_row(line_spacing, line) for line in lines])
+                timings.append(("serial", 1, serial_time))
+            vectorized_time, _ = best_of(args.repeat, lambda: layout_glyphs(glyphs, line_lengths, table, scaling_factor, line_spacing))
+            timings.append(("vectorized", 1, vectorized_time))
+            for workers, pool in pools.items():
+                # the first call starts the worker processes
+                pool.layout_glyphs(glyphs, line_lengths, table, scaling_factor, line_spacing)
+                process_time, _ = best_of(args.repeat, lambda: pool.layout_glyphs(glyphs, line_lengths, table, scaling_factor, line_spacing))
+                timings.append(("processes", workers, process_time))
+
+            baseline = timings[0][2]
+            for backend, workers, elapsed in timings:
+                print(f"{glyph_count:>9} {backend:>12} {workers:>8} {elapsed * 1000:>8.2f}ms {baseline / elapsed:>7.1f}x")
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+
+
+def bench_raster(args):
+    stub_window(args.width, args.height, 30)
+    setup_state(args.size)
+    main.STATE.text_buffer = TextBuffer([new_line(line) for line in document_lines(args.glyphs)])
+    main.update()
+    glyphs = main.visible_instances()[2]
+    shapes = {main.glyph_key(key): main.glyph_shape(key) for key in np.unique(glyphs).tolist()}
+    print(f"font size: {args.size}pt, screen: {args.width}x{args.height}, glyphs on screen: {len(glyphs)}, distinct: {len(shapes)}")
+
+    def cold():
+        main.RASTERIZER = Rasterizer()
+        return main.render_to_image(args.width, args.height)
+
+    elapsed, _ = best_of(args.repeat, cold)
+    print(f"{'cold (every glyph rasterized)':<36} {elapsed * 1000:>8.2f}ms")
+    elapsed, image = best_of(args.repeat, lambda: main.render_to_image(args.width, args.height))
+    print(f"{'warm (coverage cached)':<36} {elapsed * 1000:>8.2f}ms")
+
+    mismatched_pixels, pixels = 0, 0
+    for key, shape in shapes.items():
+        expected, coverage = reference.shader_coverage(shape), main.RASTERIZER.coverage(key, shape)
+        # a sample exactly on an edge can go either way, that is at most one sample of the pixel
+        mismatched_pixels += int((np.abs(expected - coverage) > SAMPLE_ALPHA / 2).sum())
+        pixels += expected.size
+    print(f"pixels that differ from the shader's coverage: {mismatched_pixels} of {pixels}")
+    if args.output:
+        write_png(args.output, image)
+        print(f"written to {args.output}")
+
+
+def write_log_file(path: str, megabytes: int):
+    lines = [f"2024-01-01T00:00:{i % 60:02d}.{i:06d}Z INFO worker-{i % 8} request {i} handled in {i % 997}ms\n" for i in range(10_000)]
+    block = "".join(lines).encode()
+    with open(path, "wb") as file:
+        for _ in range(max(1, megabytes * 1024 * 1024 // len(block))):
+            file.write(block)
+
+
+def bench_open(args):
+    stub_window(args.width, args.height, 30)
+    setup_state(args.size)
+    path = args.path or os.path.join(tempfile.gettempdir(), f"phont-{args.megabytes}mb.log")
+    if not os.path.exists(path):
+        print(f"writing {path}")
+        write_log_file(path, args.megabytes)
+    # the first frame loads the glyphs, that is not what is measured here
+    main.open_file("main.py")
+    main.update()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    main.open_file(path)
+    opened = time.perf_counter()
+    main.update()
+    first_frame = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"file: {os.path.getsize(path) / 1024 ** 2:.0f} MiB, lines: {main.STATE.text_buffer.line_count}")
+    print(f"{'open (newline index)':<36} {(opened - start) * 1000:>8.2f}ms")
+    print(f"{'first frame (visible lines)':<36} {(first_frame - opened) * 1000:>8.2f}ms")
+    print(f"{'allocated at the peak':<36} {peak / 1024 ** 2:>8.2f}MiB")
+
+
+def stub_window(width: int, height: int, fps: float):
+    """
+    the screen size and frame time update() asks raylib for, without opening a window
+    """
+    main.rl.get_screen_width = lambda: width
+    main.rl.get_screen_height = lambda: height
+    main.rl.get_frame_time = lambda: 1 / fps
+
+
+def legacy_contours() -> list[tuple[list, list]]:
+    """
+    (coordinates, flags) of every contour of every simple glyph, closed like all_contour_segments closes them
+    """
+    contours = []
+    for glyph in main.FONT.glyphs(list(range(main.FONT.glyph_count))):
+        if glyph is None or isinstance(glyph, CompoundGlyph):
+            continue
+        coordinates = [tuple(p) for p in glyph.coordinates.tolist()]
+        flags = glyph.flags.tolist()
+        start = 0
+        for end in glyph.end_points.tolist():
+            contours.append((coordinates[start : end + 1] + [coordinates[start]], flags[start : end + 1] + [flags[start]]))
+            start = end + 1
+    return contours
+
+
+def cold_prepopulate():
+    main.clear_glyph_contour_cache()
+    main.GLYPH_SHAPE_CACHE.clear()
+    main.prepopulate_glyph_cache()
+
+
+def document_state(lines: list[array], font_size_in_pts: float) -> 'main.ProgramState':
+    main.STATE = main.ProgramState()
+    main.set_font_size(font_size_in_pts)
+    main.STATE.text_buffer = TextBuffer([new_line(line) for line in lines])
+    return main.STATE
+
+
+def first_frame(lines: list[array], font_size_in_pts: float) -> float:
+    document_state(lines, font_size_in_pts)
+    return time_frames(1)
+
+
+def time_frames(frames: int, before_frame=None) -> float:
+    """
+    average time of an update() over the frames
+    """
+    elapsed = 0.0
+    for _ in range(frames):
+        if before_frame is not None:
+            before_frame()
+        start = time.perf_counter()
+        main.update()
+        elapsed += time.perf_counter() - start
+    return elapsed / frames
+
+
+def page_down():
+    main.STATE.page_down = True
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_suite(args):
+    stub_window(args.width, args.height, args.fps)
+    results: dict[str, dict[str, Any]] = dict()
+
+    def record(name: str, seconds: float, **details):
+        results[name] = {"seconds": seconds, **details}
+        print(f"{name:<48} {seconds * 1000:>10.3f} ms")
+
+    setup_state(args.sizes[0])
+    contours = legacy_contours()
+    elapsed, all_segments = best_of(args.repeat, lambda: [reference.segments(coordinates, flags) for coordinates, flags in contours])
+    record("segments", elapsed, contours=len(contours))
+    curves = [segment for contour_segments in all_segments for segment in contour_segments if len(segment) == 3]
+
+    for font_size in args.sizes:
+        size = f"{font_size:g}pt"
+        setup_state(font_size)
+        scaling_factor = main.STATE.scaling_factor
+        scaled_curves = [[main.rl.Vector2(x * scaling_factor, y * scaling_factor) for x, y in curve] for curve in curves]
+        elapsed, _ = best_of(args.repeat, lambda: [produce_bezier_lines(*curve) for curve in scaled_curves])
+        record(f"produce_bezier_lines/{size}", elapsed, curves=len(curves))
+
+        elapsed, _ = best_of(args.repeat, cold_prepopulate)
+        record(f"prepopulate_glyph_cache/{size}", elapsed, glyphs=int(main.GLYPH_LOADED.sum()))
+
+        for glyph_count in args.glyphs:
+            document = f"{glyph_count}/{size}"
+            lines = document_lines(glyph_count)
+            main.ensure_glyphs(np.concatenate([main.glyph_ids(line) for line in lines]))
+
+            if glyph_count <= args.max_serial_glyphs:
+                line_spacing = main.STATE.line_spacing
+                elapsed, _ = best_of(args.repeat, lambda: [main.update_for_one_row(line_spacing, line) for line in lines])
+                record(f"update_for_one_row/{document}", elapsed, lines=len(lines))
+
+            # the whole document is laid out again (e.g. after loading it), then only the visible lines
+            record(f"update/first_frame/{document}", min(first_frame(lines, font_size) for _ in range(args.repeat)))
+
+            document_state(lines, font_size)
+            main.update()
+            record(f"update/steady_frame/{document}", time_frames(args.frames))
+            # every page down lays out a screen full of new lines
+            record(f"update/page_down_frame/{document}", time_frames(args.frames, page_down))
+
+    baseline = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cores": os.cpu_count(),
+        "font": main.FONT_PATH,
+        "screen": [args.width, args.height],
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(baseline, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        if not compare_results(previous, baseline, args.threshold):
+            sys.exit(1)
+
+
+def compare_results(previous: dict, current: dict, threshold: float) -> bool:
+    """
+    prints the benchmarks both runs have, False if any of them got slower by more than the threshold
+    """
+    print(f"\ncompared to {previous.get('commit')} (slower by more than {threshold:.0%} is a regression)")
+    regressions = 0
+    for name, result in current["results"].items():
+        if name not in previous["results"]:
+            continue
+        before, after = previous["results"][name]["seconds"], result["seconds"]
+        ratio = after / before if before else float("inf")
+        regressed = ratio > 1 + threshold
+        regressions += regressed
+        print(f"{name:<48} {before * 1000:>10.3f} ms -> {after * 1000:>10.3f} ms {ratio:>6.2f}x{'  REGRESSION' if regressed else ''}")
+    print(f"regressions: {regressions}")
+    return regressions == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    outlines = subparsers.add_parser("outlines", help="decoding + flattening every glyph of the font")
+    outlines.add_argument("--size", type=float, default=16, help="font size in points")
+    outlines.add_argument("--repeat", type=int, default=3)
+    outlines.set_defaults(run=bench_outlines)
+
+    font = subparsers.add_parser("font", help="reading the font, fontTools vs truetype.py")
+    font.add_argument("--font", default=main.FONT_PATH, help="path of a .ttf file")
+    font.add_argument("--repeat", type=int, default=3)
+    font.set_defaults(run=bench_font)
+
+    layout = subparsers.add_parser("layout", help="laying out large documents per layout backend")
+    layout.add_argument("--glyphs", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    layout.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker process counts to try")
+    layout.add_argument("--max-serial-glyphs", type=int, default=100_000, help="the python layout is skipped above this")
+    layout.add_argument("--size", type=float, default=16, help="font size in points")
+    layout.add_argument("--repeat", type=int, default=3)
+    layout.set_defaults(run=bench_layout)
+
+    raster = subparsers.add_parser("raster", help="a screen of text filled on the CPU, against the shader's loop")
+    raster.add_argument("--glyphs", type=int, default=10_000, help="document size")
+    raster.add_argument("--size", type=float, default=16, help="font size in points")
+    raster.add_argument("--width", type=int, default=1920, help="image width")
+    raster.add_argument("--height", type=int, default=1080, help="image height")
+    raster.add_argument("--repeat", type=int, default=3)
+    raster.add_argument("--output", help="write the image to this PNG file")
+    raster.set_defaults(run=bench_raster)
+
+    open_file = subparsers.add_parser("open", help="opening a large file and showing its first screen")
+    open_file.add_argument("--megabytes", type=int, default=1024, help="size of the generated log file")
+    open_file.add_argument("--path", help="open this file instead of a generated one")
+    open_file.add_argument("--size", type=float, default=16, help="font size in points")
+    open_file.add_argument("--width", type=int, default=1920, help="stubbed screen width")
+    open_file.add_argument("--height", type=int, default=1080, help="stubbed screen height")
+    open_file.set_defaults(run=bench_open)
+
+    suite = subparsers.add_parser("suite", help="the layout and glyph pipelines, as a JSON baseline")
+    suite.add_argument("--glyphs", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000], help="document sizes")
+    suite.add_argument("--sizes", type=float, nargs="+", default=[12, 16, 32], help="font sizes in points")
+    suite.add_argument("--max-serial-glyphs", type=int, default=100_000, help="update_for_one_row is skipped above this")
+    suite.add_argument("--width", type=int, default=1920, help="stubbed screen width")
+    suite.add_argument("--height", type=int, default=1080, help="stubbed screen height")
+    suite.add_argument("--fps", type=float, default=30, help="stubbed frame rate")
+    suite.add_argument("--frames", type=int, default=30, help="frames per steady/scrolling measurement")
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--output", help="write the results to this JSON file")
+    suite.add_argument("--compare", help="JSON file of an earlier run to compare against")
+    suite.add_argument("--threshold", type=float, default=0.1, help="relative slowdown that counts as a regression")
+    suite.set_defaults(run=bench_suite)
+
+    args = parser.parse_args()
+    args.run(args)
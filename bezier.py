@@ -1,3 +1,5 @@
+import math
+import numpy as np
 import pyray as rl
 
 def bezier_flat_enough(p1: rl.Vector2, control: rl.Vector2, p2: rl.Vector2) -> bool:
@@ -23,24 +25,108 @@ def bezier_flat_enough(p1: rl.Vector2, control: rl.Vector2, p2: rl.Vector2) -> b
     altitude = cross_product / dist
     return altitude <= 1
 
-def midpoint(a: rl.Vector2, b: rl.Vector2) -> rl.Vector2:
-    return rl.Vector2(
-        (a.x + b.x) / 2,
-        (a.y + b.y) / 2
-    )
+# the altitude bezier_flat_enough allows
+FLATNESS = 1
+
+
+def quadratic_segment_count(p0: rl.Vector2, p1: rl.Vector2, p2: rl.Vector2) -> int:
+    """
+    how many lines the curve is cut into so that every piece is flat enough (Wang's formula)
+
+    cutting the curve into n pieces of equal t, every piece has the second difference d = (p0 - 2*p1 + p2) / n^2,
+    its control point is |d| / 2 away from the middle of its chord, so that's at most FLATNESS
+    when n >= sqrt(|p0 - 2*p1 + p2| / (2 * FLATNESS))
+    """
+    ddx = p0.x - 2 * p1.x + p2.x
+    ddy = p0.y - 2 * p1.y + p2.y
+    return max(1, math.ceil(math.sqrt(math.hypot(ddx, ddy) / (2 * FLATNESS))))
 
 def produce_bezier_lines(
     p0: rl.Vector2,
     p1: rl.Vector2,
     p2: rl.Vector2,
 ) -> list[rl.Vector2]:
-    if bezier_flat_enough(p0, p1, p2):
-        return [p0, p2]
-    else:
-        m1 = midpoint(p0, p1)
-        m2 = midpoint(p1, p2)
-        m3 = midpoint(m1, m2)
-
-        a = produce_bezier_lines(p0, m1, m3)
-        b = produce_bezier_lines(m3, m2, p2)
-        return a + b
+    """
+    the points of the flattened curve, from p0 to p2.
+    the number of pieces is known up front so the points are evaluated in a single pass
+    """
+    n = quadratic_segment_count(p0, p1, p2)
+    points = [p0]
+    for k in range(1, n):
+        t = k / n
+        mt = 1 - t
+        points.append(rl.Vector2(
+            mt * mt * p0.x + 2 * mt * t * p1.x + t * t * p2.x,
+            mt * mt * p0.y + 2 * mt * t * p1.y + t * t * p2.y
+        ))
+    points.append(p2)
+    return points
+
+def quadratic_segment_counts(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """
+    quadratic_segment_count for arrays of curves, the points are (curve_count, 2) arrays
+    """
+    second_difference = p0.astype(np.float64) - 2 * p1.astype(np.float64) + p2.astype(np.float64)
+    length = np.hypot(second_difference[:, 0], second_difference[:, 1])
+    return np.maximum(1, np.ceil(np.sqrt(length / (2 * FLATNESS)))).astype(np.intp)
+
+def flatten_quadratics(
+    p0: np.ndarray,
+    p1: np.ndarray,
+    p2: np.ndarray,
+    counts: np.ndarray = None,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """
+    flattens many curves at once (e.g. every curve of a glyph or a font), the points are (curve_count, 2) arrays
+
+    curve i gets counts[i] points: t = k / counts[i] for k in [0, counts[i]), the end point is left out
+    since it's the start of the next curve of the contour. the points are written into out when it's given,
+    it has to have room for sum(counts) points
+    """
+    if counts is None:
+        counts = quadratic_segment_counts(p0, p1, p2)
+    total = int(counts.sum())
+    if out is None:
+        out = np.empty((total, 2), dtype=np.float32)
+
+    curve = np.repeat(np.arange(len(counts)), counts)
+    first_point = np.cumsum(counts) - counts
+    t = (np.arange(total) - first_point[curve]) / counts[curve]
+    t = t[:, None]
+    mt = 1 - t
+    out[:total] = (
+        mt * mt * p0[curve].astype(np.float64)
+        + 2 * mt * t * p1[curve].astype(np.float64)
+        + t * t * p2[curve].astype(np.float64)
+    )
+    return out[:total]
+
+def split_monotonic_y(
+    p0: tuple[float, float],
+    p1: tuple[float, float],
+    p2: tuple[float, float],
+) -> list[tuple[tuple[float, float], tuple[float, float], tuple[float, float]]]:
+    """
+    splits a quadratic bezier curve where its y derivative is zero,
+    so that every returned curve crosses a horizontal line at most once
+
+    B(t)  = (1-t)^2 * p0 + 2t(1-t) * p1 + t^2 * p2
+    B'(t) = 2(1-t) * (p1 - p0) + 2t * (p2 - p1) => for y it's zero at t = (y0 - y1) / (y0 - 2*y1 + y2)
+    """
+    denominator = p0[1] - 2 * p1[1] + p2[1]
+    if denominator == 0:
+        return [(p0, p1, p2)]
+
+    t = (p0[1] - p1[1]) / denominator
+    if t <= 0 or t >= 1:
+        return [(p0, p1, p2)]
+
+    # de casteljau split at t
+    m1 = (p0[0] + (p1[0] - p0[0]) * t, p0[1] + (p1[1] - p0[1]) * t)
+    m2 = (p1[0] + (p2[0] - p1[0]) * t, p1[1] + (p2[1] - p1[1]) * t)
+    m3 = (m1[0] + (m2[0] - m1[0]) * t, m1[1] + (m2[1] - m1[1]) * t)
+    # the split point is the extremum, snap the control points to it so both halves stay monotonic
+    m1 = (m1[0], m3[1])
+    m2 = (m2[0], m3[1])
+    return [(p0, m1, m3), (m3, m2, p2)]
@@ -0,0 +1,239 @@
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import numpy as np
+
+# bump whenever the layout of the files or anything that changes their contents (e.g. the flattening) changes,
+# files written with another version are ignored and written again
+FORMAT_VERSION = 2
+MAGIC = b"PHNT"
+
+# magic, format version, sha256 of the font file, number of sections
+HEADER = struct.Struct("<4sI32sI")
+# name, numpy dtype, offset from the start of the file, number of elements
+SECTION = struct.Struct("<32s8sQQ")
+ALIGNMENT = 16
+# flattened sizes kept per font, the least recently used ones are deleted when another one is written
+MAX_SIZE_CACHES = 8
+
+
+def cache_directory() -> str:
+    return os.environ.get("PHONT_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "phont")
+
+
+def font_file_hash(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+def write_arrays(path: str, font_hash: bytes, arrays: dict[str, np.ndarray]):
+    """
+    writes the arrays one after another, each aligned to 16 bytes, behind a table of their offsets.
+    the file is written to a temporary file of its own next to its final path and moved there,
+    so readers never see half a file and writers never share a temporary file
+    """
+    arrays = {name: np.ascontiguousarray(a).reshape(-1) for name, a in arrays.items()}
+    assert all(len(name.encode()) <= 32 for name in arrays), "section names are at most 32 bytes"
+    offset = HEADER.size + SECTION.size * len(arrays)
+    sections = []
+    for name, a in arrays.items():
+        offset += -offset % ALIGNMENT
+        sections.append(SECTION.pack(name.encode(), a.dtype.str.encode(), offset, len(a)))
+        offset += a.nbytes
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, font_hash, len(arrays)))
+            for section in sections:
+                file.write(section)
+            for a in arrays.values():
+                file.write(b"\0" * (-file.tell() % ALIGNMENT))
+                file.write(a.tobytes())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def read_arrays(path: str, font_hash: bytes) -> dict[str, np.ndarray]:
+    """
+    memory maps the file and returns the arrays as views into it, nothing is copied.
+    None if the file does not exist, is from another format version or for another font
+    """
+    try:
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(mapped) < HEADER.size:
+        return None
+    magic, version, file_font_hash, section_count = HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC or version != FORMAT_VERSION or file_font_hash != font_hash:
+        return None
+
+    arrays = dict()
+    for i in range(section_count):
+        name, dtype, offset, count = SECTION.unpack_from(mapped, HEADER.size + i * SECTION.size)
+        dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        if offset + count * dtype.itemsize > len(mapped):
+            return None
+        arrays[name.rstrip(b"\0").decode()] = np.frombuffer(mapped, dtype=dtype, count=count, offset=offset)
+    return arrays
+
+
+class FontCache:
+    """
+    everything about a font that does not depend on the size: metrics, cmap, glyph names
+    and the decoded outline (segments + bounding box) of every glyph
+
+    the contours of all the glyphs are stored back to back (CSR layout):
+        glyph_contours[g] .. glyph_contours[g + 1]          contours of glyph g
+        contour_segments[c] .. contour_segments[c + 1]      segments of contour c, 3 points each
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]) -> None:
+        self.units_per_em, self.ascent, self.glyph_count = arrays["info"].tolist()
+        self.glyph_order = bytes(arrays["names"]).decode().split("\0")
+        self.advance_widths = arrays["advance_widths"]
+        self.left_side_bearings = arrays["left_side_bearings"]
+        self.cmap_codepoints = arrays["cmap_codepoints"]
+        self.cmap_glyphs = arrays["cmap_glyphs"]
+        self.has_outline = arrays["has_outline"]
+        self.bounding_boxes = arrays["bounding_boxes"].reshape(-1, 4)
+        self.glyph_contours = arrays["glyph_contours"]
+        self.contour_segments = arrays["contour_segments"]
+        self.segments = arrays["segments"].reshape(-1, 3, 2)
+
+    @staticmethod
+    def path(font_hash: bytes) -> str:
+        return os.path.join(cache_directory(), f"{font_hash.hex()[:32]}.font.bin")
+
+    @classmethod
+    def load(cls, font_hash: bytes) -> 'FontCache':
+        arrays = read_arrays(cls.path(font_hash), font_hash)
+        return cls(arrays) if arrays is not None else None
+
+    @classmethod
+    def write(
+        cls, font_hash: bytes, units_per_em: int, ascent: int, glyph_order: list[str],
+        advance_widths: np.ndarray, left_side_bearings: np.ndarray, cmap: dict[int, int],
+        glyphs: list[tuple[list[np.ndarray], tuple[float, float, list[float]]]]
+    ):
+        """
+        glyphs has an entry for every glyph id: (segments per contour, dimensions) or None,
+        cmap maps codepoints to glyph ids
+        """
+        has_outline = np.zeros(len(glyph_order), dtype=np.uint8)
+        bounding_boxes = np.zeros((len(glyph_order), 4), dtype=np.float32)
+        glyph_contours = [0]
+        contour_segments = [0]
+        all_segments = []
+        for glyph_id, entry in enumerate(glyphs):
+            if entry is not None:
+                contours, dimensions = entry
+                has_outline[glyph_id] = 1
+                bounding_boxes[glyph_id] = dimensions[2]
+                for segments in contours:
+                    all_segments.append(segments)
+                    contour_segments.append(contour_segments[-1] + len(segments))
+            glyph_contours.append(len(contour_segments) - 1)
+
+        write_arrays(cls.path(font_hash), font_hash, {
+            "info": np.array([units_per_em, ascent, len(glyph_order)], dtype=np.int64),
+            "names": np.frombuffer("\0".join(glyph_order).encode(), dtype=np.uint8),
+            "advance_widths": np.asarray(advance_widths, dtype=np.int32),
+            "left_side_bearings": np.asarray(left_side_bearings, dtype=np.int32),
+            "cmap_codepoints": np.array(list(cmap.keys()), dtype=np.uint32),
+            "cmap_glyphs": np.array(list(cmap.values()), dtype=np.uint32),
+            "has_outline": has_outline,
+            "bounding_boxes": bounding_boxes,
+            "glyph_contours": np.array(glyph_contours, dtype=np.uint32),
+            "contour_segments": np.array(contour_segments, dtype=np.uint32),
+            "segments": np.concatenate(all_segments).astype(np.float32) if all_segments else np.empty(0, np.float32),
+        })
+
+    def cmap(self) -> dict[int, int]:
+        return dict(zip(self.cmap_codepoints.tolist(), self.cmap_glyphs.tolist()))
+
+    def glyph(self, glyph_id: int) -> tuple[list[np.ndarray], tuple[float, float, list[float]]]:
+        """
+        (segments per contour, (width, height, [x_min, y_min, x_max, y_max])) like outline.decode_contours and
+        outline.bounding_box return them, None for glyphs without an outline
+        """
+        if not self.has_outline[glyph_id]:
+            return None
+        first, last = self.glyph_contours[glyph_id], self.glyph_contours[glyph_id + 1]
+        bounds = self.contour_segments[first : last + 1].tolist()
+        contours = [self.segments[start:end] for start, end in zip(bounds, bounds[1:])]
+        x_min, y_min, x_max, y_max = self.bounding_boxes[glyph_id].tolist()
+        return contours, ((x_max - x_min), (y_max - y_min), [x_min, y_min, x_max, y_max])
+
+
+class SizeCache:
+    """
+    the flattened contours of every glyph at one size, contours are numbered like in the font's FontCache:
+        contour_vertices[c] .. contour_vertices[c + 1]      vertices of contour c
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]) -> None:
+        self.contour_vertices = arrays["contour_vertices"]
+        self.vertices = arrays["vertices"].reshape(-1, 2)
+
+    @staticmethod
+    def path(font_hash: bytes, size_bucket: float) -> str:
+        return os.path.join(cache_directory(), f"{font_hash.hex()[:32]}-{size_bucket:g}.size.bin")
+
+    @classmethod
+    def load(cls, font_hash: bytes, size_bucket: float) -> 'SizeCache':
+        path = cls.path(font_hash, size_bucket)
+        arrays = read_arrays(path, font_hash)
+        if arrays is None:
+            return None
+        try:
+            # the modification time is when the size was last used, see prune
+            os.utime(path)
+        except OSError:
+            pass
+        return cls(arrays)
+
+    @classmethod
+    def prune(cls, font_hash: bytes, keep: int = MAX_SIZE_CACHES):
+        """
+        deletes all but the `keep` most recently used sizes of the font
+        """
+        paths = glob.glob(os.path.join(cache_directory(), f"{font_hash.hex()[:32]}-*.size.bin"))
+        paths.sort(key=lambda path: os.path.getmtime(path), reverse=True)
+        for path in paths[keep:]:
+            try:
+                os.remove(path)
+            except OSError:
+                # e.g. still mapped on windows, it goes the next time
+                pass
+
+    @classmethod
+    def write(cls, font_hash: bytes, size_bucket: float, polylines: list[np.ndarray]):
+        """
+        polylines has the vertices of every contour of the font, in the order of the FontCache
+        """
+        contour_vertices = np.zeros(len(polylines) + 1, dtype=np.uint32)
+        np.cumsum([len(p) for p in polylines], out=contour_vertices[1:])
+        vertices = np.concatenate(polylines).astype(np.float32) if polylines else np.empty(0, np.float32)
+        write_arrays(cls.path(font_hash, size_bucket), font_hash, {
+            "contour_vertices": contour_vertices,
+            "vertices": vertices,
+        })
+        cls.prune(font_hash)
+
+    def glyph(self, font_cache: FontCache, glyph_id: int) -> list[np.ndarray]:
+        """
+        the flattened vertices of every contour of the glyph
+        """
+        first, last = font_cache.glyph_contours[glyph_id], font_cache.glyph_contours[glyph_id + 1]
+        bounds = self.contour_vertices[first : last + 1].tolist()
+        return [self.vertices[start:end] for start, end in zip(bounds, bounds[1:])]
@@ -191,100 +191,53 @@ NON_DRAWABLE_KEYS = {
 SHIFT_PRESSED = True
 SHIFT_NOT_PRESSED = False
 
-GLFW_TO_GLYPH_NAME = {
+GLFW_TO_CHAR = {
     SHIFT_NOT_PRESSED: {
-        GLFW_KEY_SPACE: "space",
-        GLFW_KEY_APOSTROPHE: "quotesingle",
-        GLFW_KEY_COMMA: "comma",
-        GLFW_KEY_MINUS: "minus",
-        GLFW_KEY_PERIOD: "period",
-        GLFW_KEY_SLASH: "slash",
-        GLFW_KEY_EQUAL: "equal",
-        GLFW_KEY_LEFT_BRACKET: "bracketleft",
-        GLFW_KEY_BACKSLASH: "backslash",
-        GLFW_KEY_RIGHT_BRACKET: "bracketright",
-        GLFW_KEY_GRAVE_ACCENT: "grave",
-        GLFW_KEY_0: "zero",
-        GLFW_KEY_1: "one",
-        GLFW_KEY_2: "two",
-        GLFW_KEY_3: "three",
-        GLFW_KEY_4: "four",
-        GLFW_KEY_5: "five",
-        GLFW_KEY_6: "six",
-        GLFW_KEY_7: "seven",
-        GLFW_KEY_8: "eight",
-        GLFW_KEY_9: "nine",
-        GLFW_KEY_SEMICOLON: "semicolon", # TODO: not rendered properly
+        GLFW_KEY_SPACE: ' ',
+        GLFW_KEY_APOSTROPHE: "'",
+        GLFW_KEY_COMMA: ',',
+        GLFW_KEY_MINUS: '-',
+        GLFW_KEY_PERIOD: '.',
+        GLFW_KEY_SLASH: '/',
+        GLFW_KEY_EQUAL: '=',
+        GLFW_KEY_LEFT_BRACKET: '[',
+        GLFW_KEY_BACKSLASH: '\\',
+        GLFW_KEY_RIGHT_BRACKET: ']',
+        GLFW_KEY_GRAVE_ACCENT: '`',
+        GLFW_KEY_0: '0',
+        GLFW_KEY_1: '1',
+        GLFW_KEY_2: '2',
+        GLFW_KEY_3: '3',
+        GLFW_KEY_4: '4',
+        GLFW_KEY_5: '5',
+        GLFW_KEY_6: '6',
+        GLFW_KEY_7: '7',
+        GLFW_KEY_8: '8',
+        GLFW_KEY_9: '9',
+        GLFW_KEY_SEMICOLON: ';',
     },
     SHIFT_PRESSED: {
-        GLFW_KEY_SPACE: "space",
-        GLFW_KEY_APOSTROPHE: "quotedbl",
-        GLFW_KEY_COMMA: "less",
-        GLFW_KEY_MINUS: "underscore",
-        GLFW_KEY_PERIOD: "greater",
-        GLFW_KEY_SLASH: "question",
-        GLFW_KEY_EQUAL: "plus",
-        GLFW_KEY_LEFT_BRACKET: "braceleft",
-        GLFW_KEY_BACKSLASH: "backslash",
-        GLFW_KEY_RIGHT_BRACKET: "braceright",
-        GLFW_KEY_GRAVE_ACCENT: "tilde",
-        GLFW_KEY_0: "parenright",
-        GLFW_KEY_1: "exclam",
-        GLFW_KEY_2: "at",
-        GLFW_KEY_3: "numbersign",
-        GLFW_KEY_4: "dollar",
-        GLFW_KEY_5: "percent",
-        GLFW_KEY_6: "circumflex",
-        GLFW_KEY_7: "ampersand",
-        GLFW_KEY_8: "asterisk",
-        GLFW_KEY_9: "parenleft",
-        GLFW_KEY_SEMICOLON: "colon",
+        GLFW_KEY_SPACE: ' ',
+        GLFW_KEY_APOSTROPHE: '"',
+        GLFW_KEY_COMMA: '<',
+        GLFW_KEY_MINUS: '_',
+        GLFW_KEY_PERIOD: '>',
+        GLFW_KEY_SLASH: '?',
+        GLFW_KEY_EQUAL: '+',
+        GLFW_KEY_LEFT_BRACKET: '{',
+        GLFW_KEY_BACKSLASH: '|',
+        GLFW_KEY_RIGHT_BRACKET: '}',
+        GLFW_KEY_GRAVE_ACCENT: '~',
+        GLFW_KEY_0: ')',
+        GLFW_KEY_1: '!',
+        GLFW_KEY_2: '@',
+        GLFW_KEY_3: '#',
+        GLFW_KEY_4: '$',
+        GLFW_KEY_5: '%',
+        GLFW_KEY_6: '^',
+        GLFW_KEY_7: '&',
+        GLFW_KEY_8: '*',
+        GLFW_KEY_9: '(',
+        GLFW_KEY_SEMICOLON: ':',
     },
 }
-
-CHAR_TO_GLYPH_NAME = {
-    ' ': "space",
-    '\'': "quotesingle",
-    ',': "comma",
-    '-': "minus",
-    '.': "period",
-    '/': "slash",
-    '=': "equal",
-    '[': "bracketleft",
-    '\\': "backslash",
-    ']': "bracketright",
-    '`': "grave",
-    '0': "zero",
-    '1': "one",
-    '2': "two",
-    '3': "three",
-    '4': "four",
-    '5': "five",
-    '6': "six",
-    '7': "seven",
-    '8': "eight",
-    '9': "nine",
-    ';': "semicolon", # TODO: not rendered properly
-    ' ': "space",
-    '"': "quotedbl",
-    '<': "less",
-    '_': "underscore",
-    '>': "greater",
-    '?': "question",
-    '+': "plus",
-    '{': "braceleft",
-    '\\': "backslash", # TODO: should be a pipe!
-    '}': "braceright",
-    '~': "tilde",
-    ')': "parenright",
-    '!': "exclam",
-    '@': "at",
-    '#': "numbersign",
-    '$': "dollar",
-    '%': "percent",
-    '^': "circumflex",
-    '&': "ampersand",
-    '*': "asterisk",
-    '(': "parenleft",
-    ':': "colon",
-}
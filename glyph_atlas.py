@@ -0,0 +1,77 @@
+from typing import Hashable
+import math
+import pyray as rl
+
+
+class GlyphAtlas:
+    """
+    glyphs are rasterized once into render textures (pages) and drawn as textured quads afterwards
+
+    regions are handed out with a simple shelf packer: glyphs are placed left to right on the current shelf,
+    a new shelf is started below when the row is full and a new page is created when the page is full
+    """
+
+    def __init__(self, page_size: int = 1024, padding: int = 1) -> None:
+        self.page_size = page_size
+        self.padding = padding
+        self.pages: list[rl.RenderTexture] = []
+        # key => (page index, region in the page, source rectangle to draw the region with)
+        self.entries: dict[Hashable, tuple[int, rl.Rectangle, rl.Rectangle]] = dict()
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self.shelf_height = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def _new_page(self):
+        page = rl.load_render_texture(self.page_size, self.page_size)
+        rl.begin_texture_mode(page)
+        rl.clear_background(rl.BLANK)
+        rl.end_texture_mode()
+        self.pages.append(page)
+        self.cursor_x, self.cursor_y, self.shelf_height = 0, 0, 0
+
+    def allocate(self, key: Hashable, width: int, height: int) -> tuple[rl.RenderTexture, rl.Rectangle]:
+        """
+        reserves a region for the glyph and returns the page to draw it into with the region in drawing coordinates.
+        the size is rounded up, so the right and bottom columns of a fractional size are not cut off
+        """
+        width, height = math.ceil(width), math.ceil(height)
+        if width > self.page_size or height > self.page_size:
+            raise ValueError(f"glyph of size {width}x{height} does not fit in an atlas page of {self.page_size}")
+
+        if not self.pages:
+            self._new_page()
+
+        if self.cursor_x + width > self.page_size:
+            # next shelf
+            self.cursor_x = 0
+            self.cursor_y += self.shelf_height + self.padding
+            self.shelf_height = 0
+
+        if self.cursor_y + height > self.page_size:
+            self._new_page()
+
+        region = rl.Rectangle(self.cursor_x, self.cursor_y, width, height)
+        # render textures are stored bottom-up, hence the flipped source rectangle
+        source = rl.Rectangle(self.cursor_x, self.page_size - self.cursor_y - height, width, -height)
+        self.entries[key] = (len(self.pages) - 1, region, source)
+
+        self.cursor_x += width + self.padding
+        self.shelf_height = max(self.shelf_height, height)
+        return self.pages[-1], region
+
+    def source(self, key: Hashable) -> tuple[rl.Texture, rl.Rectangle]:
+        """
+        texture and source rectangle to draw the glyph with, both are made once when the glyph is allocated
+        """
+        page_index, _, source = self.entries[key]
+        return self.pages[page_index].texture, source
+
+    def clear(self):
+        for page in self.pages:
+            rl.unload_render_texture(page)
+        self.pages = []
+        self.entries = dict()
+        self.cursor_x, self.cursor_y, self.shelf_height = 0, 0, 0
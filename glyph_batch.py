@@ -0,0 +1,310 @@
+from array import array
+from typing import Hashable, Iterable
+import math
+import pyray as rl
+from raylib import ffi
+
+# texels per row of the glyph data texture
+DATA_TEXTURE_WIDTH = 1024
+# floats per glyph instance: x, y, start of the glyph's record in the data texture
+INSTANCE_STRIDE = 3
+# glyphs are cut into horizontal bands of roughly this many pixels
+BAND_HEIGHT = 4
+MAX_BAND_COUNT = 64
+
+# two triangles covering the unit square, scaled to the glyph's size in the vertex shader
+QUAD_CORNERS = [
+    0, 0,  0, 1,  1, 1,
+    0, 0,  1, 1,  1, 0,
+]
+
+
+# kinds of glyph records
+RECORD_POLYLINES = 0
+RECORD_CURVES = 1
+
+
+def polyline_edges(polylines: list[tuple[float, float]], contour_starts: list[int], contour_lengths: list[int]) -> Iterable[tuple[int, float, float]]:
+    """
+    (index of the edge's first vertex, y_min, y_max) for every edge of the closed contours
+    """
+    for start, length in zip(contour_starts, contour_lengths):
+        for i in range(start, start + length - 1):
+            a, b = polylines[i], polylines[i + 1]
+            yield i, min(a[1], b[1]), max(a[1], b[1])
+
+
+def curve_edges(curves: list[tuple[tuple[float, float], tuple[float, float], tuple[float, float]]]) -> Iterable[tuple[int, float, float]]:
+    """
+    (index of the curve, y_min, y_max) for every y-monotonic curve
+    """
+    for i, (p0, _, p2) in enumerate(curves):
+        yield i, min(p0[1], p2[1]), max(p0[1], p2[1])
+
+
+def build_bands(edges: Iterable[tuple[int, float, float]], height: float) -> tuple[float, list[list[int]]]:
+    """
+    cuts the glyph into horizontal bands and lists the edges that intersect each band
+
+    a scanline can only be crossed by the edges of the band it falls into,
+    so the shader does not have to look at any of the other edges
+    """
+    band_count = max(1, min(MAX_BAND_COUNT, math.ceil(height / BAND_HEIGHT)))
+    band_height = max(height, 1) / band_count
+    bands: list[list[int]] = [[] for _ in range(band_count)]
+
+    for i, y_min, y_max in edges:
+        if y_min == y_max:
+            # horizontal edges never cross a scanline
+            continue
+        first = max(0, min(band_count - 1, int(y_min // band_height)))
+        last = max(0, min(band_count - 1, int(y_max // band_height)))
+        for band in range(first, last + 1):
+            bands[band].append(i)
+
+    return band_height, bands
+
+
+def pack_record(header: tuple, kind: int, band_height: float, bands: list[list[int]], contours: list[tuple[int, int]], vertex_texels: list[float]) -> list[float]:
+    """
+    a glyph record as the floats of its texels, 4 per texel (see GlyphBatch for the layout).
+    the offsets in it are relative to the record's start, so it can go anywhere in the data texture
+    """
+    bands_offset = 3
+    contours_offset = bands_offset + len(bands)
+    vertices_offset = contours_offset + len(contours)
+    edges_offset = vertices_offset + len(vertex_texels) // 4
+
+    record = list(header)
+    record.extend((len(bands), band_height, kind, 0))
+    record.extend((bands_offset, contours_offset, vertices_offset, 0))
+    for band in bands:
+        record.extend((edges_offset, len(band), 0, 0))
+        edges_offset += -(-len(band) // 4)
+
+    for start, length in contours:
+        record.extend((start, length, 0, 0))
+
+    record.extend(vertex_texels)
+
+    for band in bands:
+        record.extend(band)
+        # pad the band's edge list up to a full texel
+        record.extend([0] * (-len(band) % 4))
+    return record
+
+
+def polyline_record(width: float, height: float, vertices: list[tuple[float, float]], contour_starts: list[int], contour_lengths: list[int]) -> list[float]:
+    """
+    the RECORD_POLYLINES record of a glyph, vertices are the closed contours packed one after another in glyph-local coordinates
+    """
+    band_height, bands = build_bands(polyline_edges(vertices, contour_starts, contour_lengths), height)
+
+    vertex_texels = []
+    for x, y in vertices:
+        vertex_texels.extend((x, y))
+    # two vertices per texel
+    vertex_texels.extend([0] * (-len(vertex_texels) % 4))
+
+    contours = list(zip(contour_starts, contour_lengths))
+    return pack_record((len(contours), len(vertices), width, height), RECORD_POLYLINES, band_height, bands, contours, vertex_texels)
+
+
+def curve_record(width: float, height: float, curves: list[tuple[tuple[float, float], tuple[float, float], tuple[float, float]]]) -> list[float]:
+    """
+    the RECORD_CURVES record of a glyph: its quadratic curves as they are (lines have their midpoint as control point),
+    the shader intersects the scanlines with them analytically so nothing has to be flattened.
+    every curve has to be monotonic in y
+    """
+    band_height, bands = build_bands(curve_edges(curves), height)
+
+    curve_texels = []
+    for p0, p1, p2 in curves:
+        curve_texels.extend((p0[0], p0[1], p1[0], p1[1], p2[0], p2[1], 0, 0))
+
+    return pack_record((0, len(curves), width, height), RECORD_CURVES, band_height, bands, [], curve_texels)
+
+
+class GlyphBatch:
+    """
+    draws all the visible glyphs with a single instanced draw call
+
+    glyph outlines are uploaded once into a float texture (glyphData), every glyph gets a record in it
+    (offsets are in texels, relative to the start of the record):
+
+        0                   count_contour, vertex_count, width, height
+        1                   band_count, band_height, record kind, 0
+        2                   bands offset, contours offset, vertices offset, 0
+        bands offset        per band: edge list offset, edge count, 0, 0
+        contours offset     per contour: first vertex, vertex count, 0, 0
+        vertices offset     RECORD_POLYLINES: the closed polylines in glyph-local coordinates, two vertices per texel
+                            RECORD_CURVES: y-monotonic quadratic curves, two texels each (p0, p1), (p2, 0, 0)
+        edge list offsets   edge indices, 4 per texel
+
+    the contours are packed one after another (CSR layout) so there is no padding and no upper bound
+    on the number of vertices. every glyph instance on the screen is then just (x, y, record start)
+    in an instance buffer. the records are also used by the per-glyph (direct) shader
+    """
+
+    def __init__(self, shader: rl.Shader) -> None:
+        self.shader = shader
+        self.mvp_location = rl.get_shader_location(shader, "mvp")
+        self.glyph_data_location = rl.get_shader_location(shader, "glyphData")
+        self.texture_slot = ffi.new("int*", 0)
+
+        # key => start of the glyph's record in the data texture, in texels
+        self.records: dict[Hashable, int] = dict()
+        self.data = array("f")
+        self.data_texture_id = 0
+        # the data texture as a raylib struct for the per-glyph shader, made again when the data is uploaded
+        self.texture: rl.Texture = None
+        self.data_dirty = False
+
+        self.instances = array("f")
+        self.instance_count = 0
+        self.instance_capacity = 0
+
+        self.vao = rl.rl_load_vertex_array()
+        rl.rl_enable_vertex_array(self.vao)
+
+        corners = array("f", QUAD_CORNERS)
+        corners_buffer = ffi.from_buffer("float[]", corners)
+        self.corner_vbo = rl.rl_load_vertex_buffer(corners_buffer, len(corners) * corners.itemsize, False)
+        ffi.release(corners_buffer)
+        rl.rl_set_vertex_attribute(0, 2, rl.RL_FLOAT, False, 0, ffi.NULL)
+        rl.rl_enable_vertex_attribute(0)
+
+        self.instance_vbo = 0
+        self._reserve_instances(1024)
+        rl.rl_disable_vertex_array()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.records
+
+    def _reserve_instances(self, capacity: int):
+        """
+        (re)creates the instance buffer, has to be called with the vertex array bound
+        """
+        if self.instance_vbo:
+            rl.rl_unload_vertex_buffer(self.instance_vbo)
+        size = capacity * INSTANCE_STRIDE * 4
+        self.instance_vbo = rl.rl_load_vertex_buffer(ffi.NULL, size, True)
+        rl.rl_set_vertex_attribute(1, INSTANCE_STRIDE, rl.RL_FLOAT, False, 0, ffi.NULL)
+        rl.rl_set_vertex_attribute_divisor(1, 1)
+        rl.rl_enable_vertex_attribute(1)
+        self.instance_capacity = capacity
+
+    def add_glyph(self, key: Hashable, width: float, height: float, vertices: list[tuple[float, float]], contour_starts: list[int], contour_lengths: list[int]):
+        """
+        appends the glyph's record (see polyline_record) to the data texture, the texture is uploaded again before the next draw
+        """
+        self._add_record(key, polyline_record(width, height, vertices, contour_starts, contour_lengths))
+
+    def add_curve_glyph(self, key: Hashable, width: float, height: float, curves: list[tuple[tuple[float, float], tuple[float, float], tuple[float, float]]]):
+        """
+        appends the glyph's record made of quadratic curves (see curve_record)
+        """
+        self._add_record(key, curve_record(width, height, curves))
+
+    def _add_record(self, key: Hashable, record: list[float]):
+        self.records[key] = len(self.data) // 4
+        self.data.extend(record)
+        self.data_dirty = True
+
+    def record(self, key: Hashable) -> int:
+        return self.records[key]
+
+    def clear(self):
+        """
+        drops all the records (e.g. when the font size changes), the instances have to be built again
+        """
+        self.records = dict()
+        del self.data[:]
+        self.data_dirty = True
+        del self.instances[:]
+        self.instance_count = 0
+
+    def set_instances(self, instances):
+        """
+        replaces the instances at once with a float32 buffer of (x, y, record) rows, e.g. a (count, INSTANCE_STRIDE) numpy array
+        """
+        self.instances = array("f")
+        self.instances.frombytes(instances)
+        self.instance_count = len(self.instances) // INSTANCE_STRIDE
+
+    def upload_instances(self):
+        """
+        uploads the instances, only needed when they changed
+        """
+        if self.instance_count == 0:
+            return
+
+        if self.instance_count > self.instance_capacity:
+            rl.rl_enable_vertex_array(self.vao)
+            self._reserve_instances(max(self.instance_count, 2 * self.instance_capacity))
+            rl.rl_disable_vertex_array()
+
+        instances_buffer = ffi.from_buffer("float[]", self.instances)
+        rl.rl_update_vertex_buffer(self.instance_vbo, instances_buffer, len(self.instances) * self.instances.itemsize, 0)
+        ffi.release(instances_buffer)
+
+    def _upload_data(self):
+        if self.data_texture_id:
+            rl.rl_unload_texture(self.data_texture_id)
+
+        # pad up to full rows
+        texel_count = len(self.data) // 4
+        rows = max(1, -(-texel_count // DATA_TEXTURE_WIDTH))
+        self.data.extend([0.0] * (4 * (rows * DATA_TEXTURE_WIDTH - texel_count)))
+        data_buffer = ffi.from_buffer("float[]", self.data)
+        self.data_texture_id = rl.rl_load_texture(
+            data_buffer, DATA_TEXTURE_WIDTH, rows, rl.PIXELFORMAT_UNCOMPRESSED_R32G32B32A32, 1
+        )
+        ffi.release(data_buffer)
+        self.texture = rl.Texture(self.data_texture_id, DATA_TEXTURE_WIDTH, rows, 1, rl.PIXELFORMAT_UNCOMPRESSED_R32G32B32A32)
+        # drop the padding again, new records are appended right after the last one
+        del self.data[4 * texel_count:]
+        self.data_dirty = False
+
+    def data_texture(self) -> rl.Texture:
+        """
+        the glyph data texture with all the records added so far
+        """
+        if self.data_dirty:
+            self._upload_data()
+        return self.texture
+
+    def draw(self):
+        """
+        draws every instance with one draw call, uses the current modelview (e.g. camera) transform
+        """
+        if self.instance_count == 0:
+            return
+
+        if self.data_dirty:
+            self._upload_data()
+
+        # whatever raylib batched so far has to be drawn first
+        rl.rl_draw_render_batch_active()
+
+        rl.rl_enable_shader(self.shader.id)
+        mvp = rl.matrix_multiply(rl.rl_get_matrix_modelview(), rl.rl_get_matrix_projection())
+        rl.rl_set_uniform_matrix(self.mvp_location, mvp)
+
+        rl.rl_active_texture_slot(0)
+        rl.rl_enable_texture(self.data_texture_id)
+        rl.rl_set_uniform(self.glyph_data_location, self.texture_slot, rl.RL_SHADER_UNIFORM_INT, 1)
+
+        rl.rl_enable_vertex_array(self.vao)
+        rl.rl_draw_vertex_array_instanced(0, len(QUAD_CORNERS) // 2, self.instance_count)
+        rl.rl_disable_vertex_array()
+
+        rl.rl_disable_texture()
+        rl.rl_disable_shader()
+
+    def unload(self):
+        rl.rl_unload_vertex_array(self.vao)
+        rl.rl_unload_vertex_buffer(self.corner_vbo)
+        rl.rl_unload_vertex_buffer(self.instance_vbo)
+        if self.data_texture_id:
+            rl.rl_unload_texture(self.data_texture_id)
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+import math
+
+# font sizes are rounded to this fraction of a pixel per em, so that sizes that look the same share their glyphs
+SIZE_BUCKETS_PER_PIXEL = 4
+
+
+def size_bucket(pixels_per_em: float) -> float:
+    """
+    the size the glyphs are actually prepared and drawn at for the requested pixels per em
+    """
+    return max(1, round(pixels_per_em * SIZE_BUCKETS_PER_PIXEL)) / SIZE_BUCKETS_PER_PIXEL
+
+
+class GlyphCache:
+    """
+    least recently used cache with a memory budget
+
+    entries are keyed by (font, glyph id, size bucket) and every entry is stored together with its size in bytes.
+    when the total goes over the budget the least recently used entries are dropped until it fits again,
+    so switching between a few sizes keeps all of them around while zooming through many sizes
+    does not grow the memory without bound. the lock makes it safe to use from the layout threads
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+        self.entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable) -> Any:
+        """
+        the cached value or None, a hit makes the entry the most recently used one
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int):
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self.entries[key] = (value, size)
+            self.size += size
+            self._evict()
+
+    def _evict(self):
+        # the entry that was just added stays even if it's bigger than the whole budget
+        while self.size > self.budget and len(self.entries) > 1:
+            _, (_, size) = self.entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+
+    def resize(self, budget: int):
+        with self.lock:
+            self.budget = budget
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "size": self.size,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else math.nan,
+        }
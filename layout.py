@@ -0,0 +1,199 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing
+import os
+import numpy as np
+
+# how the lines are laid out, see ProgramState.layout_backend
+LAYOUT_BACKEND_SERIAL = "serial" # update_for_one_row for every line, one glyph at a time in python
+LAYOUT_BACKEND_VECTORIZED = "vectorized" # all the lines at once with numpy, see layout_glyphs
+LAYOUT_BACKEND_PROCESSES = "processes" # layout_glyphs split over a process pool, on shared memory
+LAYOUT_BACKENDS = [LAYOUT_BACKEND_VECTORIZED, LAYOUT_BACKEND_PROCESSES, LAYOUT_BACKEND_SERIAL]
+
+# columns of the layout, one row per glyph
+LAYOUT_X, LAYOUT_Y, LAYOUT_WIDTH, LAYOUT_HEIGHT, LAYOUT_LSB, LAYOUT_ADVANCE_WIDTH = range(6)
+LAYOUT_COLUMNS = 6
+
+# columns of a GlyphTable packed into shared memory for the worker processes, one row per glyph
+TABLE_ADVANCE_WIDTH, TABLE_LSB, TABLE_BOX, TABLE_HAS_OUTLINE = 0, 1, slice(2, 6), 6
+TABLE_COLUMNS = 7
+
+
+class GlyphTable:
+    """
+    what the layout needs to know about the glyphs, in font units, indexed by glyph id
+
+        advance_widths, left_side_bearings      from hmtx
+        boxes                                   (n, 4) x_min, y_min, x_max, y_max of the outline
+        has_outline                             False for glyphs like space, those get a 1 pixel tall box at (1, 1)
+    """
+
+    def __init__(self, advance_widths: np.ndarray, left_side_bearings: np.ndarray, boxes: np.ndarray, has_outline: np.ndarray) -> None:
+        self.advance_widths = advance_widths
+        self.left_side_bearings = left_side_bearings
+        self.boxes = boxes
+        self.has_outline = has_outline
+
+
+class LineLayout:
+    """
+    the laid out glyphs of a line as a structure of arrays instead of an object per glyph, in line-local coordinates
+
+        glyphs          glyph ids
+        positions       (glyph_count, LAYOUT_COLUMNS), see layout_glyphs
+        skip            True for the glyphs with nothing to fill (e.g. space)
+    """
+    __slots__ = ("glyphs", "positions", "skip")
+
+    def __init__(self, glyphs: np.ndarray, positions: np.ndarray, skip: np.ndarray) -> None:
+        self.glyphs = glyphs
+        self.positions = positions
+        self.skip = skip
+
+    def __len__(self) -> int:
+        return len(self.glyphs)
+
+
+def layout_glyphs(
+    glyphs: np.ndarray, line_lengths: np.ndarray, table: GlyphTable, scaling_factor: float, line_spacing: float, out: np.ndarray = None
+) -> np.ndarray:
+    """
+    the numpy version of update_for_one_row for many lines at once, glyphs are the glyphs of all the lines one after another.
+    returns (glyph_count, LAYOUT_COLUMNS) in line-local coordinates, like update_for_one_row
+
+    the pen moves by the advance width of every glyph, so x is just a running sum that starts over on every line
+    """
+    glyphs = np.asarray(glyphs, dtype=np.intp)
+    if out is None:
+        out = np.empty((len(glyphs), LAYOUT_COLUMNS), dtype=np.float64)
+    if len(glyphs) == 0:
+        return out
+
+    has_outline = table.has_outline[glyphs]
+    x_min, y_min, x_max, y_max = (table.boxes[glyphs, i] for i in range(4))
+    advance_widths = table.advance_widths[glyphs] * scaling_factor
+    left_side_bearings = table.left_side_bearings[glyphs] * scaling_factor
+
+    # the pen position before each glyph, the running sum is started over at the first glyph of every line
+    pen = np.cumsum(advance_widths) - advance_widths
+    line_starts = np.cumsum(line_lengths) - line_lengths
+    line_starts = line_starts[line_lengths > 0]
+    pen -= np.repeat(pen[line_starts], line_lengths[line_lengths > 0])
+
+    out[:, LAYOUT_X] = np.where(has_outline, pen + left_side_bearings, 1)
+    out[:, LAYOUT_Y] = np.where(has_outline, line_spacing - y_max * scaling_factor, 1)
+    out[:, LAYOUT_WIDTH] = np.where(has_outline, (x_max - x_min) * scaling_factor, advance_widths)
+    out[:, LAYOUT_HEIGHT] = np.where(has_outline, (y_max - y_min) * scaling_factor, 1)
+    out[:, LAYOUT_LSB] = left_side_bearings
+    out[:, LAYOUT_ADVANCE_WIDTH] = advance_widths
+    return out
+
+
+def _shared_table(buffer, glyph_count: int) -> GlyphTable:
+    """
+    the GlyphTable over a packed (glyph_count, TABLE_COLUMNS) buffer, the columns are views
+    """
+    packed = np.ndarray((glyph_count, TABLE_COLUMNS), dtype=np.float64, buffer=buffer)
+    return GlyphTable(packed[:, TABLE_ADVANCE_WIDTH], packed[:, TABLE_LSB], packed[:, TABLE_BOX], packed[:, TABLE_HAS_OUTLINE] != 0)
+
+
+def _layout_shared_chunk(
+    glyphs_name: str, out_name: str, table_name: str, glyph_count: int, table_size: int, first_glyph: int,
+    line_lengths: np.ndarray, scaling_factor: float, line_spacing: float
+):
+    """
+    runs in a worker process, lays out a range of whole lines straight into the shared output
+    """
+    glyphs_memory = shared_memory.SharedMemory(name=glyphs_name)
+    out_memory = shared_memory.SharedMemory(name=out_name)
+    table_memory = shared_memory.SharedMemory(name=table_name)
+    try:
+        last_glyph = first_glyph + int(line_lengths.sum())
+        glyphs = np.ndarray((glyph_count,), dtype=np.int32, buffer=glyphs_memory.buf)[first_glyph:last_glyph]
+        out = np.ndarray((glyph_count, LAYOUT_COLUMNS), dtype=np.float64, buffer=out_memory.buf)[first_glyph:last_glyph]
+        table = _shared_table(table_memory.buf, table_size)
+        layout_glyphs(glyphs, line_lengths, table, scaling_factor, line_spacing, out=out)
+        del glyphs, out, table
+    finally:
+        glyphs_memory.close()
+        out_memory.close()
+        table_memory.close()
+
+
+class ProcessLayout:
+    """
+    splits the lines into one chunk of roughly the same number of glyphs per worker and lays them out in parallel.
+    the glyphs, the glyph table and the result live in shared memory, only the line lengths are pickled.
+
+    the workers are spawned, not forked: the pool is started while the warm-up and disk cache threads are
+    running and the GL context exists, a forked child would inherit their locks and state. a spawned worker
+    imports the main module again, main.py only opens the window and the GL context under __main__
+    """
+
+    def __init__(self, workers: int = None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        # the table is copied in on every call, the glyphs' boxes change as they get loaded
+        self.table_memory: shared_memory.SharedMemory = None
+
+    def share_table(self, table: GlyphTable) -> int:
+        """
+        copies the table into the shared table segment, which is (re)created if it is too small. returns the glyph count
+        """
+        table_size = len(table.advance_widths)
+        size = max(1, table_size * TABLE_COLUMNS * 8)
+        if self.table_memory is None or self.table_memory.size < size:
+            self.free_table()
+            self.table_memory = shared_memory.SharedMemory(create=True, size=size)
+        packed = np.ndarray((table_size, TABLE_COLUMNS), dtype=np.float64, buffer=self.table_memory.buf)
+        packed[:, TABLE_ADVANCE_WIDTH] = table.advance_widths
+        packed[:, TABLE_LSB] = table.left_side_bearings
+        packed[:, TABLE_BOX] = table.boxes
+        packed[:, TABLE_HAS_OUTLINE] = table.has_outline
+        del packed
+        return table_size
+
+    def layout_glyphs(self, glyphs: np.ndarray, line_lengths: np.ndarray, table: GlyphTable, scaling_factor: float, line_spacing: float) -> np.ndarray:
+        glyph_count = len(glyphs)
+        if glyph_count == 0:
+            return np.empty((0, LAYOUT_COLUMNS), dtype=np.float64)
+
+        table_size = self.share_table(table)
+        glyphs_memory = shared_memory.SharedMemory(create=True, size=glyph_count * 4)
+        out_memory = shared_memory.SharedMemory(create=True, size=glyph_count * LAYOUT_COLUMNS * 8)
+        try:
+            np.ndarray((glyph_count,), dtype=np.int32, buffer=glyphs_memory.buf)[:] = glyphs
+
+            # chunks end at the line that crosses every 1/workers of the glyphs
+            line_ends = np.cumsum(line_lengths)
+            targets = np.arange(1, self.workers) * glyph_count // self.workers
+            bounds = np.concatenate(([0], np.searchsorted(line_ends, targets) + 1, [len(line_lengths)]))
+            bounds = np.unique(np.minimum(bounds, len(line_lengths)))
+
+            futures = []
+            for first_line, last_line in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+                first_glyph = int(line_ends[first_line - 1]) if first_line > 0 else 0
+                futures.append(self.executor.submit(
+                    _layout_shared_chunk, glyphs_memory.name, out_memory.name, self.table_memory.name, glyph_count,
+                    table_size, first_glyph, line_lengths[first_line:last_line], scaling_factor, line_spacing
+                ))
+            for future in futures:
+                future.result()
+
+            out = np.ndarray((glyph_count, LAYOUT_COLUMNS), dtype=np.float64, buffer=out_memory.buf).copy()
+        finally:
+            glyphs_memory.close()
+            glyphs_memory.unlink()
+            out_memory.close()
+            out_memory.unlink()
+        return out
+
+    def free_table(self):
+        if self.table_memory is not None:
+            self.table_memory.close()
+            self.table_memory.unlink()
+            self.table_memory = None
+
+    def shutdown(self):
+        self.executor.shutdown()
+        self.free_table()
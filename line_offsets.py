@@ -0,0 +1,116 @@
+from bisect import bisect_left, bisect_right
+import math
+
+
+class LineOffsets:
+    """
+    maps lines to their vertical position in the document and back
+
+    every line is one row tall unless it was given more rows (e.g. a wrapped line).
+    only those taller lines are stored: their indices in a sorted list together with the running
+    total of their extra rows, so both directions are binary searches and the memory
+    does not depend on the number of lines in the document
+    """
+
+    def __init__(self, row_height: float, line_count: int = 1) -> None:
+        self.row_height = row_height
+        self.line_count = line_count
+        self.tall_lines: list[int] = []
+        self.tall_rows: list[int] = []
+        # extra_rows[i] is the sum of the extra rows of tall_lines[:i+1]
+        self.extra_rows: list[int] = []
+
+    def _extra_rows_before(self, line: int) -> int:
+        i = bisect_left(self.tall_lines, line)
+        return self.extra_rows[i - 1] if i > 0 else 0
+
+    def _recount(self, start: int):
+        total = self.extra_rows[start - 1] if start > 0 else 0
+        del self.extra_rows[start:]
+        for rows in self.tall_rows[start:]:
+            total += rows - 1
+            self.extra_rows.append(total)
+
+    @property
+    def row_count(self) -> int:
+        return self.line_count + (self.extra_rows[-1] if self.extra_rows else 0)
+
+    @property
+    def height(self) -> float:
+        return self.row_count * self.row_height
+
+    def rows(self, line: int) -> int:
+        i = bisect_left(self.tall_lines, line)
+        if i < len(self.tall_lines) and self.tall_lines[i] == line:
+            return self.tall_rows[i]
+        return 1
+
+    def line_top(self, line: int) -> float:
+        """
+        document y of the top of the line
+        """
+        return (line + self._extra_rows_before(line)) * self.row_height
+
+    def line_at(self, y: float) -> int:
+        """
+        the line that covers the document y, clamped to the existing lines
+        """
+        row = max(0, math.floor(y / self.row_height))
+        # the row at which every tall line starts is increasing, so we can search over them
+        lo, hi = 0, len(self.tall_lines)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start_row = self.tall_lines[mid] + (self.extra_rows[mid - 1] if mid > 0 else 0)
+            if start_row <= row:
+                lo = mid + 1
+            else:
+                hi = mid
+        j = lo - 1
+        if j >= 0:
+            start_row = self.tall_lines[j] + (self.extra_rows[j - 1] if j > 0 else 0)
+            if row < start_row + self.tall_rows[j]:
+                return self.tall_lines[j]
+            line = row - self.extra_rows[j]
+        else:
+            line = row
+        return min(line, self.line_count - 1)
+
+    def visible_range(self, offset_y: float, screen_height: float) -> tuple[int, int]:
+        """
+        [first_line, last_line) of the lines that intersect the screen when the document is scrolled by offset_y,
+        one extra row above is included since glyph descenders reach into the next row
+        """
+        top = -offset_y - self.row_height
+        bottom = -offset_y + screen_height
+        return self.line_at(top), min(self.line_at(bottom) + 1, self.line_count)
+
+    def set_rows(self, line: int, rows: int):
+        i = bisect_left(self.tall_lines, line)
+        exists = i < len(self.tall_lines) and self.tall_lines[i] == line
+        if rows > 1 and exists:
+            self.tall_rows[i] = rows
+        elif rows > 1:
+            self.tall_lines.insert(i, line)
+            self.tall_rows.insert(i, rows)
+        elif exists:
+            del self.tall_lines[i]
+            del self.tall_rows[i]
+        else:
+            return
+        self._recount(i)
+
+    def insert_line(self, line: int):
+        """
+        a new one-row line is inserted before the given line
+        """
+        i = bisect_left(self.tall_lines, line)
+        for j in range(i, len(self.tall_lines)):
+            self.tall_lines[j] += 1
+        self.line_count += 1
+
+    def remove_line(self, line: int):
+        self.set_rows(line, 1)
+        i = bisect_right(self.tall_lines, line)
+        for j in range(i, len(self.tall_lines)):
+            self.tall_lines[j] -= 1
+        self.line_count -= 1
@@ -1,137 +1,189 @@
-from typing import Any, Self, Dict
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from fontTools.ttLib import TTFont
+from typing import Dict, Iterable
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import numpy as np
 import pyray as rl
 from raylib import ffi
 from glfw_constants import *
 from bezier import *
-
-# Open the TTF file
-# font = TTFont("./assets/EBGaramond/EBGaramond-Regular.ttf")
-font = TTFont("./assets/Fira_Code/static/FiraCode-Regular.ttf")
-
-# Access the glyph table
-glyf_table = font["glyf"]
-
-# hmtx contains the advance width for characters that have no contour like space
-HMTX_METRICS = font["hmtx"].__dict__["metrics"]
-
-ASCENT = font['hhea'].__dict__['ascent']
-UNIT_PER_EM = font['head'].__dict__['unitsPerEm']
+from text_buffer import TextBuffer, NEWLINE, new_line
+from line_offsets import LineOffsets
+from glyph_atlas import GlyphAtlas
+from glyph_batch import GlyphBatch, RECORD_POLYLINES, RECORD_CURVES, INSTANCE_STRIDE
+from outline import decode_glyphs, flatten_contours, bounding_box
+from glyph_cache import GlyphCache, size_bucket
+from disk_cache import FontCache, SizeCache, font_file_hash
+from truetype import TrueTypeFont, CompoundGlyph
+from profiler import FrameProfiler
+from rasterizer import Rasterizer, write_png
+from mapped_file import MappedLines
+from layout import (
+    GlyphTable, LineLayout, ProcessLayout, layout_glyphs, LAYOUT_BACKENDS, LAYOUT_BACKEND_SERIAL, LAYOUT_BACKEND_VECTORIZED, LAYOUT_BACKEND_PROCESSES,
+    LAYOUT_COLUMNS, LAYOUT_X, LAYOUT_Y, LAYOUT_WIDTH, LAYOUT_HEIGHT
+)
+
+# FONT_PATH = "./assets/EBGaramond/EBGaramond-Regular.ttf"
+FONT_PATH = "./assets/Fira_Code/static/FiraCode-Regular.ttf"
+FONT_HASH = font_file_hash(FONT_PATH)
+# the font file, glyphs are decoded from it when they are not in the disk cache
+FONT = TrueTypeFont(FONT_PATH)
+
+# the decoded font from the previous run, None on the first run or when the font or the cache format changed
+FONT_CACHE: FontCache = FontCache.load(FONT_HASH)
+# size bucket => flattened glyphs from the previous run (None if there are none), loaded on first use
+SIZE_CACHES: Dict[float, SizeCache] = dict()
+
+# the document, the metrics and the glyph caches refer to glyphs by their id (their index in GLYPH_ORDER)
+if FONT_CACHE is not None:
+    GLYPH_ORDER = FONT_CACHE.glyph_order
+    # codepoint => glyph id, for every character the font has a glyph for
+    CMAP = FONT_CACHE.cmap()
+    # hmtx contains the advance width for characters that have no contour like space
+    ADVANCE_WIDTHS = np.array(FONT_CACHE.advance_widths, dtype=np.int32)
+    LEFT_SIDE_BEARINGS = np.array(FONT_CACHE.left_side_bearings, dtype=np.int32)
+    ASCENT = FONT_CACHE.ascent
+    UNIT_PER_EM = FONT_CACHE.units_per_em
+else:
+    GLYPH_ORDER = FONT.glyph_order()
+    CMAP = FONT.cmap()
+    ADVANCE_WIDTHS = FONT.advance_widths
+    LEFT_SIDE_BEARINGS = FONT.left_side_bearings
+    ASCENT = FONT.ascent
+    UNIT_PER_EM = FONT.units_per_em
+GLYPH_COUNT = len(GLYPH_ORDER)
+# glyph id => (advance width, left side bearing), for the code that looks at one glyph at a time
+HMTX_METRICS = list(zip(ADVANCE_WIDTHS.tolist(), LEFT_SIDE_BEARINGS.tolist()))
+
+# drawn for the characters the font does not have
+MISSING_GLYPH = 0 # .notdef
+# codepoint => glyph id for the basic multilingual plane, so lines are mapped to glyphs with a single lookup
+CMAP_TABLE = np.full(0x10000, MISSING_GLYPH, dtype=np.uint16)
+CMAP_TABLE[[codepoint for codepoint in CMAP if codepoint < 0x10000]] = [glyph_id for codepoint, glyph_id in CMAP.items() if codepoint < 0x10000]
+# in font units, a line with fewer glyphs than the screen width / this can be neither clipped nor wrapped
+MAX_ADVANCE_WIDTH = int(ADVANCE_WIDTHS.max(initial=0))
+# clip_line looks at this many glyphs of a line first, then 4 times as many until it gets past the screen
+CLIP_CHUNK_SIZE = 256
+# the laid out lines further than this from the screen are dropped, so the memory follows the screen and not the file
+KEPT_LINES_AROUND_SCREEN = 512
+# soft wrapped rows break after the last of these that fits
+WORD_BREAK_GLYPHS = np.array([CMAP[ord(ch)] for ch in " -" if ord(ch) in CMAP], dtype=np.intp)
 MAGIC_FACTOR = 96 / 72 # 72 point font is 1 logical inches tall; 96 is the number of dots per logical inch
 
-# close the font file
-font.close()
-
-# key => (glyph_contours, dimensions)
-GLYPH_CONTOUR_CACHE: Dict[str, tuple[list['GlyphContour'], tuple[int, int, list[int, int, int, int]]]] = dict()
-
-
-TIMES_BENCHMARK = {
-    "update": [],
-    "update_key_loop": [],
-    "update_shader_prop": [],
-    "rendered_glyph_count": (0, 0)
-}
-
-DUMMY_PLACEHOLDER_VECTOR_2 = rl.Vector2(int(-666), int(-666))
+# glyph id => (glyph_contours, dimensions), in font units so it does not depend on the font size.
+# glyphs are decoded the first time they are needed (see GLYPH_LOADED), glyphs without an outline (e.g. space) stay None
+GLYPH_CONTOUR_CACHE: list[tuple[list['GlyphContour'], tuple[int, int, list[int, int, int, int]]]] = [None] * GLYPH_COUNT
+# the same per glyph id as numpy tables for the vectorized code: whether it's decoded, whether it has an outline
+# and its x_min, y_min, x_max, y_max
+GLYPH_LOADED = np.zeros(GLYPH_COUNT, dtype=bool)
+GLYPH_HAS_OUTLINE = np.zeros(GLYPH_COUNT, dtype=bool)
+GLYPH_BOXES = np.zeros((GLYPH_COUNT, 4), dtype=np.float64)
+# the layout reads the metrics of any glyph id straight from here, the boxes fill in as the glyphs are loaded
+GLYPH_TABLE = GlyphTable(ADVANCE_WIDTHS.astype(np.float64), LEFT_SIDE_BEARINGS.astype(np.float64), GLYPH_BOXES, GLYPH_HAS_OUTLINE)
+# (font, glyph id, size bucket) => the glyph's flattened outline at that size, see glyph_shape
+GLYPH_SHAPE_CACHE = GlyphCache(budget=32 * 1024 * 1024)
+
+
+# per frame timings of the phases of the main loop and counters, only recorded while enabled (see ProgramState)
+PROFILER = FrameProfiler(capacity=600)
+# the overlay's text is only rebuilt every this many frames
+PROFILER_OVERLAY_REFRESH_FRAMES = 15
+PROFILER_OVERLAY_PHASES = ["frame", "input", "culling", "glyph_loading", "layout", "shader_properties", "upload", "atlas_fill", "draw", "present"]
+
+# draws the glyphs on the CPU for render_to_image, keeps the coverage of every (glyph, size) it has drawn
+RASTERIZER = Rasterizer(budget=16 * 1024 * 1024)
 
 THREAD_POOL_EXECUTOR = ThreadPoolExecutor()
+# the disk cache is written by a single thread, writes never overlap and never pile up behind each other
+DISK_CACHE_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+# the worker processes of LAYOUT_BACKEND_PROCESSES, started the first time that backend is used
+PROCESS_LAYOUT: ProcessLayout = None
+
+# the glyphs of these codepoints are loaded in the background after startup
+WARM_UP_RANGES = [range(0x20, 0x7F), range(0xA0, 0x100)]
+WARM_UP_CHUNK_SIZE = 64
+
+# how the glyphs get filled
+RENDER_MODE_BATCHED = "batched" # every visible glyph in a single instanced draw call
+RENDER_MODE_CURVES = "curves" # same as batched, but the shader intersects the quadratic curves directly instead of the flattened polylines
+RENDER_MODE_DIRECT = "direct" # the winding number shader runs per glyph, one draw call each
+RENDER_MODE_ATLAS = "atlas" # every (glyph, size) is rasterized once into a texture atlas, then drawn as textured quads
+RENDER_MODES = [RENDER_MODE_BATCHED, RENDER_MODE_CURVES, RENDER_MODE_DIRECT, RENDER_MODE_ATLAS]
+BATCHED_RENDER_MODES = {RENDER_MODE_BATCHED, RENDER_MODE_CURVES}
+
+MIN_FONT_SIZE_IN_PTS = 4
+MAX_FONT_SIZE_IN_PTS = 200
+
+class GlyphShape:
+    """
+    the flattened outline of a glyph at one size, in glyph-local coordinates (bounding box at the origin, y down)
+
+    built once per (glyph, size) and shared by every instance of the glyph, the instances only differ in their position.
+    the contours are packed one after another into a flat vertex array (CSR layout),
+    every contour is closed by repeating its first vertex
+    """
 
-class GlyphBoundary:
-    def __init__(self, x: float, y: float, width: float, height: float, glyph_contours: list['GlyphContour']) -> None:
-        self.x = x
-        self.y = y
+    def __init__(self, width: float, height: float, vertices: np.ndarray, contour_starts: list[int], contour_lengths: list[int]) -> None:
         self.width = width
         self.height = height
-        self.rect = rl.Rectangle(x, y, width, height)
-        self.advance_width = None
-        self.lsb = None
-        self.glyph_contours = glyph_contours
+        # (vertex_count, 2) float32
+        self.vertices = vertices
+        self.contour_starts = contour_starts
+        self.contour_lengths = contour_lengths
+        self.polylines_length = len(vertices)
+        self.skip = len(vertices) == 0
+        # the same vertices as Vector2s, for raylib's drawing functions
+        self.polylines = ffi.new("Vector2[]", max(1, len(vertices)))
+        ffi.memmove(self.polylines, np.ascontiguousarray(vertices, dtype=np.float32), vertices.nbytes)
 
     @property
-    def rsb(self):
-        return self.advance_width - self.width - self.lsb
-
-    def em_square_width(self):
-        return self.lsb + self.width + self.rsb
-
-    def calculate_shader_properties(self):
-        len_contours_ref = ffi.new("int*")
-        len_contours_ref[0] = len(self.glyph_contours)
-        
-        polyline_max_count = 0
-        for c in self.glyph_contours:
-            polyline_max_count = max(polyline_max_count, len(c.polylines))
-        
-        if polyline_max_count == 0:
-            self.skip = True
-            return
-        
-        polyline_max_count += 1 # because we will be appending the first element to the end of the list, so +1
-
-        len_polyline_max_count_ref = ffi.new("int*")
-        len_polyline_max_count_ref[0] = polyline_max_count
-
-        total_polylines = polyline_max_count * len(self.glyph_contours)
-        all_polylines = ffi.new(f"Vector2[{total_polylines}]")
-        i = 0
-        for contour in self.glyph_contours:
-            # add existing points
-            for p in contour.polylines:
-                all_polylines[i] = p
-                i += 1
-
-            # add first point
-            all_polylines[i] = contour.polylines[0]
-            i += 1
-            # padding
-            right_side_padding_amount = polyline_max_count - (len(contour.polylines) + 1)
-            for _ in range(right_side_padding_amount):
-                all_polylines[i] = DUMMY_PLACEHOLDER_VECTOR_2
-                i += 1
-
-        self.offset = rl.Vector2(int(self.x), int(self.y))
-        self.count_contour = len_contours_ref
-        self.count_polyline = len_polyline_max_count_ref
-        self.polylines = all_polylines
-        self.polylines_length = len(all_polylines)
-        self.skip = False
-
-    def free(self):
-        ffi.release(self.count_contour)
-        ffi.release(self.count_polyline)
-        ffi.release(self.polylines)
+    def nbytes(self) -> int:
+        """
+        roughly the memory the shape holds on to: the vertices twice (array + Vector2s) and the contour table
+        """
+        return 2 * self.vertices.nbytes + 16 * len(self.contour_starts) + 256
 
 
 class GlyphContour:
     def __init__(
         self,
-        segments: list[list[tuple[int, int]]]
+        segments: np.ndarray
     ) -> None:
+        # (segment_count, 3, 2) quadratic curves in font units, see outline.decode_contours
         self.segments = segments
-        self.raw_polylines: list[rl.Vector2] = []
-        self.polylines: list[rl.Vector2] = []
-
-    def copy(self) -> Self:
-        gc = GlyphContour(self.segments)
-        gc.raw_polylines = self.raw_polylines
-        return gc
 
 
 class ProgramState:
     # draw flags
     draw_bounding_box = False
     draw_base_line = False
+    draw_profiler_overlay = False # F4, also turns the profiler on
     draw_outline = False
     draw_filled_font = True
+    render_mode = RENDER_MODE_BATCHED
+    layout_backend = LAYOUT_BACKEND_VECTORIZED # F3 cycles through LAYOUT_BACKENDS
+    layout_workers: int = None # processes of LAYOUT_BACKEND_PROCESSES, one per core if None
+    soft_wrap: bool = False # F6, long lines continue on the next rows instead of being cut off at the right edge of the screen
 
     # glyph content related
-    glyph_boundaries: list['GlyphBoundary'] = []
+    # line => its glyphs and their positions, laid out in line-local coordinates the first time the line is visible
+    # and kept across frames while the line is within KEPT_LINES_AROUND_SCREEN lines of the screen,
+    # a line is only laid out again when an edit touches it
+    line_layouts: dict[int, LineLayout] = dict()
+    line_offsets: LineOffsets = None
+    visible_lines: tuple[int, int] = (0, 0) # [first, last)
+    layout_version: int = 0 # bumped whenever line_layouts changes
+    dirty_lines: set[int] = set()
+    layout_dirty: bool = True # the whole document needs to be laid out, e.g. after loading
+    layout_width: float = None # the screen width the lines were clipped or wrapped at
+    # line => (layout_width, scaling_factor, where every row but the first starts) of the soft wrapped lines,
+    # kept across relayouts and only computed again when the line is edited or the width or font size changes
+    line_breaks: dict[int, tuple[float, float, list[int]]] = None
 
     # sizing and alignment
     font_size_in_pts = 16 # not really that robust: https://learn.microsoft.com/en-us/windows/win32/learnwin32/dpi-and-device-independent-pixels
+    dpi_scale: float = 1.0
+    size_bucket: float = None # pixels per em the glyphs are drawn at, see set_font_size
     scaling_factor = 1
     line_spacing: float = None
     base_y: int = -1
@@ -141,7 +193,7 @@ class ProgramState:
     text_height: float = None
     
     # user input
-    user_inputs: list[str] = []
+    text_buffer: TextBuffer = TextBuffer()
     shift_pressed: bool = False
     caps_lock_on: bool = False
     mouse_wheel_move: float = 0.0
@@ -149,163 +201,65 @@ class ProgramState:
     page_up: bool = False
 
     # misc
+    warm_up_glyph_cache: bool = True # load the glyphs of WARM_UP_RANGES in the background
+    use_disk_cache: bool = True # write the decoded and flattened glyphs to disk_cache.cache_directory() for the next run
+    glyph_cache_budget: int = 32 * 1024 * 1024 # bytes of flattened glyph outlines kept across all sizes
     texture: rl.Texture = None
+    glyph_atlas: GlyphAtlas = None
+    glyph_batch: GlyphBatch = None
+    # (visible_lines, layout_version, scaling_factor, render_mode) the instances of the glyph batch were built for
+    glyph_batch_state: tuple = None
+    profile_export_path: str = None # the profiler writes its numbers here every profile_export_interval frames, .csv or .json
+    profile_export_interval: int = 300
+    profiler_overlay_text: str = ""
+    screenshot_path: str = "phont.png" # F5 renders the screen on the CPU (render_to_image) into this file
 
 
 STATE = None
 
 
-def find_char_width_height(glyph_contours: list[GlyphContour]) -> tuple[int, int, list[int, int, int, int]]:
-    """
-    required for translation
-    """
-    x_min, x_max, y_min, y_max = float("Inf"), float("-Inf"), float("Inf"), float("-Inf")
-    for c in glyph_contours:
-        for segment in c.segments:
-            for v in segment:
-                x_min = min(x_min, v[0])
-                x_max = max(x_max, v[0])
-                y_min = min(y_min, v[1])
-                y_max = max(y_max, v[1])
-    # font_width, font_height, boundaries
-    return (x_max - x_min), (y_max - y_min), [x_min, y_min, x_max, y_max]
-
-
-def segments(coords, flags) -> list[list[tuple[int, int]]]:
-    """
-    given a set of points (coordinates) and flags indicating if they are on-curve or off-curve,
-    return the segments that form the glyph
-
-    this segment can either be a line or a quadratic bezier curve
-    lines have 2 points - start and end (both on-curve)
-    quadratic bezier curves have 3 points - 2 anchors (start and end, on-curve) and 1 control point (which is off-curve)
-    """
-    i = 0
-    all_segments = []
-    # there's a flag per coordinate
-    # the least significant bit in the flag indicates if the point is on-curve or off-curve
-    while i < len(flags):
-        segment = []
-        while i < len(flags):
-            on_curve = flags[i] & 1
-            if on_curve and segment == []:
-                # if this is an anchor indicating start
-                segment.append(coords[i])
-            elif not on_curve:
-                # if this is a control point
-                segment.append(coords[i])
-            elif on_curve and segment != []:
-                # if this is an anchor indicating end
-                segment.append(coords[i])
-
-                # if there are more than 3 total points
-                # it indicates that we have at least 2 control points
-                # eg: [p1, c1, c2, p2]
-                # since true-type fonts use quadratic bezier curves
-                # the encoding basically skips the middle anchor point
-                # but it can be calculated as the midpoint between 2 control points
-                #
-                # reference: https://stackoverflow.com/a/20772557/9985287
-                if len(segment) > 3:
-                    # add the first two points
-                    expanded_segment = [segment[0], segment[1]]
-
-                    for x in range(1, len(segment) - 2):
-                        c1, c2 = segment[x], segment[x + 1]
-                        # find the midpoint between two control points
-                        pnx = (c1[0] + c2[0]) // 2
-                        pny = (c1[1] + c2[1]) // 2
-                        pn = (pnx, pny)
-                        # add the midpoint and the next point
-                        expanded_segment.append(pn)
-                        expanded_segment.append(c2)
-                    # add the last point to the segment
-                    expanded_segment.append(segment[-1])
-
-                    # at this point expanded_segment has all the points/coordinates
-                    # we now need to extract quadratic bezier curves out of these
-                    point_count = len(expanded_segment)
-                    # basically it's a sliding window of size 3
-                    # elements are arranged as: p1 c2 p3 c4 p5 c6...
-                    # so we just have a window that'll capture
-                    #       p1 c2 p3
-                    #       p3 c4 p5
-                    #       etc.
-                    for x in range(0, point_count - 1, 2):
-                        pts = expanded_segment[x : x + 3]
-                        all_segments.append(pts)
-                else:
-                    all_segments.append(segment)
-                i -= 1  # go back because the end dot is actually shared between curves
-                break
-            i += 1
-        i += 1
-    return all_segments
-
-
-def handle_compound_glyphs(glyph: dict[str, Any]) -> list[GlyphContour]:
-    all_components = glyph["components"]
-
-    result: list[GlyphContour] = []
-    for component in all_components:
-        glyph_name, transformation = component.getComponentInfo()
-        g = glyf_table[glyph_name].__dict__
-        result.extend(all_contour_segments(g))
-
-    return result
-
-
-def all_contour_segments(glyph: dict[str, Any]) -> list[GlyphContour]:
-    coords = list(glyph["coordinates"])
-    flags = list(glyph["flags"])
-    # endPtsOfContours contains indices that indicate the end of a contour
-    # these are useful to extract out however many contours a particular glyph has
-    end_of_contours = list(glyph["endPtsOfContours"])
-
-    all_contours: list[GlyphContour] = []
-    start = 0
-    for end in end_of_contours:
-        segment_coords = coords[start : end + 1]
-        segment_coords = segment_coords + [
-            segment_coords[0]
-        ]  # include the first entry to close the loop
-
-        segment_flags = flags[start : end + 1]
-        segment_flags = segment_flags + [
-            segment_flags[0]
-        ]  # include the first entry to close the loop
-
-        all_segments_in_contour = segments(segment_coords, segment_flags)
-        contour = GlyphContour(segments=all_segments_in_contour)
-        all_contours.append(contour)
-        start = end + 1
-    return all_contours
-
-
 def grab_user_input():
     STATE.mouse_wheel_move = rl.get_mouse_wheel_move()
 
     while (keycode := rl.get_key_pressed()) != 0:
         if keycode == GLFW_KEY_BACKSPACE:
             # it's backspace
-            if len(STATE.user_inputs) > 0:
-                STATE.user_inputs.pop()
+            delete_key()
         elif keycode == GLFW_KEY_CAPS_LOCK:
             STATE.caps_lock_on = not STATE.caps_lock_on
         elif keycode == GLFW_KEY_ENTER:
-            STATE.user_inputs.append("phont_newline")
+            insert_key(NEWLINE)
         elif keycode == GLFW_KEY_PAGE_DOWN:
             STATE.page_down = True
         elif keycode == GLFW_KEY_PAGE_UP:
             STATE.page_up = True
+        elif keycode == GLFW_KEY_F2:
+            # cycle through the render modes
+            STATE.render_mode = RENDER_MODES[(RENDER_MODES.index(STATE.render_mode) + 1) % len(RENDER_MODES)]
+        elif keycode == GLFW_KEY_F4:
+            STATE.draw_profiler_overlay = not STATE.draw_profiler_overlay
+            update_profiler_enabled()
+        elif keycode == GLFW_KEY_F3:
+            # cycle through the layout backends, everything is laid out again with the new one
+            STATE.layout_backend = LAYOUT_BACKENDS[(LAYOUT_BACKENDS.index(STATE.layout_backend) + 1) % len(LAYOUT_BACKENDS)]
+            STATE.layout_dirty = True
+        elif keycode == GLFW_KEY_F6:
+            STATE.soft_wrap = not STATE.soft_wrap
+            STATE.layout_dirty = True
+        elif keycode == GLFW_KEY_F5:
+            write_png(STATE.screenshot_path, render_to_image())
+        elif keycode in (GLFW_KEY_EQUAL, GLFW_KEY_MINUS) and (
+            rl.is_key_down(GLFW_KEY_LEFT_CONTROL) or rl.is_key_down(GLFW_KEY_RIGHT_CONTROL)
+        ):
+            # ctrl + = zooms in, ctrl + - zooms out
+            step = 1 if keycode == GLFW_KEY_EQUAL else -1
+            set_font_size(max(MIN_FONT_SIZE_IN_PTS, min(MAX_FONT_SIZE_IN_PTS, STATE.font_size_in_pts + step)))
         else:
             STATE.shift_pressed = rl.is_key_down(GLFW_KEY_LEFT_SHIFT) or rl.is_key_down(
                 GLFW_KEY_RIGHT_SHIFT
             )
-            if keycode in GLFW_TO_GLYPH_NAME[STATE.shift_pressed]:
-                STATE.user_inputs.append(
-                    GLFW_TO_GLYPH_NAME[STATE.shift_pressed][keycode]
-                )
+            if keycode in GLFW_TO_CHAR[STATE.shift_pressed]:
+                insert_key(glyph_id(GLFW_TO_CHAR[STATE.shift_pressed][keycode]))
                 return
 
             if keycode >= GLFW_KEY_A and keycode <= GLFW_KEY_Z:
@@ -318,193 +272,465 @@ def grab_user_input():
                     keycode += 32
 
             if keycode not in NON_DRAWABLE_KEYS:
-                STATE.user_inputs.append(chr(keycode))
-
-
-def transform(
-    px, 
-    py, 
-    x_min: int, 
-    global_translate_x: float, 
-    global_translate_y: float
-) -> rl.Vector2:
-    px = px * STATE.scaling_factor
-    py = py * STATE.scaling_factor
-
-    # x_min shift
-    px = px - x_min * STATE.scaling_factor
-
-    # coord shift
-    px = px + global_translate_x
-    py = global_translate_y - py + STATE.offset_y
-
-    return px, py
-
-def add_generated_polylines(
-    contour: GlyphContour
-) -> list[rl.Vector2]:
-    polygon_vertices: list[rl.Vector2] = []
-    for segment in contour.segments:
-        curve = []
-        for point in segment:
-            p = rl.Vector2(point[0] * STATE.scaling_factor, point[1] * STATE.scaling_factor)
-            curve.append(p)
-
-        if len(curve) == 2:
-            polygon_vertices.extend(curve)
-        else:
-            curve_lines = produce_bezier_lines(*curve)
-            polygon_vertices.extend(curve_lines) 
-    
-    deduped = [polygon_vertices[0]]
+                insert_key(glyph_id(chr(keycode)))
 
-    for i, v in enumerate(polygon_vertices):
-        if i == 0:
-            continue
-        last = deduped[-1]
-        if v.x == last.x and v.y == last.y:
-            continue
-        else:
-            deduped.append(v)
-    
-    contour.raw_polylines = deduped
-
-def transform_translate(
-    v: rl.Vector2, 
-    x_min: int, 
-    global_translate_x: float, 
-    global_translate_y: float
-) -> rl.Vector2:
-    px, py = v.x, v.y
-    # x_min shift
-    px = px - x_min * STATE.scaling_factor
-
-    # coord shift
-    px = px + global_translate_x
-    py = global_translate_y - py + STATE.offset_y
-
-    return rl.Vector2(px, py)
-
-def update_single_glyph(
-    cached_result: tuple[list['GlyphContour'], tuple[int, int, list[int, int, int, int]]], 
-    advance_width, global_translate_x, global_translate_y
-) -> GlyphBoundary:
-    if cached_result is None:
-        # it's a space
-        bounding_box = GlyphBoundary(1, 1, advance_width, 1, [])
-        return bounding_box
-    
-    cached_contours, dimensions = cached_result
-    
-    glyph_contours = [c.copy() for c in cached_contours]
-    
-    font_width, font_height, boundaries = dimensions
-    x_min, y_min, x_max, y_max = boundaries
 
-    # transform contours + generate polylines
-    for contour in glyph_contours:
-        # translate
-        for point in contour.raw_polylines:
-            v = transform_translate(point, x_min, global_translate_x, global_translate_y)
-            contour.polylines.append(v)
-
-    minx, _ = transform(x_min, y_min, x_min, global_translate_x, global_translate_y)
-    _, maxy = transform(x_max, y_max, x_min, global_translate_x, global_translate_y)
-
-    return GlyphBoundary(
-        minx,
-        maxy,
-        font_width * STATE.scaling_factor,
-        font_height * STATE.scaling_factor,
-        glyph_contours
-    )
-
-
-def is_in_clipping_space(
-    user_inputs: list[str],
-    global_translate_y: float
-) -> int:
-    for key in user_inputs:
-        if key == "space":
-            continue
+def glyph_shape_key(key: int, bucket: float = None) -> tuple[str, int, float]:
+    return FONT_PATH, key, STATE.size_bucket if bucket is None else bucket
 
-        cached_result = GLYPH_CONTOUR_CACHE.get(key)
-        if cached_result:
-            font_width, font_height, boundaries = cached_result[1]
-            x_min, y_min, x_max, y_max = boundaries
-
-            # ww = font_width * STATE.scaling_factor
-            hh = font_height * STATE.scaling_factor
-            # minx, miny = transform(x_min, y_min, x_min, global_translate_x, global_translate_y)
-            maxx, maxy = transform(x_max, y_max, x_min, 0, global_translate_y)
-
-            # clipping the glyph outside of the screen
-            # stuff above the screen
-            if maxy + hh < 0:
-                return 2 # skip
-            
-            # stuff below the screen
-            if maxy > rl.get_screen_height():
-                return 1 # stop
-        
-        return 0 # continue
-    return 0 # continue
-
-
-def update_for_one_row(data):
-    global_translate_y: float = data[0]
-    user_inputs: list[str] = data[1]
-
-    global_translate_x = 0
-    total_width = 0
-    glyph_boundaries: list[GlyphBoundary] = []
-    for key in user_inputs:
-        cached_result = GLYPH_CONTOUR_CACHE.get(key)
-        if cached_result:
-            font_width, font_height, boundaries = cached_result[1]
-            x_min, y_min, x_max, y_max = boundaries
-
-            # ww = font_width * STATE.scaling_factor
-            hh = font_height * STATE.scaling_factor
-            # minx, miny = transform(x_min, y_min, x_min, global_translate_x, global_translate_y)
-            maxx, maxy = transform(x_max, y_max, x_min, global_translate_x, global_translate_y)
-
-            # clipping the glyph outside of the screen
-            # stuff above the screen
-            if maxy + hh < 0:
-                continue
-            
-            # stuff below the screen
-            if maxy > rl.get_screen_height():
-                break
+def glyph_shape(key: int) -> GlyphShape:
+    """
+    the glyph's outline at the current size with the bounding box at the origin, built the first time it's needed
+    """
+    shape = GLYPH_SHAPE_CACHE.get(glyph_shape_key(key))
+    if shape is None:
+        shape = build_glyph_shapes([key])[0]
+    return shape
+
+def glyph_id(ch: str) -> int:
+    return CMAP.get(ord(ch), MISSING_GLYPH)
+
+def line_keys(text: str) -> array:
+    """
+    glyph ids of a line of text without its newline, tabs are drawn as a single space
+    """
+    codepoints = np.frombuffer(text.replace('\r', '').replace('\t', ' ').encode("utf-32-le"), dtype=np.uint32)
+    glyphs = CMAP_TABLE[np.minimum(codepoints, 0xFFFF)]
+    beyond_table = codepoints > 0xFFFF
+    if beyond_table.any():
+        glyphs[beyond_table] = [CMAP.get(codepoint, MISSING_GLYPH) for codepoint in codepoints[beyond_table].tolist()]
+    return new_line(glyphs.tobytes())
+
+def glyph_ids(keys: Iterable[int]) -> np.ndarray:
+    """
+    a copy of the glyph ids of a line as a numpy array, a view would keep the line's array from growing
+    """
+    return np.array(keys, dtype=np.intp)
+
+def open_file(path: str):
+    """
+    shows the file: it's memory mapped and only the lines that get on the screen are decoded (see MappedLines)
+    """
+    # the file that was open before is unmapped
+    STATE.text_buffer.close()
+    STATE.text_buffer = TextBuffer(MappedLines(path, line_keys))
+    STATE.offset_y = 0.0
+    STATE.line_breaks = dict()
+    STATE.layout_dirty = True
+
+def load_glyph(key: int) -> tuple[list['GlyphContour'], tuple[int, int, list[int, int, int, int]]]:
+    """
+    the glyph's cache entry, the glyph is decoded if this is the first time it's needed
+    """
+    if not GLYPH_LOADED[key]:
+        prepare_glyphs([key])
+    return GLYPH_CONTOUR_CACHE[key]
+
+def store_glyph(key: int, contours: list[np.ndarray], dimensions: tuple[float, float, list[float]] = None):
+    """
+    puts the decoded segments of a glyph into the cache, contours is None for glyphs without an outline
+    """
+    if contours is not None:
+        dimensions = dimensions or bounding_box(contours)
+        GLYPH_CONTOUR_CACHE[key] = ([GlyphContour(contour_segments) for contour_segments in contours], dimensions)
+        GLYPH_BOXES[key] = dimensions[2]
+        GLYPH_HAS_OUTLINE[key] = True
+    else:
+        GLYPH_CONTOUR_CACHE[key] = None
+    GLYPH_LOADED[key] = True
+
+def clear_glyph_contour_cache():
+    GLYPH_LOADED[:] = False
+    GLYPH_HAS_OUTLINE[:] = False
+    GLYPH_BOXES[:] = 0
+    GLYPH_CONTOUR_CACHE[:] = [None] * GLYPH_COUNT
+
+def ensure_glyphs(keys: np.ndarray):
+    """
+    decodes and flattens the glyphs that are not loaded yet all at once, so the layout does not have to do it one by one
+    """
+    keys = np.unique(np.asarray(keys, dtype=np.intp))
+    missing = keys[~GLYPH_LOADED[keys]]
+    if len(missing):
+        prepare_glyphs(missing.tolist())
+
+    missing_shapes = [
+        key for key in keys[GLYPH_HAS_OUTLINE[keys]].tolist()
+        if GLYPH_SHAPE_CACHE.get(glyph_shape_key(key)) is None
+    ]
+    if missing_shapes:
+        build_glyph_shapes(missing_shapes)
+
+def flatten_glyphs(keys: list[int], scaling_factor: float) -> list[list[np.ndarray]]:
+    """
+    the closed polylines of every contour of the glyphs, all the glyphs are flattened together
+    """
+    all_contours = [c.segments for key in keys for c in GLYPH_CONTOUR_CACHE[key][0]]
+    polylines = flatten_contours(all_contours, scaling_factor)
+
+    result = []
+    start = 0
+    for key in keys:
+        count = len(GLYPH_CONTOUR_CACHE[key][0])
+        result.append(polylines[start : start + count])
+        start += count
+    return result
+
+def size_cache_for(bucket: float) -> SizeCache:
+    if FONT_CACHE is None:
+        return None
+    if bucket not in SIZE_CACHES:
+        SIZE_CACHES[bucket] = SizeCache.load(FONT_HASH, bucket)
+    return SIZE_CACHES[bucket]
+
+def save_disk_cache(bucket: float) -> tuple[FontCache, float, SizeCache]:
+    """
+    writes every glyph of the font to the disk cache: the decoded outlines once per font
+    and the flattened ones once per size, so the next run can skip decoding and flattening.
+    runs on DISK_CACHE_EXECUTOR, for the size at startup and the one in use on exit (not every size zoomed through).
+
+    the glyphs are decoded into local lists and the caches it wrote are only returned, the glyph tables and
+    FONT_CACHE belong to the main thread (see use_disk_cache). returns None if nothing could be written
+    """
+    try:
+        font_cache = FONT_CACHE if FONT_CACHE is not None else FontCache.load(FONT_HASH)
+        if font_cache is None:
+            outlines = decode_outlines(list(range(GLYPH_COUNT)), dict())
+            glyphs = [None if outlines[key] is None else (outlines[key], bounding_box(outlines[key])) for key in range(GLYPH_COUNT)]
+            del outlines
+            FontCache.write(FONT_HASH, UNIT_PER_EM, ASCENT, GLYPH_ORDER, ADVANCE_WIDTHS, LEFT_SIDE_BEARINGS, CMAP, glyphs)
+            del glyphs
+            font_cache = FontCache.load(FONT_HASH)
+
+        size_cache = SizeCache.load(FONT_HASH, bucket)
+        if size_cache is None:
+            contour_bounds = font_cache.contour_segments.tolist()
+            all_contours = [font_cache.segments[start:end] for start, end in zip(contour_bounds, contour_bounds[1:])]
+            SizeCache.write(FONT_HASH, bucket, flatten_contours(all_contours, bucket / UNIT_PER_EM))
+            size_cache = SizeCache.load(FONT_HASH, bucket)
+        return font_cache, bucket, size_cache
+    except OSError as e:
+        print(f"[WARN] could not write the glyph cache: {e}")
+        return None
+
+def use_disk_cache(saved: tuple[FontCache, float, SizeCache]):
+    """
+    switches to the caches save_disk_cache wrote, on the main thread. the glyphs loaded so far stay as they are,
+    the ones loaded from now on come from FONT_CACHE
+    """
+    global FONT_CACHE
+    if saved is None:
+        return
+    font_cache, bucket, size_cache = saved
+    if FONT_CACHE is None:
+        FONT_CACHE = font_cache
+    if SIZE_CACHES.get(bucket) is None:
+        SIZE_CACHES[bucket] = size_cache
+
+def build_glyph_shapes(keys: list[int]) -> list[GlyphShape]:
+    # the size is read once, the warm-up builds shapes in the background while the size may change
+    bucket = STATE.size_bucket
+    scaling_factor = bucket / UNIT_PER_EM
+
+    size_cache = size_cache_for(bucket)
+    if size_cache is not None:
+        # flattened in a previous run
+        all_polylines = [size_cache.glyph(FONT_CACHE, key) for key in keys]
+    else:
+        all_polylines = flatten_glyphs(keys, scaling_factor)
+
+    shapes = []
+    for key, polylines in zip(keys, all_polylines):
+        font_width, font_height, boundaries = GLYPH_CONTOUR_CACHE[key][1]
+        x_min, y_min, x_max, y_max = boundaries
+
+        closed_contours = [np.concatenate((p, p[:1])) for p in polylines if len(p)]
+        contour_lengths = [len(c) for c in closed_contours]
+        contour_starts = [sum(contour_lengths[:i]) for i in range(len(contour_lengths))]
+
+        if closed_contours:
+            # font units to pixels, y down, with the glyph's top left corner at the origin
+            points = np.concatenate(closed_contours).astype(np.float64)
+            points[:, 0] -= x_min * scaling_factor
+            points[:, 1] = y_max * scaling_factor - points[:, 1]
+            vertices = points.astype(np.float32)
+        else:
+            vertices = np.empty((0, 2), dtype=np.float32)
+
+        shape = GlyphShape(
+            font_width * scaling_factor, font_height * scaling_factor,
+            vertices, contour_starts, contour_lengths
+        )
+        GLYPH_SHAPE_CACHE.put(glyph_shape_key(key, bucket), shape, shape.nbytes)
+        shapes.append(shape)
+    return shapes
 
-            # TODO: horizontal clipping + word wrapping
 
+def update_for_one_row(line_spacing: float, keys: Iterable[int]) -> list[tuple[float, float, float, float, float, float]]:
+    """
+    the serial layout backend: the line one glyph at a time in python, one row of LAYOUT_COLUMNS per glyph like layout_glyphs
+    """
+    rows = []
+    pen = 0.0
+    for key in keys:
+        cached_result = load_glyph(key)
         advance_width, left_side_bearing = HMTX_METRICS[key]
-        left_side_bearing = left_side_bearing * STATE.scaling_factor
         advance_width = advance_width * STATE.scaling_factor
+        left_side_bearing = left_side_bearing * STATE.scaling_factor
 
-        global_translate_x += left_side_bearing
+        if cached_result is None:
+            # it's a space
+            rows.append((1, 1, advance_width, 1, left_side_bearing, advance_width))
+        else:
+            x_min, y_min, x_max, y_max = cached_result[1][2]
+            rows.append((
+                pen + left_side_bearing, line_spacing - y_max * STATE.scaling_factor,
+                (x_max - x_min) * STATE.scaling_factor, (y_max - y_min) * STATE.scaling_factor,
+                left_side_bearing, advance_width
+            ))
+        pen += advance_width
+    return rows
+
+def clip_line(keys: array, width: float) -> array:
+    """
+    the glyphs of the line that start left of the width, the ones after them are never laid out
+    """
+    if len(keys) * MAX_ADVANCE_WIDTH * STATE.scaling_factor <= width:
+        return keys
+    # only as much of the line as it takes to get past the width is looked at
+    count = CLIP_CHUNK_SIZE
+    while True:
+        pen = np.cumsum(ADVANCE_WIDTHS[glyph_ids(keys[:count])]) * STATE.scaling_factor
+        if pen[-1] >= width or count >= len(keys):
+            break
+        count *= 4
+    # glyph i starts where glyph i - 1 ends
+    return keys[: int(np.searchsorted(pen, width, side="left")) + 1]
+
+def line_breaks(line: int, keys: array, width: float) -> list[int]:
+    """
+    where the rows of the soft wrapped line start, without the first row. a row ends after the last
+    word break that fits into the width, words longer than a row are broken at the width
+    """
+    cached = STATE.line_breaks.get(line)
+    if cached is not None and cached[:2] == (width, STATE.scaling_factor):
+        return cached[2]
+
+    breaks = []
+    if len(keys) * MAX_ADVANCE_WIDTH * STATE.scaling_factor > width:
+        glyphs = glyph_ids(keys)
+        # the pen position after every glyph
+        pen = np.cumsum(ADVANCE_WIDTHS[glyphs] * STATE.scaling_factor)
+        word_breaks = np.flatnonzero(np.isin(glyphs, WORD_BREAK_GLYPHS))
+        start, row_x = 0, 0.0
+        while True:
+            # the first glyph that sticks out of the row, at least one glyph goes into every row
+            end = max(int(np.searchsorted(pen, row_x + width, side="right")), start + 1)
+            if end >= len(keys):
+                break
+            # a space that sticks out stays at the end of the row
+            i = int(np.searchsorted(word_breaks, end, side="right")) - 1
+            if i >= 0 and word_breaks[i] >= start:
+                end = int(word_breaks[i]) + 1
+            if end >= len(keys):
+                break
+            breaks.append(end)
+            start, row_x = end, pen[end - 1]
 
-        bounding_box = update_single_glyph(
-            cached_result, advance_width, global_translate_x, global_translate_y
-        )
-        glyph_boundaries.append(bounding_box)
-        
-        bounding_box.advance_width = advance_width
-        bounding_box.lsb = left_side_bearing
+    STATE.line_breaks[line] = (width, STATE.scaling_factor, breaks)
+    return breaks
 
-        total_width += bounding_box.em_square_width()
+def line_rows(missing_lines: list[tuple[int, array]]) -> list[list[array]]:
+    """
+    the keys of every row the lines are drawn in: one row clipped at the right edge of the screen,
+    or as many as needed with STATE.soft_wrap
+    """
+    rows = []
+    for line, keys in missing_lines:
+        if STATE.soft_wrap:
+            starts = [0] + line_breaks(line, keys, STATE.layout_width)
+            rows.append([keys[start:end] for start, end in zip(starts, starts[1:] + [len(keys)])])
+        else:
+            rows.append([clip_line(keys, STATE.layout_width)])
+    return rows
+
+def process_layout() -> ProcessLayout:
+    global PROCESS_LAYOUT
+    if PROCESS_LAYOUT is None or PROCESS_LAYOUT.workers != (STATE.layout_workers or PROCESS_LAYOUT.workers):
+        if PROCESS_LAYOUT is not None:
+            PROCESS_LAYOUT.shutdown()
+        PROCESS_LAYOUT = ProcessLayout(STATE.layout_workers)
+    return PROCESS_LAYOUT
+
+def layout_lines(lines: list[array]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    lays out the lines with STATE.layout_backend, the glyphs have to be loaded already (see ensure_glyphs).
+    returns the glyph ids and the positions (see layout_glyphs) of all the lines one after another,
+    every backend gives the same positions
+    """
+    glyphs = np.concatenate([glyph_ids(line) for line in lines] + [np.empty(0, dtype=np.intp)])
+    if STATE.layout_backend == LAYOUT_BACKEND_SERIAL:
+        positions = np.array([
+            row for keys in lines for row in update_for_one_row(STATE.line_spacing, keys)
+        ], dtype=np.float64).reshape(-1, LAYOUT_COLUMNS)
+        return glyphs, positions
+
+    line_lengths = np.array([len(line) for line in lines], dtype=np.intp)
+    if STATE.layout_backend == LAYOUT_BACKEND_PROCESSES:
+        positions = process_layout().layout_glyphs(glyphs.astype(np.int32), line_lengths, GLYPH_TABLE, STATE.scaling_factor, STATE.line_spacing)
+    else:
+        positions = layout_glyphs(glyphs, line_lengths, GLYPH_TABLE, STATE.scaling_factor, STATE.line_spacing)
+    return glyphs, positions
+
+def skipped_glyphs(glyphs: np.ndarray) -> np.ndarray:
+    """
+    True for the glyphs with nothing to fill at the current size, either no outline (e.g. space) or an empty one
+    """
+    keys, inverse = np.unique(glyphs, return_inverse=True)
+    skip = [not has_outline or glyph_shape(key).skip for key, has_outline in zip(keys.tolist(), GLYPH_HAS_OUTLINE[keys].tolist())]
+    return np.array(skip, dtype=bool)[inverse]
 
-        global_translate_x += (bounding_box.width + bounding_box.rsb)
-        bounding_box.calculate_shader_properties()
-    return glyph_boundaries
+def relayout():
+    """
+    drops all the laid out lines, only needed when the text is (re)loaded,
+    edits go through insert_key/delete_key which only touch the affected lines
+    """
+    STATE.line_layouts = dict()
+    STATE.layout_version += 1
+    STATE.line_offsets = LineOffsets(STATE.line_spacing, STATE.text_buffer.line_count)
+    STATE.dirty_lines = set()
+    if STATE.line_breaks is None:
+        STATE.line_breaks = dict()
+    if STATE.soft_wrap:
+        # the wrapped lines that were seen before keep their height, so the document does not jump
+        for line, (width, scaling_factor, breaks) in STATE.line_breaks.items():
+            if breaks and (width, scaling_factor) == (STATE.layout_width, STATE.scaling_factor):
+                STATE.line_offsets.set_rows(line, len(breaks) + 1)
+    update_text_height()
+    STATE.layout_dirty = False
+
+def set_font_size(font_size_in_pts: float):
+    """
+    changes the size the text is drawn at, the size is rounded to its bucket (see glyph_cache.size_bucket).
+    outlines that were flattened for a size before stay in GLYPH_SHAPE_CACHE,
+    the gpu side (glyph data texture, atlas) only keeps the current size
+    """
+    STATE.font_size_in_pts = font_size_in_pts
+    bucket = size_bucket(font_size_in_pts * MAGIC_FACTOR * STATE.dpi_scale)
+    if bucket == STATE.size_bucket:
+        return
 
-def update():
-    TIME_START_BENCH = time.monotonic()
-    # clear the lists
-    STATE.glyph_boundaries = []
+    STATE.size_bucket = bucket
+    STATE.scaling_factor = bucket / UNIT_PER_EM
+    STATE.line_spacing = ASCENT * STATE.scaling_factor * 1.2
+    STATE.layout_dirty = True
+    STATE.glyph_batch_state = None
+    if STATE.glyph_batch is not None:
+        STATE.glyph_batch.clear()
+    if STATE.glyph_atlas is not None:
+        STATE.glyph_atlas.clear()
+
+def update_text_height():
+    STATE.text_height = STATE.line_offsets.height * 1.2 # * 1.2 # this is to have some whitespace at the bottom
+
+def shift_lines(line: int, delta: int):
+    """
+    moves the laid out lines after the given line up or down, their layouts are line-local so they stay valid.
+    only the lines after the given one are renumbered, the tables are updated in place
+    """
+    for table in (STATE.line_layouts, STATE.line_breaks):
+        # moved in the order that never overwrites a line that has not been moved yet
+        for l in sorted((l for l in table if l > line), reverse=delta > 0):
+            table[l + delta] = table.pop(l)
+    moved = [l for l in STATE.dirty_lines if l > line]
+    STATE.dirty_lines.difference_update(moved)
+    STATE.dirty_lines.update(l + delta for l in moved)
+    STATE.layout_version += 1
+
+def insert_key(key: int):
+    """
+    inserts a key at the end of the document, only the touched lines get laid out again
+    """
+    line, column = STATE.text_buffer.end()
+    STATE.text_buffer.insert(line, column, key)
+    STATE.dirty_lines.add(line)
+    if key == NEWLINE:
+        shift_lines(line, 1)
+        STATE.line_offsets.insert_line(line + 1)
+        STATE.dirty_lines.add(line + 1)
+        update_text_height()
+
+def delete_key():
+    """
+    removes the last key of the document, only the touched lines get laid out again
+    """
+    line, column = STATE.text_buffer.end()
+    if line == 0 and column == 0:
+        return
+
+    key = STATE.text_buffer.delete(line, column)
+    if key == NEWLINE:
+        # the line gets merged into the previous one
+        STATE.line_layouts.pop(line, None)
+        STATE.line_breaks.pop(line, None)
+        STATE.dirty_lines.discard(line)
+        shift_lines(line, -1)
+        STATE.line_offsets.remove_line(line)
+        line -= 1
+        update_text_height()
+    STATE.dirty_lines.add(line)
 
+def update():
+    with PROFILER.phase("layout"):
+        # the lines are clipped or wrapped at the screen width
+        screen_width = float(rl.get_screen_width())
+        if screen_width != STATE.layout_width:
+            STATE.layout_width = screen_width
+            STATE.layout_dirty = True
+        if STATE.layout_dirty:
+            relayout()
+
+        # edited lines are laid out again once they are visible
+        for line in STATE.dirty_lines:
+            STATE.line_layouts.pop(line, None)
+            STATE.line_breaks.pop(line, None)
+            STATE.layout_version += 1
+        STATE.dirty_lines.clear()
+
+    with PROFILER.phase("culling"):
+        missing_lines = update_visible_lines()
+        rows = line_rows(missing_lines)
+
+    with PROFILER.phase("glyph_loading"):
+        ensure_glyphs(np.concatenate([glyph_ids(row) for row_keys in rows for row in row_keys] + [np.empty(0, dtype=np.intp)]))
+
+    if missing_lines:
+        with PROFILER.phase("layout"):
+            glyphs, positions = layout_lines([row for row_keys in rows for row in row_keys])
+            # the rows of a wrapped line are laid out separately and moved below each other
+            row_numbers = np.concatenate([np.arange(len(row_keys)) for row_keys in rows])
+            row_lengths = np.array([len(row) for row_keys in rows for row in row_keys], dtype=np.intp)
+            positions[:, LAYOUT_Y] += np.repeat(row_numbers * STATE.line_spacing, row_lengths)
+            skip = skipped_glyphs(glyphs)
+
+            # the lines laid out together share the arrays
+            line_ends = np.cumsum([sum(len(row) for row in row_keys) for row_keys in rows]).tolist()
+            rows_changed = False
+            for (line, _), row_keys, start, end in zip(missing_lines, rows, [0] + line_ends, line_ends):
+                STATE.line_layouts[line] = LineLayout(glyphs[start:end], positions[start:end], skip[start:end])
+                if STATE.line_offsets.rows(line) != len(row_keys):
+                    STATE.line_offsets.set_rows(line, len(row_keys))
+                    rows_changed = True
+            if rows_changed:
+                update_text_height()
+            STATE.layout_version += 1
+        PROFILER.count("laid_out_lines", len(missing_lines))
+
+def update_visible_lines() -> list[tuple[int, array]]:
+    """
+    scrolls, finds the lines on the screen and returns the ones that are not laid out yet as (line, keys)
+    """
+    # scrolling only moves the camera, the layout stays untouched
     min_y_allowed = float(rl.get_screen_height()) - STATE.text_height
     STATE.offset_y += STATE.mouse_wheel_move * 600 * rl.get_frame_time() #TODO: play around with the scroll speed
     if STATE.page_down:
@@ -515,135 +741,427 @@ def update():
         STATE.page_up = False
     STATE.offset_y = rl.clamp(STATE.offset_y, min_y_allowed, 0.0)
 
+    # only the lines on the screen are touched
+    first, last = STATE.line_offsets.visible_range(STATE.offset_y, rl.get_screen_height())
+    STATE.visible_lines = (first, last)
+    drop_distant_lines()
 
-    lines = []
-    current = []
-    Y_LINE = STATE.line_spacing
-    for key in STATE.user_inputs:
-        if key == "phont_newline":
-            situation = is_in_clipping_space(current, Y_LINE)
+    return [
+        (line, keys) for line, keys in enumerate(STATE.text_buffer.lines(first, last), start=first)
+        if line not in STATE.line_layouts
+    ]
 
-            if situation == 1: # glyphs are below clipping space
-                break
-            elif situation == 2: # glyphs are above clipping space
-                current = []
-                Y_LINE += STATE.line_spacing
-                continue
-            else: # glyphs are within clipping space
-                lines.append(
-                    (Y_LINE, current)
-                )
-                current = []
-                Y_LINE += STATE.line_spacing
-        else:
-            current.append(key)
+def drop_distant_lines():
+    """
+    forgets the layouts, line breaks and dirty flags of the lines more than KEPT_LINES_AROUND_SCREEN lines away
+    from the screen. the lines are only looked at once there are twice as many as what is kept,
+    so it's not a pass over them every frame
+    """
+    first, last = STATE.visible_lines
+    low, high = first - KEPT_LINES_AROUND_SCREEN, last + KEPT_LINES_AROUND_SCREEN
+    limit = high - low + 2 * KEPT_LINES_AROUND_SCREEN
+    if len(STATE.line_layouts) > limit:
+        for line in [line for line in STATE.line_layouts if not low <= line < high]:
+            del STATE.line_layouts[line]
+        STATE.layout_version += 1
+    if len(STATE.line_breaks) > limit:
+        for line in [line for line in STATE.line_breaks if not low <= line < high]:
+            del STATE.line_breaks[line]
+    if len(STATE.dirty_lines) > limit:
+        # a dirty line's layout goes with its flag, or it would be drawn stale once it's back on the screen
+        for line in [line for line in STATE.dirty_lines if not low <= line < high]:
+            STATE.dirty_lines.discard(line)
+            STATE.line_layouts.pop(line, None)
+            STATE.line_breaks.pop(line, None)
+
+def visible_line_layouts():
+    """
+    yields (line_top_y, line_layout) for the lines that intersect the screen with the current scroll offset
+    """
+    first, last = STATE.visible_lines
+    for line in range(first, last):
+        line_layout = STATE.line_layouts.get(line)
+        if line_layout is not None:
+            yield STATE.line_offsets.line_top(line), line_layout
 
-    futures = []
-    for data in lines:
-        futures.append(THREAD_POOL_EXECUTOR.submit(update_for_one_row, data))
+def visible_instances() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (x, y, glyph id) of every glyph on the screen that has something to fill, in document coordinates.
+    the arrays of the visible lines are put together, there is no python object per glyph
+    """
+    xs, ys, glyphs = [np.empty(0)], [np.empty(0)], [np.empty(0, dtype=np.intp)]
+    for line_top_y, line_layout in visible_line_layouts():
+        filled = ~line_layout.skip
+        xs.append(line_layout.positions[filled, LAYOUT_X])
+        ys.append(line_layout.positions[filled, LAYOUT_Y] + line_top_y)
+        glyphs.append(line_layout.glyphs[filled])
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(glyphs)
+
+def visible_glyphs() -> list[int]:
+    """
+    the distinct glyph ids on the screen that have something to fill
+    """
+    return np.unique(visible_instances()[2]).tolist()
 
-    for future in as_completed(futures):
-        STATE.glyph_boundaries.extend(future.result())
+# the structs the per-glyph draw calls take, allocated once and filled in for every glyph
+GLYPH_START_REF = ffi.new("int*")
+GLYPH_SOURCE = rl.Rectangle(0, 0, 0, 0)
+GLYPH_POSITION = rl.Vector2(0, 0)
+BOUNDING_BOX = rl.Rectangle(0, 0, 0, 0)
+CAMERA = rl.Camera2D(rl.Vector2(0, 0), rl.Vector2(0, 0), 0.0, 1.0)
 
-    STATE.text_height = (STATE.user_inputs.count("phont_newline") + 1) * STATE.line_spacing * 1.2 # * 1.2 # this is to have some whitespace at the bottom
+def draw_filled_glyph(record: int, width: float, height: float, x: float, y: float, shader, glyph_start_location, glyph_data_location):
+    """
+    fills the glyph by running the winding number shader over its bounding box drawn at (x, y),
+    the outline comes from the glyph's record in the glyph data texture
+    """
+    PROFILER.count("draw_calls")
+    GLYPH_START_REF[0] = record
+    rl.set_shader_value(shader, glyph_start_location, GLYPH_START_REF, rl.ShaderUniformDataType.SHADER_UNIFORM_INT)
+    rl.set_shader_value_texture(shader, glyph_data_location, STATE.glyph_batch.data_texture())
 
-    TIMES_BENCHMARK["update"].append(
-        time.monotonic() - TIME_START_BENCH
-    )
-    TIMES_BENCHMARK["rendered_glyph_count"] = len(STATE.glyph_boundaries)
+    rl.begin_shader_mode(shader)
 
-def render_glyph(shader, polylines_location, count_contour_location, count_polyline_location, offset_location):
-    rl.begin_drawing()
-    rl.clear_background(rl.BLACK)
+    # +1 because we wanna draw the bottom and right parts correctly, it clamps them if we don't add +something_positive_int
+    GLYPH_SOURCE.width, GLYPH_SOURCE.height = width + 1, height + 1
+    GLYPH_POSITION.x, GLYPH_POSITION.y = x, y
+    rl.draw_texture_rec(STATE.texture, GLYPH_SOURCE, GLYPH_POSITION, rl.WHITE)
+
+    rl.end_shader_mode()
+
+def glyph_key(key: int):
+    return key, STATE.scaling_factor
 
-    if STATE.draw_bounding_box:
-        for gb in STATE.glyph_boundaries:
-            rl.draw_rectangle_lines_ex(gb.rect, 1.0, rl.BLUE)
-            xmin = int(gb.x - gb.lsb)
-            ymin = int(gb.y)
-            rl.draw_rectangle_lines(
-                xmin, ymin, int(gb.advance_width), int(gb.height), rl.GREEN
+def glyph_record(key: int, kind: int) -> int:
+    """
+    start of the glyph's record in the glyph data texture, the record is built the first time the (glyph, size) is seen
+    """
+    batch = STATE.glyph_batch
+    record_key = glyph_key(key) + (kind,)
+    if record_key not in batch:
+        shape = glyph_shape(key)
+        if kind == RECORD_CURVES:
+            batch.add_curve_glyph(record_key, shape.width, shape.height, glyph_local_curves(key))
+        else:
+            batch.add_glyph(
+                record_key, shape.width, shape.height,
+                shape.vertices.tolist(), shape.contour_starts, shape.contour_lengths
             )
+    return batch.record(record_key)
 
-    for gb in STATE.glyph_boundaries:
-        if STATE.draw_filled_font:
-            if gb.skip:
-                continue
+def add_glyph_records(kind: int):
+    """
+    makes sure the visible glyphs have their records, so the data texture is uploaded once before drawing
+    """
+    for key in visible_glyphs():
+        glyph_record(key, kind)
 
-            rl.set_shader_value(shader, offset_location, gb.offset, rl.ShaderUniformDataType.SHADER_UNIFORM_VEC2)
-            rl.set_shader_value(shader, count_contour_location, gb.count_contour, rl.ShaderUniformDataType.SHADER_UNIFORM_INT)
-            rl.set_shader_value(shader, count_polyline_location, gb.count_polyline, rl.ShaderUniformDataType.SHADER_UNIFORM_INT)
-            rl.set_shader_value_v(shader, polylines_location, gb.polylines, rl.ShaderUniformDataType.SHADER_UNIFORM_VEC2, gb.polylines_length)
+def glyph_local_curves(key: int) -> list[tuple[tuple[float, float], tuple[float, float], tuple[float, float]]]:
+    """
+    the glyph's segments as y-monotonic quadratic curves with the bounding box at the origin,
+    lines already have their midpoint as the control point
+    """
+    glyph_contours, dimensions = GLYPH_CONTOUR_CACHE[key]
+    x_min, y_min, x_max, y_max = dimensions[2]
 
-            rl.begin_shader_mode(shader)
+    def to_local(point):
+        return (point[0] - x_min) * STATE.scaling_factor, (y_max - point[1]) * STATE.scaling_factor
 
-            source = rl.Rectangle(0, 0, gb.width+1, gb.height+1) # +1 because we wanna draw the bottom and right parts correctly, it clamps them if we don't add +something_positive_int
-            rl.draw_texture_rec(STATE.texture, source, rl.Vector2(gb.x, gb.y), rl.WHITE)
+    curves = []
+    for contour in glyph_contours:
+        for segment in contour.segments.tolist():
+            curves.extend(split_monotonic_y(*(to_local(p) for p in segment)))
+    return curves
 
-            rl.end_shader_mode()
-        
-        gb.free()
-                        
-        # draw the outline
-        if STATE.draw_outline:
-            for contour in gb.glyph_contours:
-                for pi in range(len(contour.polylines)):
-                    s, e = contour.polylines[pi], contour.polylines[(pi+1)%len(contour.polylines)]
-                    rl.draw_line_v(s, e, rl.GREEN)
-                    rl.draw_circle_v(s, 0.5, rl.RED)
-                    rl.draw_circle_v(e, 0.5, rl.RED)
+def fill_glyph_atlas(shader, glyph_start_location, glyph_data_location):
+    """
+    rasterizes the visible glyphs that are not in the atlas yet, every (glyph, size) is rasterized only once.
+    has to run before drawing starts since texture mode resets the camera transform
+    """
+    for key in visible_glyphs():
+        if glyph_key(key) in STATE.glyph_atlas:
+            continue
+
+        shape = glyph_shape(key)
+        page, region = STATE.glyph_atlas.allocate(glyph_key(key), shape.width + 1, shape.height + 1)
+        rl.begin_texture_mode(page)
+        # the coverage is written as is, blending would square the alpha
+        rl.rl_disable_color_blend()
+        draw_filled_glyph(
+            glyph_record(key, RECORD_POLYLINES), shape.width, shape.height, region.x, region.y, 
+            shader, glyph_start_location, glyph_data_location
+        )
+        rl.rl_enable_color_blend()
+        rl.end_texture_mode()
+
+def build_glyph_batch() -> bool:
+    """
+    collects the instances of the visible glyphs in document coordinates,
+    glyphs seen for the first time get their outlines added to the batch's data texture.
+    False if nothing changed since the last frame, otherwise the instances have to be uploaded (upload_instances)
+    """
+    batch_state = (STATE.visible_lines, STATE.layout_version, STATE.scaling_factor, STATE.render_mode)
+    if STATE.glyph_batch_state == batch_state:
+        return False
+    STATE.glyph_batch_state = batch_state
+
+    xs, ys, glyphs = visible_instances()
+    keys, inverse = np.unique(glyphs, return_inverse=True)
+    kind = RECORD_CURVES if STATE.render_mode == RENDER_MODE_CURVES else RECORD_POLYLINES
+    records = np.array([glyph_record(key, kind) for key in keys.tolist()], dtype=np.float32)
+
+    instances = np.empty((len(glyphs), INSTANCE_STRIDE), dtype=np.float32)
+    instances[:, 0] = xs
+    instances[:, 1] = ys
+    instances[:, 2] = records[inverse]
+    STATE.glyph_batch.set_instances(instances)
+    return True
+
+def render_to_image(width: int = None, height: int = None) -> np.ndarray:
+    """
+    the visible glyphs filled on the CPU (see rasterizer.py) as a (height, width) float32 image, white text on black.
+    same coverage as the shaders and the same scroll offset as the window, but no GPU or window is needed
+    """
+    width = rl.get_screen_width() if width is None else width
+    height = rl.get_screen_height() if height is None else height
+    xs, ys, glyphs = visible_instances()
+    return RASTERIZER.render(xs, ys + STATE.offset_y, glyphs, lambda key: (glyph_key(key), glyph_shape(key)), width, height)
+
+def render_glyph(shader, glyph_start_location, glyph_data_location):
+    instances_changed = False
+    with PROFILER.phase("shader_properties"):
+        if STATE.draw_filled_font and STATE.render_mode in (RENDER_MODE_ATLAS, RENDER_MODE_DIRECT):
+            add_glyph_records(RECORD_POLYLINES)
+        elif STATE.draw_filled_font and STATE.render_mode in BATCHED_RENDER_MODES:
+            instances_changed = build_glyph_batch()
+
+    if STATE.draw_filled_font:
+        with PROFILER.phase("upload"):
+            if instances_changed:
+                STATE.glyph_batch.upload_instances()
+            if STATE.glyph_batch.data_dirty:
+                # the records added this frame
+                STATE.glyph_batch.data_texture()
+
+    if STATE.draw_filled_font and STATE.render_mode == RENDER_MODE_ATLAS:
+        with PROFILER.phase("atlas_fill"):
+            fill_glyph_atlas(shader, glyph_start_location, glyph_data_location)
+
+    with PROFILER.phase("draw"):
+        draw_glyphs(shader, glyph_start_location, glyph_data_location)
+
+    with PROFILER.phase("present"):
+        rl.end_drawing()
+
+def draw_glyphs(shader, glyph_start_location, glyph_data_location):
+    rl.begin_drawing()
+    rl.clear_background(rl.BLACK)
+
+    # the layout lives in document coordinates, scrolling is a single camera translation
+    CAMERA.offset.y = STATE.offset_y
+    rl.begin_mode_2d(CAMERA)
+
+    if STATE.draw_filled_font and STATE.render_mode in BATCHED_RENDER_MODES and STATE.glyph_batch.instance_count:
+        STATE.glyph_batch.draw()
+        PROFILER.count("draw_calls")
 
+    # the batched modes fill every glyph with the draw call above, python only goes over the glyphs one by one
+    # for the modes that draw a glyph per call and for the outlines
+    fill_one_by_one = STATE.draw_filled_font and STATE.render_mode in (RENDER_MODE_DIRECT, RENDER_MODE_ATLAS)
+    draw_one_by_one = fill_one_by_one or STATE.draw_outline
+
+    rendered_glyph_count = 0
+    for line_top_y, line_layout in visible_line_layouts():
+        rendered_glyph_count += len(line_layout)
+        if not (draw_one_by_one or STATE.draw_bounding_box):
+            continue
+        # lines are laid out in line-local coordinates
+        rl.rl_push_matrix()
+        rl.rl_translatef(0, line_top_y, 0)
+
+        if STATE.draw_bounding_box:
+            for x, y, width, height, lsb, advance_width in line_layout.positions.tolist():
+                BOUNDING_BOX.x, BOUNDING_BOX.y, BOUNDING_BOX.width, BOUNDING_BOX.height = x, y, width, height
+                rl.draw_rectangle_lines_ex(BOUNDING_BOX, 1.0, rl.BLUE)
+                rl.draw_rectangle_lines(int(x - lsb), int(y), int(advance_width), int(height), rl.GREEN)
+
+        # only the glyphs with something to fill from here on
+        filled = ~line_layout.skip
+        glyphs = zip(
+            line_layout.glyphs[filled].tolist(),
+            *(line_layout.positions[filled, column].tolist() for column in (LAYOUT_X, LAYOUT_Y, LAYOUT_WIDTH, LAYOUT_HEIGHT))
+        ) if draw_one_by_one else ()
+        for key, x, y, width, height in glyphs:
+            if fill_one_by_one:
+                if STATE.render_mode == RENDER_MODE_ATLAS:
+                    texture, source = STATE.glyph_atlas.source(glyph_key(key))
+                    # the same fractional position the other modes draw the glyph at
+                    GLYPH_POSITION.x, GLYPH_POSITION.y = x, y
+                    rl.draw_texture_rec(texture, source, GLYPH_POSITION, rl.WHITE)
+                else:
+                    draw_filled_glyph(
+                        glyph_record(key, RECORD_POLYLINES), width, height, x, y, 
+                        shader, glyph_start_location, glyph_data_location
+                    )
+
+            # draw the outline, the shape is in glyph-local coordinates
+            if STATE.draw_outline:
+                shape = glyph_shape(key)
+                rl.rl_push_matrix()
+                rl.rl_translatef(x, y, 0)
+                for start, length in zip(shape.contour_starts, shape.contour_lengths):
+                    for pi in range(start, start + length - 1):
+                        s, e = shape.polylines[pi], shape.polylines[pi + 1]
+                        rl.draw_line_v(s, e, rl.GREEN)
+                        rl.draw_circle_v(s, 0.5, rl.RED)
+                        rl.draw_circle_v(e, 0.5, rl.RED)
+                rl.rl_pop_matrix()
+
+        rl.rl_pop_matrix()
+    PROFILER.count("glyphs", rendered_glyph_count)
+
+    rl.end_mode_2d()
 
     if STATE.draw_base_line:
         rl.draw_line(0, STATE.base_y, rl.get_screen_width(), STATE.base_y, rl.RED)
-    rl.end_drawing()
+    if STATE.draw_profiler_overlay:
+        draw_profiler_overlay()
+
+def update_profiler_enabled():
+    PROFILER.enabled = STATE.draw_profiler_overlay or STATE.profile_export_path is not None
+
+def profiler_overlay_text() -> str:
+    summary = PROFILER.summary()
+    lines = [f"{'phase':<18}{'p50':>8}{'p95':>8}{'p99':>8}  ms, last {min(PROFILER.frames, PROFILER.capacity)} frames"]
+    for name in PROFILER_OVERLAY_PHASES:
+        if name in summary["phases"]:
+            stats = summary["phases"][name]
+            lines.append(f"{name:<18}{stats['p50']:>8.2f}{stats['p95']:>8.2f}{stats['p99']:>8.2f}")
+    for name, stats in sorted(summary["counters"].items()):
+        lines.append(f"{name:<18}{stats['p50']:>8.0f}{stats['p95']:>8.0f}{stats['p99']:>8.0f}")
+    return "\n".join(lines)
+
+def draw_profiler_overlay():
+    """
+    p50/p95/p99 of the phases and counters in the top right corner, the numbers are refreshed every few frames
+    """
+    if PROFILER.frames % PROFILER_OVERLAY_REFRESH_FRAMES == 0 or not STATE.profiler_overlay_text:
+        STATE.profiler_overlay_text = profiler_overlay_text()
+    font_size = 20
+    width = rl.measure_text(STATE.profiler_overlay_text, font_size) + 20
+    height = (STATE.profiler_overlay_text.count("\n") + 1) * (font_size + 2) + 20
+    x = rl.get_screen_width() - width - 10
+    rl.draw_rectangle(x, 10, width, height, rl.fade(rl.DARKGRAY, 0.8))
+    rl.draw_text(STATE.profiler_overlay_text, x + 10, 20, font_size, rl.RAYWHITE)
 
 
-def prepopulate_glyph_cache():
-    inputs = []
-    # all the supported glyphs
-    for _, v in CHAR_TO_GLYPH_NAME.items():
-        inputs.append(v)
+def prepopulate_glyph_cache(ranges: list[range] = WARM_UP_RANGES):
+    """
+    loads the glyphs of the codepoint ranges ahead of time. glyphs are loaded on demand anyway,
+    so this runs in the background and goes in small chunks
+    """
+    keys = list(dict.fromkeys(CMAP[codepoint] for r in ranges for codepoint in r if codepoint in CMAP))
+    for i in range(0, len(keys), WARM_UP_CHUNK_SIZE):
+        ensure_glyphs(keys[i : i + WARM_UP_CHUNK_SIZE])
 
-    # add uppercase and lowercase letters
-    for ch in range(65, 91):
-        inputs.append(chr(ch))
-        inputs.append(chr(ch+32))
-    
-    for key in inputs:
-        glyph = glyf_table[key].__dict__
-        if "components" in glyph:
-            glyph_contours = handle_compound_glyphs(glyph)
-        elif "coordinates" in glyph:
-            glyph_contours = all_contour_segments(glyph)
+def compose_glyph(glyph: CompoundGlyph, outlines: dict[int, list[np.ndarray]]) -> list[np.ndarray]:
+    """
+    the segments of a compound glyph: the decoded segments of every component, transformed (x' = x * xx + y * yx + dx, ...).
+    components are decoded only once no matter how many glyphs use them (e.g. the accents)
+    """
+    contours = []
+    for glyph_id, (xx, xy, yx, yy, dx, dy) in glyph.components:
+        component = outlines[glyph_id]
+        if component is None:
+            continue
+        offset = np.array([dx, dy], dtype=np.float64)
+        if (xx, xy, yx, yy) == (1, 0, 0, 1):
+            # most components are only moved
+            contours.extend(segments + offset for segments in component)
         else:
-            print(f"[WARN] unprocessable glyph for char[{key}]")
+            matrix = np.array([[xx, xy], [yx, yy]], dtype=np.float64)
+            contours.extend(segments @ matrix + offset for segments in component)
+    return contours
+
+def decode_outlines(keys: list[int], outlines: dict[int, list[np.ndarray]]) -> dict[int, list[np.ndarray]]:
+    """
+    decodes the glyphs from FONT into outlines (glyph id => segments of every contour, None for glyphs without an outline)
+    and returns it. all the simple glyphs go through the numpy pipeline (outline.py) together, compound glyphs are put
+    together from their components, which are decoded as well. the glyphs already in outlines are not decoded again.
+    only FONT and outlines are touched, so it can run on any thread
+    """
+    simple_keys = []
+    all_sources = []
+    compound_glyphs = []
+    for key, glyph in zip(keys, FONT.glyphs(keys)):
+        if glyph is None:
+            # nothing to draw
+            outlines[key] = None
+        elif isinstance(glyph, CompoundGlyph):
+            compound_glyphs.append((key, glyph))
+        else:
+            simple_keys.append(key)
+            all_sources.append((glyph.coordinates, glyph.flags, glyph.end_points))
+
+    for key, contours in zip(simple_keys, decode_glyphs(all_sources)):
+        outlines[key] = contours
+
+    if not compound_glyphs:
+        return outlines
+    # components can be compound glyphs themselves
+    missing_components = {
+        glyph_id for _, glyph in compound_glyphs for glyph_id, _ in glyph.components if glyph_id not in outlines
+    }
+    if missing_components:
+        decode_outlines(list(missing_components), outlines)
+
+    for key, glyph in compound_glyphs:
+        if key in outlines:
+            # it was a component of another compound glyph
             continue
+        outlines[key] = compose_glyph(glyph, outlines)
+    return outlines
+
+class LoadedOutlines(dict):
+    """
+    the outlines prepare_glyphs decodes into: the glyphs in GLYPH_CONTOUR_CACHE count as decoded,
+    so components that were loaded before are read from there instead of being decoded again
+    """
+
+    def __contains__(self, key: int) -> bool:
+        return dict.__contains__(self, key) or bool(GLYPH_LOADED[key])
 
-        for contour in glyph_contours:
-            add_generated_polylines(contour)
-        
-        font_width, font_height, boundaries = find_char_width_height(glyph_contours)
-        GLYPH_CONTOUR_CACHE[key] = (glyph_contours, (font_width, font_height, boundaries))
+    def __missing__(self, key: int) -> list[np.ndarray]:
+        entry = GLYPH_CONTOUR_CACHE[key]
+        return None if entry is None else [contour.segments for contour in entry[0]]
+
+def prepare_glyphs(keys: list[int]):
+    """
+    decodes the outlines of the glyphs and puts them into the cache, see decode_outlines.
+    they are flattened later for the size they are drawn at, see glyph_shape
+    """
+    if FONT_CACHE is not None:
+        # decoded in a previous run
+        for key in keys:
+            store_glyph(key, *(FONT_CACHE.glyph(key) or (None,)))
+        return
+
+    # only the glyphs decoded just now are in the dict itself
+    for key, contours in dict.items(decode_outlines(keys, LoadedOutlines())):
+        store_glyph(key, contours)
 
 if __name__ == "__main__":
-    STATE = ProgramState()
+    parser = argparse.ArgumentParser(description="renders a text file with the glyphs filled on the GPU")
+    parser.add_argument("path", nargs="?", default="main.py", help="the file to open")
+    parser.add_argument("--profile-export", metavar="PATH", help="write the frame profiler's numbers to this .csv or .json file")
+    parser.add_argument("--profile-interval", type=int, default=ProgramState.profile_export_interval, metavar="FRAMES", help="how often the profile is written")
+    args = parser.parse_args()
 
-    with open("main.py") as file:
-        for line in file:
-            for ch in line:
-                if ch == '\n':
-                    user_input = "phont_newline"
-                elif ch == '\t':
-                    user_input = "space"
-                elif ch == '\r':
-                    continue
-                else:
-                    if ch in CHAR_TO_GLYPH_NAME:
-                        user_input = CHAR_TO_GLYPH_NAME[ch]
-                    else:
-                        user_input = ch
-                STATE.user_inputs.append(user_input)
+    STATE = ProgramState()
+    STATE.profile_export_path = args.profile_export
+    STATE.profile_export_interval = max(1, args.profile_interval)
+    update_profiler_enabled()
+    open_file(args.path)
 
     rl.set_trace_log_level(rl.TraceLogLevel.LOG_ERROR)
     rl.set_config_flags(rl.ConfigFlags.FLAG_VSYNC_HINT)
@@ -656,29 +1174,49 @@ if __name__ == "__main__":
     rl.unload_image(texture_img)
 
     STATE.texture = texture
-    STATE.scaling_factor = (STATE.font_size_in_pts * MAGIC_FACTOR * rl.get_window_scale_dpi().x) / UNIT_PER_EM # assumption here is that the scaling dpi factor is constant across both dimensions
-    STATE.line_spacing = ASCENT * STATE.scaling_factor * 1.2
+    STATE.glyph_atlas = GlyphAtlas()
+    STATE.dpi_scale = rl.get_window_scale_dpi().x # assumption here is that the scaling dpi factor is constant across both dimensions
+    set_font_size(STATE.font_size_in_pts)
+    GLYPH_SHAPE_CACHE.resize(STATE.glyph_cache_budget)
     STATE.text_height = float(rl.get_screen_height())
     
-    prepopulate_glyph_cache()
+    if STATE.warm_up_glyph_cache:
+        THREAD_POOL_EXECUTOR.submit(prepopulate_glyph_cache)
+    # the caches written at startup are switched to from the main loop, see use_disk_cache
+    disk_cache_saved = DISK_CACHE_EXECUTOR.submit(save_disk_cache, STATE.size_bucket) if STATE.use_disk_cache else None
 
     shader = rl.load_shader(None, "shader.frag")
-    polylines_location = rl.get_shader_location(shader, "polylines")
-    count_contour_location = rl.get_shader_location(shader, "count_contour")
-    count_polyline_location = rl.get_shader_location(shader, "count_polyline")
-    offset_location = rl.get_shader_location(shader, "offset")
+    glyph_start_location = rl.get_shader_location(shader, "glyphStart")
+    glyph_data_location = rl.get_shader_location(shader, "glyphData")
+
+    batched_shader = rl.load_shader("shader.vert", "shader_batched.frag")
+    STATE.glyph_batch = GlyphBatch(batched_shader)
 
     while not rl.window_should_close():
-        grab_user_input()
+        PROFILER.begin_frame()
+        with PROFILER.phase("input"):
+            grab_user_input()
+        if disk_cache_saved is not None and disk_cache_saved.done():
+            use_disk_cache(disk_cache_saved.result())
+            disk_cache_saved = None
         update()
-        render_glyph(shader, polylines_location, count_contour_location, count_polyline_location, offset_location)
-        # print(
-            # round(1000 * sum(TIMES_BENCHMARK["update"]) / len(TIMES_BENCHMARK["update"]), ndigits=0) , 
-            # round(1000 * sum(TIMES_BENCHMARK["update_key_loop"]) / len(TIMES_BENCHMARK["update_key_loop"]), ndigits=0),
-            # round(1000 * sum(TIMES_BENCHMARK["update_shader_prop"]) / len(TIMES_BENCHMARK["update_shader_prop"]), ndigits=0),
-            # TIMES_BENCHMARK["rendered_glyph_count"]
-        # )
-
+        render_glyph(shader, glyph_start_location, glyph_data_location)
+        PROFILER.end_frame()
+        if STATE.profile_export_path and PROFILER.frames % STATE.profile_export_interval == 0:
+            PROFILER.export(STATE.profile_export_path)
+
+    if STATE.profile_export_path:
+        PROFILER.export(STATE.profile_export_path)
+    if STATE.use_disk_cache:
+        # the size the text was zoomed to, a no-op if it's the one from startup
+        DISK_CACHE_EXECUTOR.submit(save_disk_cache, STATE.size_bucket)
+    DISK_CACHE_EXECUTOR.shutdown()
     rl.unload_texture(STATE.texture)
+    STATE.glyph_atlas.clear()
+    STATE.glyph_batch.unload()
+    if PROCESS_LAYOUT is not None:
+        PROCESS_LAYOUT.shutdown()
+    rl.unload_shader(batched_shader)
+    rl.unload_shader(shader)
 
     rl.close_window()
@@ -0,0 +1,91 @@
+from array import array
+from collections import OrderedDict
+from typing import Callable
+import mmap
+import numpy as np
+
+# the newline index keeps the start of every LINE_INDEX_STRIDE-th line, the lines in between are found with mmap.find
+LINE_INDEX_STRIDE = 64
+# bytes compared at once while building the index
+INDEX_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def line_index(data, stride: int = LINE_INDEX_STRIDE, chunk_size: int = INDEX_CHUNK_SIZE) -> tuple[np.ndarray, int]:
+    """
+    (byte offset of the start of the lines 0, stride, 2 * stride, ..., number of lines) of the buffer.
+    the buffer is searched for newlines one chunk at a time with numpy, so only a chunk's worth of positions
+    is ever held on to besides the index itself
+    """
+    size = len(data)
+    checkpoints = [np.zeros(1, dtype=np.int64)]
+    line_count = 1
+    for chunk_start in range(0, size, chunk_size):
+        chunk = np.frombuffer(data, dtype=np.uint8, count=min(chunk_size, size - chunk_start), offset=chunk_start)
+        # line k starts right after the (k - 1)th newline
+        line_starts = np.flatnonzero(chunk == 10) + (chunk_start + 1)
+        first = -line_count % stride
+        # copied, a view would keep all of the chunk's line starts alive
+        checkpoints.append(line_starts[first::stride].copy())
+        line_count += len(line_starts)
+    return np.concatenate(checkpoints), line_count
+
+
+class MappedLines:
+    """
+    the lines of a file as glyph ids, for TextBuffer pieces that are never modified
+
+    the file is memory mapped and only its newline index is built up front. a line is decoded and turned into
+    glyph ids when it is asked for, the last `cache_size` lines are kept. so opening a file costs one pass
+    over it and the memory that stays in use depends on the lines that are looked at, not on the size of the file
+    """
+
+    def __init__(self, path: str, line_keys: Callable[[str], array], cache_size: int = 4096) -> None:
+        self.path = path
+        self.line_keys = line_keys
+        self.cache_size = cache_size
+        self.cache: OrderedDict[int, array] = OrderedDict()
+        with open(path, "rb") as file:
+            try:
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files can not be mapped
+                self.data = b""
+        self.checkpoints, self.line_count = line_index(self.data)
+
+    def __len__(self) -> int:
+        return self.line_count
+
+    def line_start(self, line: int) -> int:
+        """
+        byte offset of the start of the line
+        """
+        start = int(self.checkpoints[line // LINE_INDEX_STRIDE])
+        for _ in range(line % LINE_INDEX_STRIDE):
+            start = self.data.find(b"\n", start) + 1
+        return start
+
+    def line_bytes(self, line: int) -> bytes:
+        start = self.line_start(line)
+        end = self.data.find(b"\n", start)
+        return self.data[start : end if end >= 0 else len(self.data)]
+
+    def __getitem__(self, line: int) -> array:
+        if not 0 <= line < self.line_count:
+            raise IndexError(f"line {line} is out of range [0, {self.line_count})")
+        keys = self.cache.get(line)
+        if keys is not None:
+            self.cache.move_to_end(line)
+            return keys
+        keys = self.line_keys(self.line_bytes(line).decode("utf-8", errors="replace"))
+        self.cache[line] = keys
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return keys
+
+    def close(self):
+        """
+        unmaps the file, the lines can not be read afterwards
+        """
+        self.cache.clear()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
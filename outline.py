@@ -0,0 +1,143 @@
+import numpy as np
+from bezier import quadratic_segment_counts, flatten_quadratics
+
+
+def coordinates_array(coordinates) -> np.ndarray:
+    """
+    (point_count, 2) float array of the points, fontTools' GlyphCoordinates are viewed without going through its per-point tuples
+    """
+    if hasattr(coordinates, "array"):
+        return np.frombuffer(coordinates.array, dtype=np.float64).reshape(-1, 2)
+    return np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+
+
+def decode_contours(coordinates, flags, end_points) -> list[np.ndarray]:
+    """
+    numpy version of segments() for all the contours of a simple glyph (or of many, see decode_glyphs()) at once
+
+    returns an array of shape (segment_count, 3, 2) per contour, every segment is a quadratic curve (p0, p1, p2).
+    lines have their midpoint as the control point, so they are just curves that are already flat.
+
+    TrueType leaves out the on-curve point between two consecutive off-curve points,
+    they are put back first (the midpoint of the two control points), after that every on-curve point
+    starts a segment that ends at the next on-curve point
+    """
+    points = coordinates_array(coordinates)
+    # the least significant bit in the flag indicates if the point is on-curve or off-curve
+    on_curve = (np.asarray(flags, dtype=np.uint8) & 1).astype(bool)
+    ends = np.asarray(end_points, dtype=np.intp)
+    if len(ends) == 0 or len(points) == 0:
+        return []
+
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    contour_of_point = np.repeat(np.arange(len(ends)), ends - starts + 1)
+
+    # the point after each point, contours are closed
+    following = np.arange(1, len(points) + 1)
+    following[ends] = starts
+
+    # implicit on-curve points go right after the first of the two control points
+    implicit = ~on_curve & ~on_curve[following]
+    positions = np.arange(len(points)) + np.cumsum(implicit) - implicit
+    implicit_positions = positions[implicit] + 1
+    total = len(points) + int(implicit.sum())
+
+    expanded = np.empty((total, 2), dtype=points.dtype)
+    expanded[positions] = points
+    expanded[implicit_positions] = (points[implicit] + points[following[implicit]]) // 2
+    expanded_on_curve = np.empty(total, dtype=bool)
+    expanded_on_curve[positions] = on_curve
+    expanded_on_curve[implicit_positions] = True
+    expanded_contour = np.empty(total, dtype=np.intp)
+    expanded_contour[positions] = contour_of_point
+    expanded_contour[implicit_positions] = contour_of_point[implicit]
+
+    expanded_starts = positions[starts]
+    expanded_ends = np.concatenate((expanded_starts[1:], [total])) - 1
+    expanded_following = np.arange(1, total + 1)
+    expanded_following[expanded_ends] = expanded_starts
+
+    # there are no two consecutive control points anymore:
+    # an on-curve point is followed either by the end of a line or by the control point of a curve
+    first = np.flatnonzero(expanded_on_curve)
+    second = expanded_following[first]
+    is_line = expanded_on_curve[second]
+    last = np.where(is_line, second, expanded_following[second])
+
+    p0 = expanded[first].astype(np.float64)
+    p2 = expanded[last].astype(np.float64)
+    p1 = np.where(is_line[:, None], (p0 + p2) / 2, expanded[second])
+    all_segments = np.stack((p0, p1, p2), axis=1).astype(np.float32)
+
+    counts = np.bincount(expanded_contour[first], minlength=len(ends))
+    return np.split(all_segments, np.cumsum(counts)[:-1])
+
+
+def decode_glyphs(glyphs: list[tuple]) -> list[list[np.ndarray]]:
+    """
+    decode_contours() for many glyphs, given as (coordinates, flags, end_points), in one go
+    """
+    all_points, all_flags, all_ends, contour_counts = [], [], [], []
+    offset = 0
+    for coordinates, flags, end_points in glyphs:
+        points = coordinates_array(coordinates)
+        all_points.append(points)
+        all_flags.append(np.asarray(flags, dtype=np.uint8))
+        all_ends.append(np.asarray(end_points, dtype=np.intp) + offset)
+        contour_counts.append(len(end_points))
+        offset += len(points)
+
+    if offset == 0:
+        return [[] for _ in glyphs]
+
+    contours = decode_contours(np.concatenate(all_points), np.concatenate(all_flags), np.concatenate(all_ends))
+    result = []
+    start = 0
+    for count in contour_counts:
+        result.append(contours[start : start + count])
+        start += count
+    return result
+
+
+def bounding_box(contours: list[np.ndarray]) -> tuple[float, float, list[float]]:
+    """
+    numpy version of find_char_width_height(): (width, height, [x_min, y_min, x_max, y_max]) over all the segment points
+    """
+    contours = [c for c in contours if len(c)]
+    if not contours:
+        return 0, 0, [0, 0, 0, 0]
+    all_points = np.concatenate(contours).reshape(-1, 2)
+    x_min, y_min = all_points.min(axis=0).tolist()
+    x_max, y_max = all_points.max(axis=0).tolist()
+    return (x_max - x_min), (y_max - y_min), [x_min, y_min, x_max, y_max]
+
+
+def flatten_contours(contours: list[np.ndarray], scale: float) -> list[np.ndarray]:
+    """
+    numpy version of add_generated_polylines(): scales the segments and flattens them into closed polylines,
+    returns a float32 array of shape (vertex_count, 2) per contour
+
+    all the curves of all the given contours (e.g. every glyph of a font) are flattened together
+    by bezier.flatten_quadratics into one preallocated array
+    """
+    counts = [len(c) for c in contours]
+    if sum(counts) == 0:
+        return [np.empty((0, 2), dtype=np.float32) for _ in contours]
+
+    all_segments = (np.concatenate(contours).astype(np.float64) * scale).astype(np.float32)
+    p0, p1, p2 = all_segments[:, 0], all_segments[:, 1], all_segments[:, 2]
+    point_counts = quadratic_segment_counts(p0, p1, p2)
+    vertices = np.empty((int(point_counts.sum()), 2), dtype=np.float32)
+    flatten_quadratics(p0, p1, p2, point_counts, vertices)
+
+    contour_of_segment = np.repeat(np.arange(len(contours)), counts)
+    contour_of_vertex = np.repeat(contour_of_segment, point_counts)
+
+    # drop the consecutive duplicates within each contour (degenerate segments)
+    keep = np.ones(len(vertices), dtype=bool)
+    keep[1:] = (vertices[1:] != vertices[:-1]).any(axis=1) | (contour_of_vertex[1:] != contour_of_vertex[:-1])
+    vertices = vertices[keep]
+    contour_of_vertex = contour_of_vertex[keep]
+
+    vertex_counts = np.bincount(contour_of_vertex, minlength=len(contours))
+    return np.split(vertices, np.cumsum(vertex_counts)[:-1])
@@ -0,0 +1,144 @@
+from contextlib import nullcontext
+import csv
+import json
+import time
+import numpy as np
+
+# what phase() returns while the profiler is disabled, entering and leaving it does nothing
+NULL_PHASE = nullcontext()
+PERCENTILES = (50, 95, 99)
+
+
+class Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: 'FrameProfiler', name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+
+class FrameProfiler:
+    """
+    per frame timings of named phases plus counters, the last `capacity` frames are kept in ring buffers
+
+        with PROFILER.phase("layout"):
+            ...
+        PROFILER.count("glyphs", len(glyph_boundaries))
+
+    a phase that runs several times in a frame adds up. phases are measured separately,
+    "frame" is the whole frame from begin_frame to end_frame.
+    while disabled phase() hands out a context manager that does nothing and count() returns right away,
+    so the calls can stay in the hot paths
+    """
+
+    def __init__(self, capacity: int = 600) -> None:
+        self.enabled = False
+        self.capacity = capacity
+        # frames recorded so far, frame i is at i % capacity in the ring buffers
+        self.frames = 0
+        # name => values of the last frames, phases in seconds
+        self.phases: dict[str, np.ndarray] = dict()
+        self.counters: dict[str, np.ndarray] = dict()
+        # the frame that is being recorded
+        self.frame_phases: dict[str, float] = dict()
+        self.frame_counters: dict[str, float] = dict()
+        self.frame_start = None
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def add(self, name: str, seconds: float):
+        self.frame_phases[name] = self.frame_phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.frame_counters[name] = self.frame_counters.get(name, 0) + n
+
+    def begin_frame(self):
+        if self.enabled:
+            # whatever was measured outside of a frame (e.g. right after enabling) is dropped
+            self.frame_phases.clear()
+            self.frame_counters.clear()
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        self.add("frame", time.perf_counter() - self.frame_start)
+        self.frame_start = None
+
+        slot = self.frames % self.capacity
+        for history, values in ((self.phases, self.frame_phases), (self.counters, self.frame_counters)):
+            for name in values.keys() - history.keys():
+                history[name] = np.zeros(self.capacity, dtype=np.float64)
+            for name, ring in history.items():
+                ring[slot] = values.get(name, 0)
+            values.clear()
+        self.frames += 1
+
+    def reset(self):
+        self.frames = 0
+        self.phases.clear()
+        self.counters.clear()
+        self.frame_phases.clear()
+        self.frame_counters.clear()
+
+    def _recorded(self, ring: np.ndarray) -> np.ndarray:
+        """
+        the values of the recorded frames, oldest first
+        """
+        if self.frames < self.capacity:
+            return ring[:self.frames]
+        return np.roll(ring, -(self.frames % self.capacity))
+
+    def summary(self) -> dict[str, dict[str, dict[str, float]]]:
+        """
+        p50, p95, p99, mean, max and the last value of every phase (in milliseconds) and every counter
+        """
+        result = {"phases": dict(), "counters": dict()}
+        if self.frames == 0:
+            return result
+        for kind, history, scale in (("phases", self.phases, 1000), ("counters", self.counters, 1)):
+            for name, ring in history.items():
+                values = self._recorded(ring) * scale
+                p50, p95, p99 = np.percentile(values, PERCENTILES).tolist()
+                result[kind][name] = {
+                    "p50": p50, "p95": p95, "p99": p99,
+                    "mean": float(values.mean()), "max": float(values.max()), "last": float(values[-1]),
+                }
+        return result
+
+    def export_json(self, path: str):
+        with open(path, "w") as file:
+            json.dump({"frames": self.frames, "window": min(self.frames, self.capacity), **self.summary()}, file, indent=2)
+
+    def export_csv(self, path: str):
+        """
+        one row per recorded frame, phases in milliseconds
+        """
+        phase_names, counter_names = sorted(self.phases), sorted(self.counters)
+        columns = [self._recorded(self.phases[name]) * 1000 for name in phase_names]
+        columns += [self._recorded(self.counters[name]) for name in counter_names]
+        first_frame = self.frames - min(self.frames, self.capacity)
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame"] + [f"{name}_ms" for name in phase_names] + counter_names)
+            for i, row in enumerate(zip(*(column.tolist() for column in columns))):
+                writer.writerow([first_frame + i] + list(row))
+
+    def export(self, path: str):
+        """
+        .csv files get the frames, anything else the JSON summary
+        """
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
@@ -0,0 +1,154 @@
+from typing import Callable, Hashable
+import math
+import struct
+import zlib
+import numpy as np
+from glyph_cache import GlyphCache
+
+# every pixel is sampled 3x3 times like in the shaders, every covered sample adds SAMPLE_ALPHA
+SAMPLE_OFFSETS = np.array([0.25, 0.5, 0.75])
+SAMPLE_ALPHA = 0.111
+
+
+def polyline_edges(vertices: np.ndarray, contour_starts: list[int], contour_lengths: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (start points, end points) of every edge of the closed contours
+    """
+    starts = np.asarray(contour_starts, dtype=np.intp)
+    edge_counts = np.maximum(np.asarray(contour_lengths, dtype=np.intp) - 1, 0)
+    first_edges = np.repeat(starts - (np.cumsum(edge_counts) - edge_counts), edge_counts)
+    indices = first_edges + np.arange(int(edge_counts.sum()))
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+    return vertices[indices], vertices[indices + 1]
+
+
+def glyph_coverage(vertices: np.ndarray, contour_starts: list[int], contour_lengths: list[int], width: float, height: float) -> np.ndarray:
+    """
+    the coverage (0..1) of every pixel of the glyph's quad, (height + 1, width + 1) rounded up like the quad the shaders draw.
+    vertices are the closed polylines in glyph-local coordinates (see GlyphShape)
+
+    same nonzero winding rule as shader.frag, but a whole sample row at a time instead of every sample against every edge:
+    the crossings of every sample row with the edges are sorted, the winding number of a sample is then the sum of the
+    directions of the crossings to its right, which is a lookup into the suffix sums of the sorted directions
+    """
+    columns, rows = math.ceil(width + 1), math.ceil(height + 1)
+    a, b = polyline_edges(vertices, contour_starts, contour_lengths)
+    if len(a) == 0:
+        return np.zeros((rows, columns), dtype=np.float32)
+
+    sample_y = (np.arange(rows)[:, None] + SAMPLE_OFFSETS).reshape(-1, 1)
+    sample_x = (np.arange(columns)[:, None] + SAMPLE_OFFSETS).reshape(-1)
+    ax, ay, bx, by = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+
+    # +1 for edges going down (y grows) across the sample row, -1 for edges going up, half open like in the shader
+    directions = ((ay <= sample_y) & (by > sample_y)).astype(np.int32) - ((ay > sample_y) & (by <= sample_y))
+    crossing = directions != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_x = ax + (sample_y - ay) / (by - ay) * (bx - ax)
+    # edges that do not cross the row sort after every sample and count nothing
+    crossing_x = np.where(crossing, crossing_x, columns + 1)
+
+    order = np.argsort(crossing_x, axis=1)
+    sorted_x = np.take_along_axis(crossing_x, order, axis=1)
+    sorted_directions = np.take_along_axis(directions, order, axis=1)
+    # suffix[row, k] is the sum of the directions of the crossings k.. of the row
+    edge_count = len(a)
+    suffix = np.zeros((len(sample_y), edge_count + 1), dtype=np.int32)
+    suffix[:, :-1] = np.cumsum(sorted_directions[:, ::-1], axis=1)[:, ::-1]
+
+    # all the rows are searched at once by moving every row to its own range of x
+    span = columns + 2
+    row_offsets = np.arange(len(sample_y)) * span
+    keys = (sorted_x + row_offsets[:, None]).reshape(-1)
+    queries = sample_x[None, :] + row_offsets[:, None]
+    # crossings at or to the left of the sample do not count, same as isLeft() == 0 in the shader
+    to_the_left = np.searchsorted(keys, queries, side="right") - (np.arange(len(sample_y)) * edge_count)[:, None]
+    winding = np.take_along_axis(suffix, to_the_left, axis=1)
+
+    covered = (winding != 0).reshape(rows, len(SAMPLE_OFFSETS), columns, len(SAMPLE_OFFSETS))
+    return (covered.sum(axis=(1, 3)) * SAMPLE_ALPHA).astype(np.float32)
+
+
+class Rasterizer:
+    """
+    renders glyphs on the CPU into a numpy image (float32, 0..1, white text on black like the window), no GPU or window needed
+
+    the coverage of every glyph is computed once per key and kept in a GlyphCache.
+    raylib blends white over the image as dst = alpha + dst * (1 - alpha), so 1 - dst is the product of (1 - alpha)
+    of every glyph over the pixel. multiplied that way, the glyphs can be drawn all at once and in any order
+    """
+
+    def __init__(self, budget: int = 16 * 1024 * 1024) -> None:
+        self.coverages = GlyphCache(budget)
+
+    def glyph(self, key: Hashable, shape) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (coverage, rows, columns, 1 - coverage) of the glyph, the last three only for the pixels it covers.
+        shape is anything with the fields of a GlyphShape: width, height, vertices, contour_starts, contour_lengths
+        """
+        entry = self.coverages.get(key)
+        if entry is None:
+            coverage = glyph_coverage(shape.vertices, shape.contour_starts, shape.contour_lengths, shape.width, shape.height)
+            rows, columns = np.nonzero(coverage)
+            entry = coverage, rows, columns, 1 - coverage[rows, columns]
+            self.coverages.put(key, entry, sum(a.nbytes for a in entry))
+        return entry
+
+    def coverage(self, key: Hashable, shape) -> np.ndarray:
+        return self.glyph(key, shape)[0]
+
+    def render(
+        self, xs: np.ndarray, ys: np.ndarray, glyphs: np.ndarray, glyph: Callable[[int], tuple[Hashable, object]], width: int, height: int
+    ) -> np.ndarray:
+        """
+        the instances are the columns (x, y, glyph id) with the top left corner of the glyph's quad in image coordinates.
+        glyph gives the (key, shape) of a glyph id, it's called once per distinct glyph
+        """
+        keys, inverse = np.unique(np.asarray(glyphs, dtype=np.intp), return_inverse=True)
+        # the instances of every glyph one after another
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(keys)))[:-1]
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+
+        pixels, transparencies = [], []
+        for key, instances in zip(keys.tolist(), np.split(order, bounds)):
+            _, rows, columns, transparency = self.glyph(*glyph(key))
+            # the pixel whose center falls into the first column/row of the quad, like the rasterization of the shader's quad
+            image_x = np.ceil(xs[instances] - 0.5).astype(np.intp)[:, None] + columns
+            image_y = np.ceil(ys[instances] - 0.5).astype(np.intp)[:, None] + rows
+            inside = (image_x >= 0) & (image_x < width) & (image_y >= 0) & (image_y < height)
+            pixels.append((image_y * width + image_x)[inside])
+            transparencies.append(np.broadcast_to(transparency, inside.shape)[inside])
+
+        image = np.ones(width * height, dtype=np.float32)
+        if pixels:
+            # unlike image[pixels] *= ..., multiply.at also works when glyphs overlap
+            np.multiply.at(image, np.concatenate(pixels), np.concatenate(transparencies))
+        np.subtract(1, image, out=image)
+        return image.reshape(height, width)
+
+
+def png_bytes(image: np.ndarray) -> bytes:
+    """
+    8 bit grayscale PNG of a 0..1 image
+    """
+    pixels = np.clip(np.rint(np.asarray(image) * 255), 0, 255).astype(np.uint8)
+    height, width = pixels.shape
+    # every row starts with filter type 0 (none)
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ])
+
+
+def write_png(path: str, image: np.ndarray):
+    with open(path, "wb") as file:
+        file.write(png_bytes(image))
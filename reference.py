@@ -0,0 +1,252 @@
+"""
+the outlines decoded and flattened one point at a time in python, with fontTools reading the font.
+the app goes through truetype.py and outline.py instead, this is the reference they are compared against
+(see benchmark.py and the tests). the font as fontTools reads it and the shader's coverage on the CPU are here too
+"""
+from typing import Any
+import numpy as np
+import pyray as rl
+from bezier import produce_bezier_lines
+from rasterizer import polyline_edges, SAMPLE_OFFSETS, SAMPLE_ALPHA
+from truetype import TrueTypeFont
+import main
+
+
+class GlyphContour:
+    def __init__(self, segments: list[list[tuple[float, float]]]) -> None:
+        # lines (2 points) and quadratic curves (3 points) in font units
+        self.segments = segments
+        # the flattened contour at the current size, see add_generated_polylines
+        self.raw_polylines: list[rl.Vector2] = None
+
+
+# fontTools' glyph table, see font_glyf_table
+glyf_table = None
+
+def open_font():
+    """
+    parses the font with fontTools, which is imported here so that importing this module stays cheap
+    """
+    global glyf_table
+    from fontTools.ttLib import TTFont
+    font = TTFont(main.FONT_PATH)
+    # Access the glyph table, glyphs are decompiled from it lazily even after the font is closed
+    glyf_table = font["glyf"]
+    return font
+
+def font_glyf_table():
+    if glyf_table is None:
+        open_font().close()
+    return glyf_table
+
+
+def find_char_width_height(glyph_contours: list[GlyphContour]) -> tuple[int, int, list[int, int, int, int]]:
+    """
+    required for translation
+    """
+    x_min, x_max, y_min, y_max = float("Inf"), float("-Inf"), float("Inf"), float("-Inf")
+    for c in glyph_contours:
+        for segment in c.segments:
+            for v in segment:
+                x_min = min(x_min, v[0])
+                x_max = max(x_max, v[0])
+                y_min = min(y_min, v[1])
+                y_max = max(y_max, v[1])
+    # font_width, font_height, boundaries
+    return (x_max - x_min), (y_max - y_min), [x_min, y_min, x_max, y_max]
+
+
+def segments(coords, flags) -> list[list[tuple[int, int]]]:
+    """
+    given a set of points (coordinates) and flags indicating if they are on-curve or off-curve,
+    return the segments that form the glyph
+
+    this segment can either be a line or a quadratic bezier curve
+    lines have 2 points - start and end (both on-curve)
+    quadratic bezier curves have 3 points - 2 anchors (start and end, on-curve) and 1 control point (which is off-curve)
+    """
+    i = 0
+    all_segments = []
+    # there's a flag per coordinate
+    # the least significant bit in the flag indicates if the point is on-curve or off-curve
+    while i < len(flags):
+        segment = []
+        while i < len(flags):
+            on_curve = flags[i] & 1
+            if on_curve and segment == []:
+                # if this is an anchor indicating start
+                segment.append(coords[i])
+            elif not on_curve:
+                # if this is a control point
+                segment.append(coords[i])
+            elif on_curve and segment != []:
+                # if this is an anchor indicating end
+                segment.append(coords[i])
+
+                # if there are more than 3 total points
+                # it indicates that we have at least 2 control points
+                # eg: [p1, c1, c2, p2]
+                # since true-type fonts use quadratic bezier curves
+                # the encoding basically skips the middle anchor point
+                # but it can be calculated as the midpoint between 2 control points
+                #
+                # reference: https://stackoverflow.com/a/20772557/9985287
+                if len(segment) > 3:
+                    # add the first two points
+                    expanded_segment = [segment[0], segment[1]]
+
+                    for x in range(1, len(segment) - 2):
+                        c1, c2 = segment[x], segment[x + 1]
+                        # find the midpoint between two control points
+                        pnx = (c1[0] + c2[0]) // 2
+                        pny = (c1[1] + c2[1]) // 2
+                        pn = (pnx, pny)
+                        # add the midpoint and the next point
+                        expanded_segment.append(pn)
+                        expanded_segment.append(c2)
+                    # add the last point to the segment
+                    expanded_segment.append(segment[-1])
+
+                    # at this point expanded_segment has all the points/coordinates
+                    # we now need to extract quadratic bezier curves out of these
+                    point_count = len(expanded_segment)
+                    # basically it's a sliding window of size 3
+                    # elements are arranged as: p1 c2 p3 c4 p5 c6...
+                    # so we just have a window that'll capture
+                    #       p1 c2 p3
+                    #       p3 c4 p5
+                    #       etc.
+                    for x in range(0, point_count - 1, 2):
+                        pts = expanded_segment[x : x + 3]
+                        all_segments.append(pts)
+                else:
+                    all_segments.append(segment)
+                i -= 1  # go back because the end dot is actually shared between curves
+                break
+            i += 1
+        i += 1
+    return all_segments
+
+
+def handle_compound_glyphs(glyph: dict[str, Any]) -> list[GlyphContour]:
+    all_components = glyph["components"]
+
+    result: list[GlyphContour] = []
+    for component in all_components:
+        glyph_name, (xx, xy, yx, yy, dx, dy) = component.getComponentInfo()
+        g = font_glyf_table()[glyph_name].__dict__
+        for contour in all_contour_segments(g):
+            contour.segments = [
+                [(x * xx + y * yx + dx, x * xy + y * yy + dy) for x, y in segment] for segment in contour.segments
+            ]
+            result.append(contour)
+
+    return result
+
+
+def all_contour_segments(glyph: dict[str, Any]) -> list[GlyphContour]:
+    coords = list(glyph["coordinates"])
+    flags = list(glyph["flags"])
+    # endPtsOfContours contains indices that indicate the end of a contour
+    # these are useful to extract out however many contours a particular glyph has
+    end_of_contours = list(glyph["endPtsOfContours"])
+
+    all_contours: list[GlyphContour] = []
+    start = 0
+    for end in end_of_contours:
+        segment_coords = coords[start : end + 1]
+        segment_coords = segment_coords + [
+            segment_coords[0]
+        ]  # include the first entry to close the loop
+
+        segment_flags = flags[start : end + 1]
+        segment_flags = segment_flags + [
+            segment_flags[0]
+        ]  # include the first entry to close the loop
+
+        all_segments_in_contour = segments(segment_coords, segment_flags)
+        contour = GlyphContour(segments=all_segments_in_contour)
+        all_contours.append(contour)
+        start = end + 1
+    return all_contours
+
+
+def add_generated_polylines(
+    contour: GlyphContour
+) -> list[rl.Vector2]:
+    """
+    scales and flattens the contour into a polyline, consecutive duplicate vertices are dropped.
+    the result is also kept in contour.raw_polylines
+    """
+    polygon_vertices: list[rl.Vector2] = []
+    for segment in contour.segments:
+        curve = []
+        for point in segment:
+            p = rl.Vector2(point[0] * main.STATE.scaling_factor, point[1] * main.STATE.scaling_factor)
+            curve.append(p)
+
+        if len(curve) == 2:
+            polygon_vertices.extend(curve)
+        else:
+            curve_lines = produce_bezier_lines(*curve)
+            polygon_vertices.extend(curve_lines) 
+    
+    deduped = [polygon_vertices[0]]
+
+    for i, v in enumerate(polygon_vertices):
+        if i == 0:
+            continue
+        last = deduped[-1]
+        if v.x == last.x and v.y == last.y:
+            continue
+        else:
+            deduped.append(v)
+    
+    contour.raw_polylines = deduped
+    return deduped
+
+def fonttools_font(path: str) -> tuple:
+    """
+    (glyph order, cmap, hmtx metrics, units per em, ascent, glyphs) of the font as fontTools reads it
+    """
+    from fontTools.ttLib import TTFont
+    font = TTFont(path)
+    glyph_order = font.getGlyphOrder()
+    glyf = font["glyf"]
+    glyphs = [glyf[key] for key in glyph_order]
+    result = (glyph_order, font.getBestCmap(), font["hmtx"].metrics, font["head"].unitsPerEm, font["hhea"].ascent, glyphs)
+    font.close()
+    return result
+
+def truetype_font(path: str) -> tuple:
+    """
+    the same as fonttools_font from truetype.py, the way the app reads the font
+    """
+    font = TrueTypeFont(path)
+    glyph_order = font.glyph_order()
+    glyphs = font.glyphs(list(range(font.glyph_count)))
+    return glyph_order, font.cmap(), font.metrics(), font.units_per_em, font.ascent, glyphs
+
+def shader_coverage(shape: 'main.GlyphShape', chunk_size: int = 4 * 1024 * 1024) -> np.ndarray:
+    """
+    the coverage of the glyph the way shader.frag computes it: every sample against every edge with isLeft().
+    the sample rows go a few at a time so that (samples, edges) stays under chunk_size elements
+    """
+    columns, rows = int(np.ceil(shape.width + 1)), int(np.ceil(shape.height + 1))
+    a, b = polyline_edges(shape.vertices, shape.contour_starts, shape.contour_lengths)
+    if len(a) == 0:
+        return np.zeros((rows, columns), dtype=np.float32)
+    samples_x = (np.arange(columns)[:, None] + SAMPLE_OFFSETS).reshape(-1)
+    samples_y = (np.arange(rows)[:, None] + SAMPLE_OFFSETS).reshape(-1)
+    ax, ay, bx, by = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+    winding = np.empty((len(samples_y), len(samples_x)), dtype=np.int64)
+    rows_per_chunk = max(1, chunk_size // (len(samples_x) * len(a)))
+    for first in range(0, len(samples_y), rows_per_chunk):
+        py = samples_y[first : first + rows_per_chunk, None, None]
+        px = samples_x[None, :, None]
+        is_left = (bx - ax) * (py - ay) - (px - ax) * (by - ay)
+        winding[first : first + rows_per_chunk] = (
+            ((ay <= py) & (by > py) & (is_left > 0)).sum(axis=2) - ((ay > py) & (by <= py) & (is_left < 0)).sum(axis=2)
+        )
+    covered = (winding != 0).reshape(rows, len(SAMPLE_OFFSETS), columns, len(SAMPLE_OFFSETS))
+    return (covered.sum(axis=(1, 3)) * SAMPLE_ALPHA).astype(np.float32)
@@ -1,18 +1,26 @@
 #version 330
 
-#define MAX_POLYLINE_COUNT 20
-
 in vec2 fragTexCoord;
 
 uniform sampler2D texture0;
 
-uniform vec2 offset;
-uniform vec2 polylines[MAX_POLYLINE_COUNT*MAX_POLYLINE_COUNT]; // each contour has a set of polylines
-uniform int count_contour;
-uniform int count_polyline;
+// the glyph's record in the glyph data texture, see GlyphBatch for the layout
+uniform sampler2D glyphData;
+uniform int glyphStart;
 
 out vec4 finalColor;
 
+vec4 fetch(int index) {
+    int width = textureSize(glyphData, 0).x;
+    int i = glyphStart + index;
+    return texelFetch(glyphData, ivec2(i % width, i / width), 0);
+}
+
+vec2 vertex(int verticesOffset, int index) {
+    vec4 texel = fetch(verticesOffset + index / 2);
+    return (index % 2 == 0) ? texel.xy : texel.zw;
+}
+
 float isLeft(vec2 P0, vec2 P1, vec2 P2) {
     /*
     Using cross product to find if the point is in CW or CCW direction compared to the line
@@ -20,15 +28,12 @@ float isLeft(vec2 P0, vec2 P1, vec2 P2) {
     return (P1.x - P0.x) * (P2.y - P0.y) - (P2.x -  P0.x) * (P1.y - P0.y);
 }
 
-int polygonWindingNumber(vec2 point, int contour) {
+int polygonWindingNumber(vec2 point, int start, int length, int verticesOffset) {
     int windingNumber = 0;
 
-    for (int p=0; p < count_polyline-1; p++) {
-        vec2 a = polylines[contour * count_polyline + p];
-        vec2 b = polylines[contour * count_polyline + p + 1];
-        if (b.x == -666) {
-            break;
-        }
+    for (int p=start; p < start + length - 1; p++) {
+        vec2 a = vertex(verticesOffset, p);
+        vec2 b = vertex(verticesOffset, p + 1);
 
         if (a.y <= point.y) {
             if (b.y > point.y) {
@@ -51,7 +56,13 @@ int polygonWindingNumber(vec2 point, int contour) {
 void main()
 {
     ivec2 dimensions = textureSize(texture0, 0);
-    vec2 realCoords = floor(fragTexCoord * dimensions + offset);
+    // the polylines are in glyph-local coordinates, the quad is drawn at the glyph's position
+    vec2 realCoords = floor(fragTexCoord * dimensions);
+
+    int count_contour = int(fetch(0).x);
+    vec4 offsets = fetch(2);
+    int contoursOffset = int(offsets.y);
+    int verticesOffset = int(offsets.z);
 
     float alpha = 0.0;
 
@@ -60,7 +71,8 @@ void main()
             vec2 point = realCoords + vec2(sx, sy);
             int windingNumber = 0;
             for (int c=0; c < count_contour; c++) {
-                windingNumber += polygonWindingNumber(point, c);
+                vec4 contour = fetch(contoursOffset + c);
+                windingNumber += polygonWindingNumber(point, int(contour.x), int(contour.y), verticesOffset);
             }
             if (windingNumber != 0) {
                 alpha += 0.111;
@@ -69,4 +81,4 @@ void main()
     }
 
     finalColor = vec4(1.0, 1.0, 1.0, alpha);
-}
\ No newline at end of file
+}
@@ -1,7 +1,27 @@
 #version 330
 
-uniform vec2 pixelCoord;
+// one quad per glyph instance, the corner comes from the shared quad and the rest from the instance
+layout(location = 0) in vec2 corner;
+layout(location = 1) in vec3 instance; // x, y, start of the glyph's record in glyphData
+
+uniform mat4 mvp;
+uniform sampler2D glyphData;
+
+out vec2 localCoord;
+flat out int glyphStart;
+
+vec4 fetch(int index) {
+    int width = textureSize(glyphData, 0).x;
+    return texelFetch(glyphData, ivec2(index % width, index / width), 0);
+}
 
 void main() {
-    gl_Position = vec4(pixelCoord, 0.0, 0.0);
-}
\ No newline at end of file
+    glyphStart = int(instance.z);
+
+    // header: count_contour, count_polyline, width, height
+    vec4 header = fetch(glyphStart);
+    // +1 because we wanna draw the bottom and right parts correctly
+    localCoord = corner * (header.zw + 1.0);
+
+    gl_Position = mvp * vec4(instance.xy + localCoord, 0.0, 1.0);
+}
@@ -0,0 +1,143 @@
+#version 330
+
+in vec2 localCoord;
+flat in int glyphStart;
+
+// every glyph has a record (offsets in texels, relative to glyphStart):
+//   0                      count_contour, vertex_count, width, height
+//   1                      band_count, band_height, record kind, 0
+//   2                      bands offset, contours offset, vertices offset, 0
+//   bands offset           per band: edge list offset, edge count, 0, 0
+//   contours offset        per contour: first vertex, vertex count, 0, 0
+//   vertices offset        RECORD_POLYLINES: the closed polylines in glyph-local coordinates, two vertices per texel
+//                          RECORD_CURVES: y-monotonic quadratic curves, two texels each (p0, p1), (p2, 0, 0)
+//   edge list offsets      indices of the edges' first vertex, 4 per texel
+uniform sampler2D glyphData;
+
+#define RECORD_POLYLINES 0
+#define RECORD_CURVES 1
+
+out vec4 finalColor;
+
+vec4 fetch(int index) {
+    int width = textureSize(glyphData, 0).x;
+    int i = glyphStart + index;
+    return texelFetch(glyphData, ivec2(i % width, i / width), 0);
+}
+
+vec2 vertex(int verticesOffset, int index) {
+    vec4 texel = fetch(verticesOffset + index / 2);
+    return (index % 2 == 0) ? texel.xy : texel.zw;
+}
+
+float isLeft(vec2 P0, vec2 P1, vec2 P2) {
+    /*
+    Using cross product to find if the point is in CW or CCW direction compared to the line
+    */
+    return (P1.x - P0.x) * (P2.y - P0.y) - (P2.x -  P0.x) * (P1.y - P0.y);
+}
+
+int curveCrossing(vec2 point, vec2 p0, vec2 p1, vec2 p2) {
+    /*
+    the curve is monotonic in y, so the scanline crosses it at most once.
+    same rule as the lines: the crossing counts if it's to the right of the point,
+    +1 if the curve goes down (y grows) and -1 if it goes up
+    */
+    if (point.y < min(p0.y, p2.y) || point.y >= max(p0.y, p2.y)) {
+        return 0;
+    }
+
+    // y(t) = a*t^2 + b*t + c
+    float a = p0.y - 2.0 * p1.y + p2.y;
+    float b = 2.0 * (p1.y - p0.y);
+    float c = p0.y - point.y;
+
+    float t;
+    if (abs(a) < 1e-5) {
+        t = -c / b;
+    } else {
+        float d = sqrt(max(b * b - 4.0 * a * c, 0.0));
+        t = (-b + d) / (2.0 * a);
+        if (t < 0.0 || t > 1.0) {
+            t = (-b - d) / (2.0 * a);
+        }
+    }
+    t = clamp(t, 0.0, 1.0);
+
+    float x = mix(mix(p0.x, p1.x, t), mix(p1.x, p2.x, t), t);
+    if (x > point.x) {
+        return p2.y > p0.y ? 1 : -1;
+    }
+    return 0;
+}
+
+int bandWindingNumber(vec2 point, int edgesOffset, int edgeCount, int verticesOffset, int kind) {
+    /*
+    only the edges of the band the point falls into can cross its scanline,
+    the winding number is summed over all the contours at once
+    */
+    int windingNumber = 0;
+
+    for (int e=0; e < edgeCount; e++) {
+        int p = int(fetch(edgesOffset + e / 4)[e % 4]);
+
+        if (kind == RECORD_CURVES) {
+            vec4 c0 = fetch(verticesOffset + 2 * p);
+            vec4 c1 = fetch(verticesOffset + 2 * p + 1);
+            windingNumber += curveCrossing(point, c0.xy, c0.zw, c1.xy);
+            continue;
+        }
+
+        vec2 a = vertex(verticesOffset, p);
+        vec2 b = vertex(verticesOffset, p + 1);
+
+        if (a.y <= point.y) {
+            if (b.y > point.y) {
+                if (isLeft(a, b, point) > 0) {
+                    windingNumber += 1;
+                }
+            }
+        } else {
+            if (b.y <= point.y) {
+                if (isLeft(a, b, point) < 0) {
+                    windingNumber -= 1;
+                }
+            }
+        }
+    }
+
+    return windingNumber;
+}
+
+void main()
+{
+    vec4 bandsHeader = fetch(1);
+    int bandCount = int(bandsHeader.x);
+    float bandHeight = bandsHeader.y;
+    int kind = int(bandsHeader.z);
+
+    vec4 offsets = fetch(2);
+    int bandsOffset = int(offsets.x);
+    int verticesOffset = int(offsets.z);
+
+    vec2 realCoords = floor(localCoord);
+
+    float alpha = 0.0;
+
+    for (float sy=0.25; sy < 1.0; sy += 0.25) {
+        float y = realCoords.y + sy;
+        int band = clamp(int(floor(y / bandHeight)), 0, bandCount - 1);
+        vec4 bandInfo = fetch(bandsOffset + band);
+        int edgesOffset = int(bandInfo.x);
+        int edgeCount = int(bandInfo.y);
+
+        for (float sx=0.25; sx < 1.0; sx += 0.25) {
+            vec2 point = vec2(realCoords.x + sx, y);
+            if (bandWindingNumber(point, edgesOffset, edgeCount, verticesOffset, kind) != 0) {
+                alpha += 0.111;
+            }
+        }
+    }
+
+    finalColor = vec4(1.0, 1.0, 1.0, alpha);
+}
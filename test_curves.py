@@ -0,0 +1,144 @@
+import glob
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import main
+from bezier import split_monotonic_y
+from glyph_batch import curve_record, RECORD_CURVES
+from outline import decode_glyphs, bounding_box
+from rasterizer import SAMPLE_OFFSETS, SAMPLE_ALPHA
+from reference import shader_coverage
+from truetype import TrueTypeFont, CompoundGlyph
+
+FONT_PATHS = sorted(glob.glob("assets/**/*.ttf", recursive=True))
+# curves, straight parts, holes and overlapping contours
+CURVE_TEXT = "aegQ@&%8"
+PIXELS_PER_EM = 48
+# the reference outline flattens every curve into this many lines
+FLATTEN_STEPS = 32
+
+
+def glyph_contours(font: TrueTypeFont, char: str) -> list[np.ndarray]:
+    """
+    the (segment_count, 3, 2) quadratic curves of every contour of the glyph in font units, None if the font
+    does not have a simple glyph for the character
+    """
+    glyph_id = font.cmap().get(ord(char))
+    glyph = None if glyph_id is None else font.glyphs([glyph_id])[0]
+    if glyph is None or isinstance(glyph, CompoundGlyph):
+        return None
+    return decode_glyphs([(glyph.coordinates, glyph.flags, glyph.end_points)])[0]
+
+
+def local_curves(contours: list[np.ndarray], scaling_factor: float) -> tuple[float, float, list[list[tuple]]]:
+    """
+    (width, height, y-monotonic curves of every contour) with the bounding box at the origin and y down,
+    what main.glyph_local_curves makes of the glyph
+    """
+    width, height, (x_min, _, _, y_max) = bounding_box(contours)
+
+    def to_local(point):
+        return (point[0] - x_min) * scaling_factor, (y_max - point[1]) * scaling_factor
+
+    curves = [
+        [curve for segment in contour.tolist() for curve in split_monotonic_y(*(to_local(p) for p in segment))]
+        for contour in contours
+    ]
+    return width * scaling_factor, height * scaling_factor, curves
+
+
+def flattened_shape(width: float, height: float, curves: list[list[tuple]]) -> SimpleNamespace:
+    """
+    the contours flattened into FLATTEN_STEPS lines per curve, shaped like a GlyphShape for shader_coverage
+    """
+    t = np.linspace(0, 1, FLATTEN_STEPS + 1)[:-1, None]
+    polylines = []
+    for contour in curves:
+        p0, p1, p2 = (np.array([curve[i] for curve in contour])[:, None, :] for i in range(3))
+        points = ((1 - t) ** 2 * p0 + 2 * (1 - t) * t * p1 + t ** 2 * p2).reshape(-1, 2)
+        polylines.append(np.concatenate((points, points[:1])))
+    lengths = [len(p) for p in polylines]
+    starts = np.cumsum([0] + lengths[:-1]).tolist()
+    return SimpleNamespace(width=width, height=height, vertices=np.concatenate(polylines), contour_starts=starts, contour_lengths=lengths)
+
+
+def curve_crossings(y: float, samples_x: np.ndarray, curves: np.ndarray) -> np.ndarray:
+    """
+    curveCrossing of shader_batched.frag for every (sample, curve) of a scanline, curves is (n, 3, 2)
+    """
+    (x0, y0), (x1, y1), (x2, y2) = curves[:, 0].T, curves[:, 1].T, curves[:, 2].T
+    inside = (y >= np.minimum(y0, y2)) & (y < np.maximum(y0, y2))
+
+    a = y0 - 2 * y1 + y2
+    b = 2 * (y1 - y0)
+    c = y0 - y
+    with np.errstate(divide="ignore", invalid="ignore"):
+        linear = -c / b
+        d = np.sqrt(np.maximum(b * b - 4 * a * c, 0))
+        t = (-b + d) / (2 * a)
+        t = np.where((t < 0) | (t > 1), (-b - d) / (2 * a), t)
+    t = np.clip(np.where(np.abs(a) < 1e-5, linear, t), 0, 1)
+
+    x = (1 - t) * ((1 - t) * x0 + t * x1) + t * ((1 - t) * x1 + t * x2)
+    direction = np.where(y2 > y0, 1, -1) * inside
+    return np.where(x > samples_x[:, None], direction, 0)
+
+
+def curve_coverage(record: np.ndarray) -> np.ndarray:
+    """
+    shader_batched.frag for RECORD_CURVES on the CPU: every sample only looks at the curves of its band,
+    read back from the record
+    """
+    _, curve_count, width, height = record[0]
+    band_count, band_height, kind, _ = record[1]
+    bands_offset, _, vertices_offset, _ = record[2].astype(int)
+    assert kind == RECORD_CURVES
+    texels = record[vertices_offset : vertices_offset + 2 * int(curve_count)].reshape(-1, 8).astype(np.float64)
+    curves = texels[:, :6].reshape(-1, 3, 2)
+
+    columns, rows = int(np.ceil(width + 1)), int(np.ceil(height + 1))
+    samples_x = (np.arange(columns)[:, None] + SAMPLE_OFFSETS).reshape(-1)
+    covered = np.zeros((rows * len(SAMPLE_OFFSETS), len(samples_x)), dtype=bool)
+    for i, y in enumerate((np.arange(rows)[:, None] + SAMPLE_OFFSETS).reshape(-1).tolist()):
+        band = min(max(int(np.floor(y / band_height)), 0), int(band_count) - 1)
+        edges_offset, edge_count, _, _ = record[bands_offset + band].astype(int)
+        edges = record[edges_offset:].reshape(-1)[:edge_count].astype(int)
+        covered[i] = curve_crossings(y, samples_x, curves[edges]).sum(axis=1) != 0
+    covered = covered.reshape(rows, len(SAMPLE_OFFSETS), columns, len(SAMPLE_OFFSETS))
+    return (covered.sum(axis=(1, 3)) * SAMPLE_ALPHA).astype(np.float32)
+
+
+@pytest.mark.parametrize("path", FONT_PATHS)
+def test_curves_fill_like_the_flattened_outline(path):
+    font = TrueTypeFont(path)
+    scaling_factor = PIXELS_PER_EM / font.units_per_em
+    checked = 0
+    for char in CURVE_TEXT:
+        contours = glyph_contours(font, char)
+        if not contours:
+            continue
+        width, height, curves = local_curves(contours, scaling_factor)
+        record = curve_record(width, height, [curve for contour in curves for curve in contour])
+        coverage = curve_coverage(np.array(record, dtype=np.float32).reshape(-1, 4))
+        expected = shader_coverage(flattened_shape(width, height, curves))
+
+        assert coverage.shape == expected.shape
+        assert expected.any()
+        # the flattened outline is within a hundredth of a pixel of the curves, a sample that close to the outline
+        # can go either way: at most one sample of a pixel, in a few of the pixels
+        difference = np.abs(coverage - expected)
+        assert (difference <= SAMPLE_ALPHA * 1.01).all(), char
+        assert (difference > SAMPLE_ALPHA / 2).mean() < 0.01, char
+        checked += 1
+    assert checked
+
+
+def test_local_curves_match_the_app():
+    main.STATE = main.ProgramState()
+    main.set_font_size(16)
+    font = TrueTypeFont(main.FONT_PATH)
+    for char in CURVE_TEXT:
+        key = main.glyph_id(char)
+        main.ensure_glyphs([key])
+        _, _, curves = local_curves(glyph_contours(font, char), main.STATE.scaling_factor)
+        assert [curve for contour in curves for curve in contour] == main.glyph_local_curves(key), char
@@ -0,0 +1,62 @@
+import random
+import pytest
+from line_offsets import LineOffsets
+
+ROW_HEIGHT = 10.0
+EDITS = 1000
+
+
+def check(offsets: LineOffsets, rows: list[int]):
+    """
+    compares with the positions summed up line by line
+    """
+    assert offsets.line_count == len(rows)
+    assert offsets.row_count == sum(rows)
+    assert offsets.height == sum(rows) * ROW_HEIGHT
+    top = 0
+    for line, line_rows in enumerate(rows):
+        assert offsets.rows(line) == line_rows
+        assert offsets.line_top(line) == top * ROW_HEIGHT
+        # every row of the line, at its top, in its middle and right before the next row
+        for row in range(top, top + line_rows):
+            for y in (row * ROW_HEIGHT, (row + 0.5) * ROW_HEIGHT, (row + 1) * ROW_HEIGHT - 0.01):
+                assert offsets.line_at(y) == line
+        top += line_rows
+    # clamped to the existing lines
+    assert offsets.line_at(-5 * ROW_HEIGHT) == 0
+    assert offsets.line_at((top + 5) * ROW_HEIGHT) == len(rows) - 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_match_a_list_of_rows(seed):
+    rng = random.Random(seed)
+    rows = [1] * rng.randint(1, 30)
+    offsets = LineOffsets(ROW_HEIGHT, len(rows))
+    for i in range(EDITS):
+        action = rng.random()
+        line = rng.randrange(len(rows))
+        if action < 0.5:
+            # mostly one row, like unwrapped lines
+            line_rows = rng.choice([1, 1, 2, 3, 7])
+            offsets.set_rows(line, line_rows)
+            rows[line] = line_rows
+        elif action < 0.75:
+            line = rng.randint(0, len(rows))
+            offsets.insert_line(line)
+            rows.insert(line, 1)
+        elif len(rows) > 1:
+            offsets.remove_line(line)
+            rows.pop(line)
+        if i % 25 == 0:
+            check(offsets, rows)
+    check(offsets, rows)
+
+
+def test_visible_range_includes_the_row_above():
+    offsets = LineOffsets(ROW_HEIGHT, 100)
+    offsets.set_rows(10, 4)
+    # line 10 takes rows 10 to 13, line k > 10 is at row k + 3
+    assert offsets.visible_range(-11 * ROW_HEIGHT, 5 * ROW_HEIGHT) == (10, 14)
+    # the screen starts at row 20 (line 17), the row above belongs to line 16
+    assert offsets.visible_range(-20 * ROW_HEIGHT, 5 * ROW_HEIGHT) == (16, 23)
+    assert offsets.visible_range(0.0, 1000 * ROW_HEIGHT) == (0, 100)
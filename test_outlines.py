@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import main
+from reference import shader_coverage
+from glyph_batch import polyline_record, RECORD_POLYLINES
+from rasterizer import Rasterizer, SAMPLE_OFFSETS, SAMPLE_ALPHA
+
+# ▒ is a grid of small squares, at 200pt it has more vertices than the old 400 vertex uniform array could hold
+LARGE_GLYPH = "▒"
+LARGE_FONT_SIZE_IN_PTS = 200
+
+
+@pytest.fixture(scope="module")
+def shape() -> 'main.GlyphShape':
+    main.STATE = main.ProgramState()
+    main.set_font_size(LARGE_FONT_SIZE_IN_PTS)
+    key = main.glyph_id(LARGE_GLYPH)
+    main.ensure_glyphs([key])
+    return main.glyph_shape(key)
+
+
+def glyph_record(shape: 'main.GlyphShape') -> np.ndarray:
+    """
+    the glyph's record as it goes into the data texture, one row per texel
+    """
+    record = polyline_record(shape.width, shape.height, shape.vertices.tolist(), shape.contour_starts, shape.contour_lengths)
+    return np.array(record, dtype=np.float32).reshape(-1, 4)
+
+
+def banded_coverage(record: np.ndarray) -> np.ndarray:
+    """
+    shader_batched.frag on the CPU: every sample only looks at the edges of its band, read back from the record
+    """
+    _, vertex_count, width, height = record[0]
+    band_count, band_height, kind, _ = record[1]
+    bands_offset, _, vertices_offset, _ = record[2].astype(int)
+    assert kind == RECORD_POLYLINES
+    vertices = record[vertices_offset:].reshape(-1)[: 2 * int(vertex_count)].reshape(-1, 2).astype(np.float64)
+
+    columns, rows = int(np.ceil(width + 1)), int(np.ceil(height + 1))
+    samples_x = (np.arange(columns)[:, None] + SAMPLE_OFFSETS).reshape(-1)
+    covered = np.zeros((rows * len(SAMPLE_OFFSETS), len(samples_x)), dtype=bool)
+    for i, y in enumerate((np.arange(rows)[:, None] + SAMPLE_OFFSETS).reshape(-1).tolist()):
+        band = min(max(int(np.floor(y / band_height)), 0), int(band_count) - 1)
+        edges_offset, edge_count, _, _ = record[bands_offset + band].astype(int)
+        edges = record[edges_offset:].reshape(-1)[:edge_count].astype(int)
+        a, b = vertices[edges], vertices[edges + 1]
+        ax, ay, bx, by = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+        is_left = (bx - ax) * (y - ay) - (samples_x[:, None] - ax) * (by - ay)
+        winding = ((ay <= y) & (by > y) & (is_left > 0)).sum(axis=1) - ((ay > y) & (by <= y) & (is_left < 0)).sum(axis=1)
+        covered[i] = winding != 0
+    covered = covered.reshape(rows, len(SAMPLE_OFFSETS), columns, len(SAMPLE_OFFSETS))
+    return (covered.sum(axis=(1, 3)) * SAMPLE_ALPHA).astype(np.float32)
+
+
+def test_large_glyph_has_more_than_400_vertices(shape):
+    assert shape.polylines_length > 400
+
+
+def test_contours_cover_every_vertex(shape):
+    starts, lengths = np.array(shape.contour_starts), np.array(shape.contour_lengths)
+    assert len(starts) == len(lengths) > 1
+    # packed one after another without gaps
+    assert starts[0] == 0
+    assert (starts[1:] == starts[:-1] + lengths[:-1]).all()
+    assert starts[-1] + lengths[-1] == shape.polylines_length == len(shape.vertices)
+    # and every contour is closed
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        assert (shape.vertices[start] == shape.vertices[start + length - 1]).all()
+
+
+def test_record_fills_like_the_shader(shape):
+    expected = shader_coverage(shape)
+    assert expected.any()
+    assert (banded_coverage(glyph_record(shape)) == expected).all()
+
+
+def test_rasterizer_fills_like_the_shader(shape):
+    expected = shader_coverage(shape)
+    coverage = Rasterizer().coverage("glyph", shape)
+    assert coverage.shape == expected.shape
+    # a sample exactly on an edge can go either way, that is at most one sample of the pixel
+    assert (np.abs(coverage - expected) <= SAMPLE_ALPHA / 2).all()
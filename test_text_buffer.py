@@ -0,0 +1,81 @@
+import random
+import pytest
+from mapped_file import MappedLines
+from text_buffer import TextBuffer, NEWLINE, new_line
+
+EDITS = 2000
+# a few glyph ids, the buffer does not care which
+KEYS = [3, 5, 7]
+
+
+def check(buffer: TextBuffer, model: list[list[int]]):
+    assert buffer.line_count == len(model)
+    assert [line.tolist() for line in buffer.lines(0, buffer.line_count)] == model
+    assert buffer.end() == (len(model) - 1, len(model[-1]))
+    assert buffer.piece_starts == sorted(buffer.piece_starts)
+    assert sum(piece.count for piece in buffer.pieces) == len(model)
+
+
+def edit(buffer: TextBuffer, model: list[list[int]], rng: random.Random):
+    """
+    one random insert or delete anywhere in the document, done to the buffer and to the list of lines
+    """
+    line = rng.randrange(len(model))
+    column = rng.randint(0, len(model[line]))
+    action = rng.random()
+    if action < 0.45:
+        key = rng.choice(KEYS)
+        buffer.insert(line, column, key)
+        model[line].insert(column, key)
+    elif action < 0.6:
+        buffer.insert(line, column, NEWLINE)
+        model[line : line + 1] = [model[line][:column], model[line][column:]]
+    elif column > 0:
+        assert buffer.delete(line, column) == model[line].pop(column - 1)
+    elif line > 0:
+        assert buffer.delete(line, column) == NEWLINE
+        model[line - 1 : line + 1] = [model[line - 1] + model[line]]
+    else:
+        with pytest.raises(IndexError):
+            buffer.delete(line, column)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_match_a_list_of_lines(seed):
+    rng = random.Random(seed)
+    original = [new_line(rng.choices(KEYS, k=rng.randrange(6))) for _ in range(rng.randint(1, 40))]
+    untouched = [line.tolist() for line in original]
+    buffer = TextBuffer(original)
+    model = [list(line) for line in untouched]
+    for i in range(EDITS):
+        edit(buffer, model, rng)
+        if i % 50 == 0:
+            check(buffer, model)
+        # a random line and a random range go through the binary search over the pieces
+        line = rng.randrange(len(model))
+        assert buffer.line(line).tolist() == model[line]
+        start = rng.randrange(len(model))
+        end = rng.randint(start, len(model) + 2)
+        assert [l.tolist() for l in buffer.lines(start, end)] == model[start:end]
+    check(buffer, model)
+    # edits copy the lines they touch, the bulk loaded lines are never modified
+    assert [line.tolist() for line in original] == untouched
+
+
+def test_random_edits_over_a_mapped_file(tmp_path):
+    rng = random.Random(7)
+    path = tmp_path / "text.txt"
+    path.write_text("\n".join("".join(rng.choices("abc", k=rng.randrange(8))) for _ in range(300)))
+    buffer = TextBuffer(MappedLines(str(path), lambda text: new_line(ord(ch) for ch in text)))
+    model = [[ord(ch) for ch in line] for line in path.read_text().split("\n")]
+    check(buffer, model)
+    for _ in range(EDITS):
+        edit(buffer, model, rng)
+    check(buffer, model)
+    buffer.close()
+
+
+def test_from_keys_splits_at_newlines():
+    buffer = TextBuffer.from_keys([3, NEWLINE, NEWLINE, 5, 7])
+    check(buffer, [[3], [], [5, 7]])
+    check(TextBuffer.from_keys([]), [[]])
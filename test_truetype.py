@@ -0,0 +1,62 @@
+import glob
+import numpy as np
+import pytest
+from reference import fonttools_font, truetype_font
+from truetype import CompoundGlyph
+
+FONT_PATHS = sorted(glob.glob("assets/**/*.ttf", recursive=True))
+
+
+def same_glyph(expected, glyph, glyph_order: list[str]) -> bool:
+    if expected.isComposite():
+        return isinstance(glyph, CompoundGlyph) and [
+            (glyph_order[glyph_id], tuple(transformation)) for glyph_id, transformation in glyph.components
+        ] == [component.getComponentInfo() for component in expected.components]
+    if expected.numberOfContours <= 0:
+        return glyph is None
+    return (
+        glyph is not None
+        and np.array_equal(glyph.coordinates, np.array(expected.coordinates).reshape(-1, 2))
+        and np.array_equal(glyph.flags, np.frombuffer(bytes(expected.flags), dtype=np.uint8) & 1)
+        and glyph.end_points.tolist() == list(expected.endPtsOfContours)
+    )
+
+
+@pytest.fixture(scope="module", params=FONT_PATHS)
+def fonts(request) -> tuple[tuple, tuple]:
+    """
+    the same font read by fontTools and by truetype.py
+    """
+    pytest.importorskip("fontTools")
+    return fonttools_font(request.param), truetype_font(request.param)
+
+
+def test_assets_have_fonts():
+    assert FONT_PATHS
+
+
+def test_glyph_order(fonts):
+    expected, (glyph_order, *_) = fonts
+    assert glyph_order == expected[0]
+
+
+def test_cmap(fonts):
+    expected, (glyph_order, cmap, *_) = fonts
+    assert {codepoint: glyph_order[glyph_id] for codepoint, glyph_id in cmap.items()} == expected[1]
+
+
+def test_hmtx(fonts):
+    expected, (_, _, metrics, *_) = fonts
+    assert metrics == [tuple(expected[2][key]) for key in expected[0]]
+
+
+def test_head_hhea(fonts):
+    expected, (_, _, _, units_per_em, ascent, _) = fonts
+    assert (units_per_em, ascent) == expected[3:5]
+
+
+def test_glyphs(fonts):
+    expected, (glyph_order, *_, glyphs) = fonts
+    assert len(glyphs) == len(expected[5])
+    different = [glyph_order[i] for i, (e, g) in enumerate(zip(expected[5], glyphs)) if not same_glyph(e, g, glyph_order)]
+    assert different == []
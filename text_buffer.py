@@ -0,0 +1,211 @@
+from array import array
+from bisect import bisect_right
+from typing import Iterable
+from mapped_file import MappedLines
+
+# lines are arrays of glyph ids, 2 bytes per glyph since a font has at most 65535 glyphs
+GLYPH_ID_TYPECODE = "H"
+# not a glyph id (those go up to 65534), only passed to insert and returned by delete, lines never contain it
+NEWLINE = 0xFFFF
+
+
+def new_line(glyphs: Iterable[int] = ()) -> array:
+    return array(GLYPH_ID_TYPECODE, glyphs)
+
+
+class Piece:
+    """
+    a run of consecutive lines
+
+    pieces that are not owned point into the original (bulk loaded) lines and are never modified,
+    owned pieces hold their own copies of the lines that have been edited
+    """
+    __slots__ = ("lines", "start", "count", "owned")
+
+    def __init__(self, lines: list[array], start: int, count: int, owned: bool) -> None:
+        self.lines = lines
+        self.start = start
+        self.count = count
+        self.owned = owned
+
+
+class TextBuffer:
+    """
+    a piece table over lines of glyph ids
+
+    the document is a sequence of pieces, the first line index of every piece is kept in a sorted
+    list so that finding line k is a binary search over the pieces instead of a scan over the text.
+    editing a line copies only that line out of the original into an owned piece,
+    everything else keeps pointing at the original lines.
+    """
+
+    def __init__(self, lines: list[array] = None) -> None:
+        if not lines:
+            lines = [new_line()]
+        self.original = lines
+        self.pieces: list[Piece] = [Piece(lines, 0, len(lines), owned=False)]
+        self.piece_starts: list[int] = [0]
+        self.line_count = len(lines)
+
+    def close(self):
+        """
+        releases the original lines if they hold on to a resource (the memory map of MappedLines),
+        the buffer can not be read afterwards
+        """
+        if isinstance(self.original, MappedLines):
+            self.original.close()
+
+    @classmethod
+    def from_keys(cls, keys: Iterable[int]) -> 'TextBuffer':
+        """
+        bulk load from a flat stream of glyph ids where lines are separated by NEWLINE
+        """
+        lines = []
+        current = new_line()
+        for key in keys:
+            if key == NEWLINE:
+                lines.append(current)
+                current = new_line()
+            else:
+                current.append(key)
+        lines.append(current)
+        return cls(lines)
+
+    def _find(self, line: int) -> tuple[int, int]:
+        """
+        returns the index of the piece that contains the line and the line's index within that piece
+        """
+        if line < 0 or line >= self.line_count:
+            raise IndexError(f"line {line} is out of range [0, {self.line_count})")
+        piece_index = bisect_right(self.piece_starts, line) - 1
+        return piece_index, line - self.piece_starts[piece_index]
+
+    def _reindex(self, from_piece: int):
+        """
+        drops empty pieces and recomputes the first line indices of the pieces starting at from_piece
+        """
+        from_piece = max(0, from_piece - 1)
+        self.pieces[from_piece:] = [p for p in self.pieces[from_piece:] if p.count > 0]
+        if not self.pieces:
+            self.pieces = [Piece([new_line()], 0, 1, owned=True)]
+
+        del self.piece_starts[from_piece:]
+        line = self.piece_starts[-1] + self.pieces[from_piece - 1].count if from_piece > 0 else 0
+        for piece in self.pieces[from_piece:]:
+            self.piece_starts.append(line)
+            line += piece.count
+        self.line_count = line
+
+    def _editable(self, line: int) -> tuple[int, int]:
+        """
+        makes sure the line lives in an owned piece and returns (piece_index, index_in_piece)
+        """
+        piece_index, local = self._find(line)
+        piece = self.pieces[piece_index]
+        if piece.owned:
+            return piece_index, local
+
+        copied = new_line(piece.lines[piece.start + local])
+
+        # extend a neighbouring owned piece, so that editing consecutive lines does not fragment the table
+        if local == 0 and piece_index > 0 and self.pieces[piece_index - 1].owned:
+            previous = self.pieces[piece_index - 1]
+            previous.lines.append(copied)
+            previous.count += 1
+            piece.start += 1
+            piece.count -= 1
+            self._reindex(piece_index - 1)
+            return self._find(line)
+
+        if local == piece.count - 1 and piece_index + 1 < len(self.pieces) and self.pieces[piece_index + 1].owned:
+            following = self.pieces[piece_index + 1]
+            following.lines.insert(0, copied)
+            following.count += 1
+            piece.count -= 1
+            self._reindex(piece_index)
+            return self._find(line)
+
+        before = Piece(piece.lines, piece.start, local, owned=False)
+        edited = Piece([copied], 0, 1, owned=True)
+        after = Piece(piece.lines, piece.start + local + 1, piece.count - local - 1, owned=False)
+        self.pieces[piece_index : piece_index + 1] = [before, edited, after]
+        self._reindex(piece_index)
+        return self._find(line)
+
+    def line(self, line: int) -> array:
+        """
+        glyph ids of the line, without the newline; the returned array must not be modified
+        """
+        piece_index, local = self._find(line)
+        piece = self.pieces[piece_index]
+        return piece.lines[piece.start + local]
+
+    def lines(self, start: int, end: int) -> Iterable[array]:
+        """
+        glyph ids of the lines in [start, end)
+        """
+        line = max(0, start)
+        end = min(end, self.line_count)
+        if line >= end:
+            return
+        piece_index, local = self._find(line)
+        while line < end:
+            piece = self.pieces[piece_index]
+            while local < piece.count and line < end:
+                yield piece.lines[piece.start + local]
+                local += 1
+                line += 1
+            piece_index += 1
+            local = 0
+
+    def end(self) -> tuple[int, int]:
+        """
+        (line, column) position right after the last glyph of the document
+        """
+        last_line = self.line_count - 1
+        return last_line, len(self.line(last_line))
+
+    def insert(self, line: int, column: int, key: int):
+        """
+        inserts a glyph id before the given column, NEWLINE splits the line in two
+        """
+        piece_index, local = self._editable(line)
+        piece = self.pieces[piece_index]
+        current = piece.lines[local]
+        if key == NEWLINE:
+            piece.lines[local] = current[:column]
+            piece.lines.insert(local + 1, current[column:])
+            piece.count += 1
+            self._reindex(piece_index + 1)
+        else:
+            current.insert(column, key)
+
+    def delete(self, line: int, column: int) -> int:
+        """
+        deletes the glyph id before the given column (like backspace does),
+        at the start of a line it joins the line with the previous one and returns NEWLINE
+        """
+        if column > 0:
+            piece_index, local = self._editable(line)
+            return self.pieces[piece_index].lines[local].pop(column - 1)
+
+        if line == 0:
+            raise IndexError("nothing to delete before the start of the document")
+
+        # join with the previous line
+        removed = new_line(self.line(line))
+        piece_index, local = self._find(line)
+        piece = self.pieces[piece_index]
+        if piece.owned:
+            piece.lines.pop(local)
+            piece.count -= 1
+            self._reindex(piece_index)
+        else:
+            before = Piece(piece.lines, piece.start, local, owned=False)
+            after = Piece(piece.lines, piece.start + local + 1, piece.count - local - 1, owned=False)
+            self.pieces[piece_index : piece_index + 1] = [before, after]
+            self._reindex(piece_index)
+
+        piece_index, local = self._editable(line - 1)
+        self.pieces[piece_index].lines[local].extend(removed)
+        return NEWLINE
@@ -0,0 +1,356 @@
+import mmap
+import struct
+import numpy as np
+
+# the order of the glyphs in the Macintosh character set, the post table refers to these names by their index
+STANDARD_GLYPH_NAMES = [
+    ".notdef", ".null", "nonmarkingreturn", "space", "exclam", "quotedbl", "numbersign", "dollar", "percent",
+    "ampersand", "quotesingle", "parenleft", "parenright", "asterisk", "plus", "comma", "hyphen", "period",
+    "slash", "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "colon",
+    "semicolon", "less", "equal", "greater", "question", "at", "A", "B", "C", "D", "E", "F", "G", "H", "I",
+    "J", "K", "L", "M", "N", "O", "P", "Q", "R", "S", "T", "U", "V", "W", "X", "Y", "Z", "bracketleft",
+    "backslash", "bracketright", "asciicircum", "underscore", "grave", "a", "b", "c", "d", "e", "f", "g",
+    "h", "i", "j", "k", "l", "m", "n", "o", "p", "q", "r", "s", "t", "u", "v", "w", "x", "y", "z",
+    "braceleft", "bar", "braceright", "asciitilde", "Adieresis", "Aring", "Ccedilla", "Eacute", "Ntilde",
+    "Odieresis", "Udieresis", "aacute", "agrave", "acircumflex", "adieresis", "atilde", "aring", "ccedilla",
+    "eacute", "egrave", "ecircumflex", "edieresis", "iacute", "igrave", "icircumflex", "idieresis", "ntilde",
+    "oacute", "ograve", "ocircumflex", "odieresis", "otilde", "uacute", "ugrave", "ucircumflex", "udieresis",
+    "dagger", "degree", "cent", "sterling", "section", "bullet", "paragraph", "germandbls", "registered",
+    "copyright", "trademark", "acute", "dieresis", "notequal", "AE", "Oslash", "infinity", "plusminus",
+    "lessequal", "greaterequal", "yen", "mu", "partialdiff", "summation", "product", "pi", "integral",
+    "ordfeminine", "ordmasculine", "Omega", "ae", "oslash", "questiondown", "exclamdown", "logicalnot",
+    "radical", "florin", "approxequal", "Delta", "guillemotleft", "guillemotright", "ellipsis",
+    "nonbreakingspace", "Agrave", "Atilde", "Otilde", "OE", "oe", "endash", "emdash", "quotedblleft",
+    "quotedblright", "quoteleft", "quoteright", "divide", "lozenge", "ydieresis", "Ydieresis", "fraction",
+    "currency", "guilsinglleft", "guilsinglright", "fi", "fl", "daggerdbl", "periodcentered",
+    "quotesinglbase", "quotedblbase", "perthousand", "Acircumflex", "Ecircumflex", "Aacute", "Edieresis",
+    "Egrave", "Iacute", "Icircumflex", "Idieresis", "Igrave", "Oacute", "Ocircumflex", "apple", "Ograve",
+    "Uacute", "Ucircumflex", "Ugrave", "dotlessi", "circumflex", "tilde", "macron", "breve", "dotaccent",
+    "ring", "cedilla", "hungarumlaut", "ogonek", "caron", "Lslash", "lslash", "Scaron", "scaron", "Zcaron",
+    "zcaron", "brokenbar", "Eth", "eth", "Yacute", "yacute", "Thorn", "thorn", "minus", "multiply",
+    "onesuperior", "twosuperior", "threesuperior", "onehalf", "onequarter", "threequarters", "franc",
+    "Gbreve", "gbreve", "Idotaccent", "Scedilla", "scedilla", "Cacute", "cacute", "Ccaron", "ccaron",
+    "dcroat",
+
+]
+
+# cmap subtables in the order they are preferred: full unicode first, then the basic multilingual plane
+PREFERRED_CMAPS = [(3, 10), (0, 6), (0, 4), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0)]
+
+# simple glyph flags
+ON_CURVE_POINT = 0x01
+X_SHORT_VECTOR = 0x02
+Y_SHORT_VECTOR = 0x04
+REPEAT_FLAG = 0x08
+X_IS_SAME_OR_POSITIVE = 0x10
+Y_IS_SAME_OR_POSITIVE = 0x20
+
+# compound glyph flags
+ARG_1_AND_2_ARE_WORDS = 0x0001
+ARGS_ARE_XY_VALUES = 0x0002
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+def f2dot14(value: int) -> float:
+    return value / (1 << 14)
+
+
+class SimpleGlyph:
+    """
+    the outline of a glyph as it is stored: the points of all the contours one after another
+    and the index of the last point of every contour
+    """
+
+    def __init__(self, coordinates: np.ndarray, flags: np.ndarray, end_points: np.ndarray) -> None:
+        self.coordinates = coordinates # (point_count, 2) in font units
+        self.flags = flags # only ON_CURVE_POINT is kept
+        self.end_points = end_points
+
+
+class CompoundGlyph:
+    """
+    a glyph made of other glyphs, every component is (glyph id, (xx, xy, yx, yy, dx, dy))
+    """
+
+    def __init__(self, components: list[tuple[int, tuple[float, float, float, float, float, float]]]) -> None:
+        self.components = components
+
+
+class TrueTypeFont:
+    """
+    reads the few tables needed to draw text straight from the memory mapped font file
+
+    the fixed size tables (head, hhea, maxp) are read when the font is opened, loca and hmtx become
+    numpy views into the file and glyphs are only decoded when they are asked for, see glyph().
+    nothing is cached and nothing is written, so it is safe to use from several threads
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        _, table_count = struct.unpack_from(">IH", self.data, 0)
+        # tag => (offset, length)
+        self.tables: dict[str, tuple[int, int]] = dict()
+        for i in range(table_count):
+            tag, _, offset, length = struct.unpack_from(">4sIII", self.data, 12 + 16 * i)
+            self.tables[tag.decode("latin-1")] = (offset, length)
+
+        head = self.table_offset("head")
+        self.units_per_em = struct.unpack_from(">H", self.data, head + 18)[0]
+        self.index_to_loc_format = struct.unpack_from(">h", self.data, head + 50)[0]
+
+        hhea = self.table_offset("hhea")
+        self.ascent, self.descent, self.line_gap = struct.unpack_from(">hhh", self.data, hhea + 4)
+        self.number_of_h_metrics = struct.unpack_from(">H", self.data, hhea + 34)[0]
+
+        self.glyph_count = struct.unpack_from(">H", self.data, self.table_offset("maxp") + 4)[0]
+
+        # glyph id => offset of the glyph in glyf, glyph g spans loca[g] .. loca[g + 1]
+        loca = self.table_offset("loca")
+        if self.index_to_loc_format == 0:
+            # short offsets are stored divided by two
+            self.loca = np.frombuffer(self.data, dtype=">u2", count=self.glyph_count + 1, offset=loca).astype(np.int64) * 2
+        else:
+            self.loca = np.frombuffer(self.data, dtype=">u4", count=self.glyph_count + 1, offset=loca).astype(np.int64)
+        self.glyf = self.table_offset("glyf")
+
+        # glyphs after the last full metric share its advance width and only store their left side bearing
+        hmtx = self.table_offset("hmtx")
+        metrics = np.frombuffer(self.data, dtype=">i2", count=2 * self.number_of_h_metrics, offset=hmtx).reshape(-1, 2)
+        extra_bearings = np.frombuffer(
+            self.data, dtype=">i2", count=self.glyph_count - self.number_of_h_metrics, offset=hmtx + 4 * self.number_of_h_metrics
+        )
+        self.advance_widths = np.empty(self.glyph_count, dtype=np.int32)
+        self.advance_widths[:self.number_of_h_metrics] = metrics[:, 0].view(">u2")
+        self.advance_widths[self.number_of_h_metrics:] = self.advance_widths[self.number_of_h_metrics - 1]
+        self.left_side_bearings = np.concatenate((metrics[:, 1], extra_bearings)).astype(np.int32)
+
+    def table_offset(self, tag: str) -> int:
+        return self.tables[tag][0]
+
+    def close(self):
+        self.data.close()
+
+    def metrics(self) -> list[tuple[int, int]]:
+        """
+        (advance width, left side bearing) of every glyph
+        """
+        return list(zip(self.advance_widths.tolist(), self.left_side_bearings.tolist()))
+
+    def glyph_order(self) -> list[str]:
+        """
+        the names of the glyphs from the post table, glyphs without one are named after their id
+        """
+        names = [f"glyph{glyph_id:05d}" for glyph_id in range(self.glyph_count)]
+        names[0] = STANDARD_GLYPH_NAMES[0]
+        if "post" not in self.tables:
+            return names
+
+        post = self.table_offset("post")
+        version = struct.unpack_from(">I", self.data, post)[0]
+        if version == 0x00010000:
+            return STANDARD_GLYPH_NAMES[:self.glyph_count] + names[len(STANDARD_GLYPH_NAMES):]
+        if version != 0x00020000:
+            return names
+
+        count = struct.unpack_from(">H", self.data, post + 32)[0]
+        indices = np.frombuffer(self.data, dtype=">u2", count=count, offset=post + 34).tolist()
+        # pascal strings for the names that are not in the standard order
+        extra_names = []
+        position, end = post + 34 + 2 * count, post + self.tables["post"][1]
+        while position < end:
+            length = self.data[position]
+            extra_names.append(self.data[position + 1 : position + 1 + length].decode("latin-1"))
+            position += 1 + length
+
+        # names have to be unique, duplicates get a number like they do in fontTools
+        seen: dict[str, int] = dict()
+        for glyph_id, index in enumerate(indices[:self.glyph_count]):
+            if index < len(STANDARD_GLYPH_NAMES):
+                name = STANDARD_GLYPH_NAMES[index]
+            elif index - len(STANDARD_GLYPH_NAMES) < len(extra_names):
+                name = extra_names[index - len(STANDARD_GLYPH_NAMES)]
+            else:
+                continue
+            if name in seen:
+                n = seen[name]
+                while f"{name}#{n}" in seen:
+                    n += 1
+                seen[name] = n + 1
+                name = f"{name}#{n}"
+            seen[name] = 1
+            names[glyph_id] = name
+        return names
+
+    def cmap(self) -> dict[int, int]:
+        """
+        codepoint => glyph id from the best unicode subtable, formats 4 and 12 are supported
+        """
+        cmap = self.table_offset("cmap")
+        table_count = struct.unpack_from(">H", self.data, cmap + 2)[0]
+        subtables = dict()
+        for i in range(table_count):
+            platform_id, encoding_id, offset = struct.unpack_from(">HHI", self.data, cmap + 4 + 8 * i)
+            subtable_format = struct.unpack_from(">H", self.data, cmap + offset)[0]
+            if subtable_format in (4, 12):
+                subtables.setdefault((platform_id, encoding_id), cmap + offset)
+
+        for preferred in PREFERRED_CMAPS:
+            if preferred in subtables:
+                offset = subtables[preferred]
+                if struct.unpack_from(">H", self.data, offset)[0] == 4:
+                    return self._cmap_format_4(offset)
+                return self._cmap_format_12(offset)
+        return dict()
+
+    def _cmap_format_4(self, offset: int) -> dict[int, int]:
+        segment_count = struct.unpack_from(">H", self.data, offset + 6)[0] // 2
+        end_codes_offset = offset + 14
+        end_codes = np.frombuffer(self.data, dtype=">u2", count=segment_count, offset=end_codes_offset).astype(np.int64)
+        start_codes = np.frombuffer(self.data, dtype=">u2", count=segment_count, offset=end_codes_offset + 2 * segment_count + 2).astype(np.int64)
+        deltas = np.frombuffer(self.data, dtype=">u2", count=segment_count, offset=end_codes_offset + 4 * segment_count + 2).astype(np.int64)
+        range_offsets_offset = end_codes_offset + 6 * segment_count + 2
+        range_offsets = np.frombuffer(self.data, dtype=">u2", count=segment_count, offset=range_offsets_offset).astype(np.int64)
+
+        # every codepoint of every segment, the last segment only maps 0xFFFF
+        lengths = np.maximum(end_codes - start_codes + 1, 0)
+        segment = np.repeat(np.arange(segment_count), lengths)
+        codepoints = np.arange(len(segment)) - np.repeat(np.cumsum(lengths) - lengths, lengths) + start_codes[segment]
+
+        glyph_ids = (codepoints + deltas[segment]) & 0xFFFF
+        # id_range_offset is relative to its own position in the table
+        indirect = range_offsets[segment] != 0
+        addresses = range_offsets_offset + 2 * segment[indirect] + range_offsets[segment[indirect]] + 2 * (codepoints[indirect] - start_codes[segment[indirect]])
+        raw = np.frombuffer(self.data, dtype=">u2", count=len(self.data) // 2)
+        indirect_ids = raw[addresses // 2].astype(np.int64) if len(addresses) else np.empty(0, np.int64)
+        glyph_ids[indirect] = np.where(indirect_ids != 0, (indirect_ids + deltas[segment[indirect]]) & 0xFFFF, 0)
+
+        keep = codepoints != 0xFFFF
+        return dict(zip(codepoints[keep].tolist(), glyph_ids[keep].tolist()))
+
+    def _cmap_format_12(self, offset: int) -> dict[int, int]:
+        group_count = struct.unpack_from(">I", self.data, offset + 12)[0]
+        groups = np.frombuffer(self.data, dtype=">u4", count=3 * group_count, offset=offset + 16).reshape(-1, 3).astype(np.int64)
+        starts, ends, first_glyph_ids = groups[:, 0], groups[:, 1], groups[:, 2]
+        lengths = ends - starts + 1
+        steps = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        codepoints = np.repeat(starts, lengths) + steps
+        glyph_ids = np.repeat(first_glyph_ids, lengths) + steps
+        return dict(zip(codepoints.tolist(), glyph_ids.tolist()))
+
+    def glyph(self, glyph_id: int) -> SimpleGlyph | CompoundGlyph | None:
+        """
+        decodes one glyph from glyf, None for glyphs without an outline (e.g. space)
+        """
+        return self.glyphs([glyph_id])[0]
+
+    def glyphs(self, glyph_ids: list[int]) -> list[SimpleGlyph | CompoundGlyph | None]:
+        """
+        decodes the glyphs together: the headers and the flags are read glyph by glyph,
+        the coordinates of all the simple glyphs are then decoded in one go with numpy
+        """
+        data = self.data
+        result: list[SimpleGlyph | CompoundGlyph | None] = [None] * len(glyph_ids)
+        simple = [] # (index in result, end points, first point, offset of the x coordinates)
+        all_flags = bytearray()
+        for i, glyph_id in enumerate(glyph_ids):
+            start, end = self.loca[glyph_id], self.loca[glyph_id + 1]
+            if start == end:
+                continue
+            offset = self.glyf + int(start)
+            contour_count = struct.unpack_from(">h", data, offset)[0]
+            offset += 10
+            if contour_count < 0:
+                result[i] = CompoundGlyph(self._components(offset))
+                continue
+            if contour_count == 0:
+                continue
+
+            end_points = struct.unpack_from(f">{contour_count}H", data, offset)
+            point_count = end_points[-1] + 1
+            offset += 2 * contour_count
+            instruction_length = struct.unpack_from(">H", data, offset)[0]
+            offset += 2 + instruction_length
+
+            # flags can be repeated, that is the only part that has to be read byte by byte
+            first_point = len(all_flags)
+            end_of_flags = first_point + point_count
+            while len(all_flags) < end_of_flags:
+                flag = data[offset]
+                offset += 1
+                if flag & REPEAT_FLAG:
+                    all_flags.extend(bytes((flag,)) * (data[offset] + 1))
+                    offset += 1
+                else:
+                    all_flags.append(flag)
+            del all_flags[end_of_flags:]
+            simple.append((i, end_points, first_point, offset))
+
+        if not simple:
+            return result
+
+        flags = np.frombuffer(bytes(all_flags), dtype=np.uint8)
+        first_points = np.array([first_point for _, _, first_point, _ in simple] + [len(flags)], dtype=np.int64)
+        point_counts = np.diff(first_points)
+        glyph_of_point = np.repeat(np.arange(len(simple)), point_counts)
+        raw = np.frombuffer(data, dtype=np.uint8)
+
+        coordinates = np.empty((len(flags), 2), dtype=np.int64)
+        # the x coordinates of a glyph come right after its flags and the y coordinates right after those
+        axis_offsets = np.array([offset for _, _, _, offset in simple], dtype=np.int64)
+        for axis, short, same_or_positive in ((0, X_SHORT_VECTOR, X_IS_SAME_OR_POSITIVE), (1, Y_SHORT_VECTOR, Y_IS_SAME_OR_POSITIVE)):
+            is_short = (flags & short) != 0
+            is_same_or_positive = (flags & same_or_positive) != 0
+            # bytes per delta: 1 if short, 0 if the delta is 0, 2 otherwise
+            sizes = np.where(is_short, 1, np.where(is_same_or_positive, 0, 2))
+            ends = np.cumsum(sizes)
+            glyph_bytes = np.concatenate(([0], ends[first_points[1:] - 1]))
+            starts = ends - sizes - glyph_bytes[glyph_of_point] + axis_offsets[glyph_of_point]
+
+            deltas = np.zeros(len(flags), dtype=np.int64)
+            deltas[is_short] = np.where(is_same_or_positive[is_short], 1, -1) * raw[starts[is_short]]
+            words = sizes == 2
+            deltas[words] = ((raw[starts[words]].astype(np.int64) << 8) | raw[starts[words] + 1]).astype(np.uint16).view(np.int16)
+
+            # the deltas are summed up per glyph
+            totals = np.cumsum(deltas)
+            coordinates[:, axis] = totals - np.concatenate(([0], totals[first_points[1:-1] - 1]))[glyph_of_point]
+            axis_offsets += np.diff(glyph_bytes)
+
+        on_curve = flags & ON_CURVE_POINT
+        for (i, end_points, _, _), start, end in zip(simple, first_points[:-1].tolist(), first_points[1:].tolist()):
+            result[i] = SimpleGlyph(coordinates[start:end], on_curve[start:end], np.array(end_points, dtype=np.intp))
+        return result
+
+    def _components(self, offset: int) -> list[tuple[int, tuple[float, float, float, float, float, float]]]:
+        components = []
+        flags = MORE_COMPONENTS
+        while flags & MORE_COMPONENTS:
+            flags, glyph_id = struct.unpack_from(">HH", self.data, offset)
+            offset += 4
+            if flags & ARG_1_AND_2_ARE_WORDS:
+                dx, dy = struct.unpack_from(">hh" if flags & ARGS_ARE_XY_VALUES else ">HH", self.data, offset)
+                offset += 4
+            else:
+                dx, dy = struct.unpack_from(">bb" if flags & ARGS_ARE_XY_VALUES else ">BB", self.data, offset)
+                offset += 2
+            if not flags & ARGS_ARE_XY_VALUES:
+                # the component is placed by matching points, which is not supported
+                dx, dy = 0, 0
+
+            xx, xy, yx, yy = 1.0, 0.0, 0.0, 1.0
+            if flags & WE_HAVE_A_SCALE:
+                xx = yy = f2dot14(struct.unpack_from(">h", self.data, offset)[0])
+                offset += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                xx, yy = map(f2dot14, struct.unpack_from(">hh", self.data, offset))
+                offset += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                xx, xy, yx, yy = map(f2dot14, struct.unpack_from(">hhhh", self.data, offset))
+                offset += 8
+            components.append((glyph_id, (xx, xy, yx, yy, dx, dy)))
+        return components